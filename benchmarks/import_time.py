@@ -0,0 +1,88 @@
+"""
+Import-time benchmark.
+
+Times each import statement in fresh interpreters, reports the median cost on top of a bare interpreter, and checks
+that optional heavy dependencies (PIL, dateutil) are not loaded. Exits with status 1 if a statement exceeds its
+target, so it can guard startup time in CI.
+
+Usage:
+    python benchmarks/import_time.py [--runs 15] [--target 75] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# statement -> modules that must not be loaded by it
+STATEMENTS = {
+    "import ohgo": ["requests", "PIL", "dateutil", "ohgo.ohgo_client"],
+    "from ohgo import OHGOClient": ["PIL", "dateutil"],
+    "from ohgo.models import QueryParams": ["requests", "PIL", "dateutil"],
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(name for name in {forbidden!r} if name in sys.modules))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(SRC), env.get("PYTHONPATH")]))
+    # Bytecode is cached after the first run, so every run after it measures a warm start
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure(statement, forbidden, runs):
+    """
+    Runs statement in fresh interpreters
+    :return: (median seconds, forbidden modules that were loaded)
+    """
+    timings = []
+    loaded = set()
+    env = _env()
+    # First run warms the bytecode cache and is not counted
+    for run in range(runs + 1):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement, forbidden=forbidden)],
+                                env=env, check=True, capture_output=True, text=True).stdout.split()
+        if run:
+            timings.append(float(output[0]))
+        if len(output) > 1:
+            loaded.update(output[1].split(","))
+    return statistics.median(timings), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of the ohgo package.")
+    parser.add_argument("--runs", type=int, default=15, help="Fresh interpreters per statement")
+    parser.add_argument("--target", type=float, default=75.0,
+                        help="Maximum median milliseconds for any statement, exit 1 if exceeded")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    failed = False
+    print("{:<40} {:>10} {:>8}  {}".format("statement", "median ms", "target", "unexpected imports"))
+    for statement, forbidden in STATEMENTS.items():
+        median, loaded = measure(statement, forbidden, args.runs)
+        ok = median * 1000 <= args.target and not loaded
+        failed |= not ok
+        results.append({"statement": statement, "median_ms": median * 1000, "unexpected_imports": loaded})
+        print("{:<40} {:>10.2f} {:>8}  {}".format(statement, median * 1000, "ok" if ok else "FAIL",
+                                                 ", ".join(loaded) or "-"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
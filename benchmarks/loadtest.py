@@ -0,0 +1,249 @@
+"""
+Load-test driver for OHGOClient.
+
+Runs N concurrent workers, each with its own OHGOClient, against a local OHGOStubServer (or any OHGO compatible
+host) using a weighted mix of workloads, and reports throughput, p50/p95/p99 latency, connection reuse and memory
+per worker for each concurrency level. Sweeping the concurrency shows where the client saturates.
+
+Workloads:
+    list   polls a list endpoint
+    item   looks up a single result by id
+    image  fetches a camera image
+    crawl  pages through a whole endpoint with fetch_all and a small page size
+
+Usage:
+    python benchmarks/loadtest.py [--concurrency 1,2,4,8,16] [--duration 10] [--mix list=4,item=3,image=2,crawl=1]
+                                  [--mode process|thread] [--latency 0.02] [--hostname http://host:port]
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import ohgo  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from ohgo import OHGOClient
+from ohgo.exceptions import OHGOException
+from ohgo.models import QueryParams
+from ohgo.testing import OHGOStubServer
+
+WORKLOADS = ["list", "item", "image", "crawl"]
+LIST_METHODS = ["get_cameras", "get_digital_signs", "get_constructions", "get_weather_sensor_sites",
+                "get_incidents", "get_dangerous_slowdowns", "get_travel_delays"]
+CRAWL_PAGE_SIZE = 100
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return usage / 1024 if sys.platform == "darwin" else usage
+
+
+class Worker:
+    """
+    A single load-test worker with its own OHGOClient. Picks workloads at random according to the mix.
+    """
+
+    def __init__(self, hostname, api_key, mix, seed):
+        self.client = OHGOClient(api_key, hostname=hostname)
+        self.random = random.Random(seed)
+        self.workloads, self.weights = zip(*mix.items())
+        self.cameras = []
+        self.ids = {}
+
+    def prepare(self, attempts=10):
+        # Ids and camera views for item and image lookups, not timed. Retried since the stub may inject errors.
+        for attempt in range(attempts):
+            try:
+                cameras = self.client.get_cameras(params=QueryParams(page_size=200))
+                incidents = self.client.get_incidents()
+                break
+            except OHGOException:
+                if attempt == attempts - 1:
+                    raise
+        self.cameras = [view for camera in cameras for view in camera.camera_views]
+        self.ids = {"get_camera": [camera.id for camera in cameras],
+                    "get_incident": [incident.id for incident in incidents]}
+
+    def run_once(self, workload):
+        if workload == "list":
+            getattr(self.client, self.random.choice(LIST_METHODS))()
+        elif workload == "item":
+            method = self.random.choice([name for name, ids in self.ids.items() if ids])
+            getattr(self.client, method)(self.random.choice(self.ids[method]))
+        elif workload == "image":
+            if self.client.get_image(self.random.choice(self.cameras)) is None:
+                raise OHGOException("Image fetch failed")
+        elif workload == "crawl":
+            self.client.get_travel_delays(params=QueryParams(page_size=CRAWL_PAGE_SIZE), fetch_all=True)
+
+    def run(self, deadline):
+        """
+        Runs workloads until deadline (a time.monotonic value)
+        :return: A list of (workload, latency seconds, succeeded) samples
+        """
+        samples = []
+        while time.monotonic() < deadline:
+            workload = self.random.choices(self.workloads, self.weights)[0]
+            start = time.perf_counter()
+            ok = True
+            try:
+                self.run_once(workload)
+            except Exception:  # Connection errors, HTTP errors and failed image fetches all count as errors
+                ok = False
+            samples.append((workload, time.perf_counter() - start, ok))
+        return samples
+
+
+def _process_worker(args):
+    hostname, api_key, mix, seed, start_at, duration = args
+    worker = Worker(hostname, api_key, mix, seed)
+    worker.prepare()
+    # Workers start together so the concurrency level is held for the whole measurement window
+    time.sleep(max(0.0, start_at - time.time()))
+    samples = worker.run(time.monotonic() + duration)
+    return samples, _max_rss_kb()
+
+
+def _thread_level(hostname, api_key, mix, concurrency, duration):
+    workers = [Worker(hostname, api_key, mix, seed) for seed in range(concurrency)]
+    for worker in workers:
+        worker.prepare()
+    deadline = time.monotonic() + duration
+    results = [None] * concurrency
+
+    def target(index):
+        results[index] = (workers[index].run(deadline), None)
+
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_level(hostname, api_key, mix, concurrency, duration, mode):
+    """
+    Runs one concurrency level
+    :return: A list of (samples, max rss KiB) per worker
+    """
+    if mode == "thread":
+        return _thread_level(hostname, api_key, mix, concurrency, duration)
+    start_at = time.time() + 2.0 + 0.1 * concurrency
+    jobs = [(hostname, api_key, mix, seed, start_at, duration) for seed in range(concurrency)]
+    with multiprocessing.Pool(concurrency) as pool:
+        return pool.map(_process_worker, jobs)
+
+
+def summarize(concurrency, duration, worker_results, stats_before, stats_after):
+    samples = [sample for samples, _ in worker_results for sample in samples]
+    rows = []
+    for workload in [None] + WORKLOADS:
+        selected = sorted(latency for name, latency, _ in samples if workload is None or name == workload)
+        if not selected:
+            continue
+        failures = sum(1 for name, _, ok in samples if (workload is None or name == workload) and not ok)
+        rows.append({
+            "workload": workload or "all",
+            "ops": len(selected),
+            "ops_per_s": len(selected) / duration,
+            "p50_ms": percentile(selected, 50) * 1000,
+            "p95_ms": percentile(selected, 95) * 1000,
+            "p99_ms": percentile(selected, 99) * 1000,
+            "errors": failures,
+        })
+
+    reuse = None
+    if stats_before is not None:
+        requests_made = stats_after.get("requests", 0) - stats_before.get("requests", 0)
+        connections = stats_after.get("connections", 0) - stats_before.get("connections", 0)
+        reuse = requests_made / connections if connections else None
+    rss = [kb for _, kb in worker_results if kb is not None]
+    return {
+        "concurrency": concurrency,
+        "rows": rows,
+        "requests_per_connection": reuse,
+        "max_rss_kb_per_worker": max(rss) if rss else None,
+    }
+
+
+def print_summary(summary):
+    reuse = summary["requests_per_connection"]
+    rss = summary["max_rss_kb_per_worker"]
+    print("\nconcurrency {}: {} requests/connection, {} max RSS per worker".format(
+        summary["concurrency"], "{:.2f}".format(reuse) if reuse else "n/a",
+        "{:,.0f} KiB".format(rss) if rss else "n/a"))
+    print("  {:<8} {:>8} {:>10} {:>9} {:>9} {:>9} {:>7}".format("workload", "ops", "ops/s", "p50 ms", "p95 ms",
+                                                                 "p99 ms", "errors"))
+    for row in summary["rows"]:
+        print("  {workload:<8} {ops:>8} {ops_per_s:>10.1f} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} "
+              "{errors:>7}".format(**row))
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in WORKLOADS:
+            raise argparse.ArgumentTypeError("unknown workload: " + name)
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test OHGOClient with N concurrent workers.")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma separated worker counts to sweep")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("list=4,item=3,image=2,crawl=1"),
+                        help="Comma separated workload=weight pairs from: " + ", ".join(WORKLOADS))
+    parser.add_argument("--mode", choices=["process", "thread"], default="process",
+                        help="Run workers as processes (default) or threads in one process")
+    parser.add_argument("--hostname", help="Target an existing server instead of starting a local stub")
+    parser.add_argument("--api-key", default="loadtest")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency injected by the local stub")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Error rate injected by the local stub")
+    args = parser.parse_args(argv)
+
+    stub = None
+    hostname = args.hostname
+    if hostname is None:
+        stub = OHGOStubServer(api_key=args.api_key, latency=args.latency, error_rate=args.error_rate).start()
+        hostname = stub.hostname
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(",")]:
+            before = dict(stub.stats) if stub else None
+            worker_results = run_level(hostname, args.api_key, args.mix, concurrency, args.duration, args.mode)
+            after = dict(stub.stats) if stub else None
+            print_summary(summarize(concurrency, args.duration, worker_results, before, after))
+    finally:
+        if stub:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Memory benchmark for decoded models.
+
+Decodes a full statewide snapshot of each endpoint (or the recorded fixture, see payloads.py) into models and reports
+the memory the models retain once the decoded JSON has been released, measured with tracemalloc.
+
+Usage:
+    python benchmarks/memory.py [--size all] [--decoder json] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+try:
+    import ohgo  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from ohgo.decoders import get_decoder
+from ohgo.models import Camera, DigitalSign, Construction, WeatherSensorSite, Incident, DangerousSlowdown, \
+    TravelDelay
+
+from payloads import ENDPOINTS, load_payload, parse_size
+
+MODELS = {
+    "cameras": Camera,
+    "digital-signs": DigitalSign,
+    "construction": Construction,
+    "weather-sensor-sites": WeatherSensorSite,
+    "incidents": Incident,
+    "dangerous-slowdowns": DangerousSlowdown,
+    "travel-delays": TravelDelay,
+}
+
+
+def retained(model, body, decoder):
+    """
+    Decodes body into models
+    :return: (models, bytes retained by the models)
+    """
+    gc.collect()
+    tracemalloc.start()
+    items = decoder.decode(body)["results"]
+    models = [model.from_dict(item) for item in items]
+    del items
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return models, current
+
+
+def run(size_arg, decoder):
+    results = []
+    for endpoint in ENDPOINTS:
+        payload = load_payload(endpoint, parse_size(endpoint, size_arg))
+        body = json.dumps(payload).encode("utf-8")
+        models, current = retained(MODELS[endpoint], body, decoder)
+        results.append({"endpoint": endpoint, "items": len(models), "json_kb": len(body) / 1024,
+                        "retained_kb": current / 1024})
+        del models
+    return results
+
+
+def print_table(results, baseline=None):
+    baseline = {row["endpoint"]: row for row in baseline or []}
+    header = "{:<22} {:>7} {:>10} {:>13} {:>11}".format("endpoint", "items", "JSON KiB", "retained KiB",
+                                                         "bytes/item")
+    if baseline:
+        header += " {:>13} {:>8}".format("baseline KiB", "saved")
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        line = "{:<22} {:>7} {:>10.1f} {:>13.1f} {:>11.0f}".format(
+            row["endpoint"], row["items"], row["json_kb"], row["retained_kb"],
+            row["retained_kb"] * 1024 / row["items"] if row["items"] else 0)
+        base = baseline.get(row["endpoint"])
+        if base:
+            line += " {:>13.1f} {:>7.0%}".format(base["retained_kb"], 1 - row["retained_kb"] / base["retained_kb"])
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory retained by decoded models.")
+    parser.add_argument("--size", default="all", help="Results per endpoint, 'all' for a statewide snapshot")
+    parser.add_argument("--decoder", default="json", help="JSON decoder: json, orjson or ujson")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare with results previously written with --json")
+    args = parser.parse_args(argv)
+
+    results = run(args.size, get_decoder(args.decoder))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
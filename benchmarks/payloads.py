@@ -0,0 +1,57 @@
+"""
+Payload fixtures for the benchmark suite.
+
+Recorded payloads (see record.py) are read from benchmarks/fixtures/<endpoint>.json when present. Otherwise the
+deterministic synthetic payloads from ohgo.testing are used, so benchmark numbers stay comparable between machines
+and versions.
+"""
+import json
+import os
+
+from ohgo.testing.payloads import ENDPOINTS, STATEWIDE_COUNTS, envelope, synthetic_results  # noqa: F401
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture_path(endpoint):
+    return os.path.join(FIXTURE_DIR, "{}.json".format(endpoint))
+
+
+def load_results(endpoint, size=None, seed=0):
+    """
+    Loads results for an endpoint, preferring a recorded fixture. Recorded results are repeated if size is larger
+    than the recording.
+    :param endpoint: One of ENDPOINTS
+    :param size: The number of results, defaults to the statewide count (or the full recording)
+    :param seed: Random seed for synthetic results
+    :return: A list of result dictionaries
+    """
+    path = fixture_path(endpoint)
+    if os.path.exists(path):
+        with open(path) as fixture:
+            recorded = json.load(fixture)["results"]
+        if size is None:
+            return recorded
+        if recorded:
+            return [recorded[index % len(recorded)] for index in range(size)]
+    return synthetic_results(endpoint, size, seed)
+
+
+def load_payload(endpoint, size=None, seed=0):
+    """
+    Loads a complete response payload for an endpoint
+    :param endpoint: One of ENDPOINTS
+    :param size: The number of results, defaults to the statewide count
+    :param seed: Random seed for synthetic results
+    :return: A dictionary shaped like an OHGO API response
+    """
+    return envelope(endpoint, load_results(endpoint, size, seed))
+
+
+def parse_size(endpoint, size):
+    """
+    Converts a size argument into a result count. "all" returns None, the full statewide payload.
+    """
+    if size == "all":
+        return None
+    return int(size)
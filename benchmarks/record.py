@@ -0,0 +1,39 @@
+"""
+Records statewide page-all payloads from the live OHGO API into benchmarks/fixtures/ for use by run.py.
+
+Usage:
+    python benchmarks/record.py --api-key YOUR-API-KEY [--endpoints cameras,incidents]
+"""
+import argparse
+import json
+import os
+import sys
+
+try:
+    import ohgo  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from ohgo.rest_adapter import RestAdapter
+
+from payloads import ENDPOINTS, FIXTURE_DIR, envelope, fixture_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record OHGO API payloads as benchmark fixtures.")
+    parser.add_argument("--api-key", required=True, help="OHGO API key")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma separated endpoints to record")
+    args = parser.parse_args(argv)
+
+    adapter = RestAdapter("publicapi.ohgo.com", args.api_key)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for endpoint in args.endpoints.split(","):
+        result = adapter.get(endpoint, ep_params={"page-all": True})
+        payload = envelope(endpoint, result.data, result.total_result_count, result.links)
+        with open(fixture_path(endpoint), "w") as f:
+            json.dump(payload, f)
+        print("{}: {} results".format(endpoint, len(result.data)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Benchmark suite for ohgo parsing and request handling.
+
+Measures JSON decoding with each installed decoder, Result construction, every model's from_dict, to_dict,
+QueryParams.to_dict, weather analytics (when numpy is installed) and end-to-end get_* calls against the local
+OHGOStubServer, for each endpoint at several payload sizes. Reports throughput and peak traced memory.
+
+Usage:
+    python benchmarks/run.py [--sizes 1,50,500,all] [--repeat 5] [--only from_dict,get]
+                             [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import ohgo  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from ohgo import OHGOClient
+from ohgo.decoders import DECODERS
+from ohgo.models import Camera, CameraView, DigitalSign, Construction, WeatherSensorSite, Incident, \
+    DangerousSlowdown, TravelDelay, Result, QueryParams, DigitalSignParams, ConstructionParams, WeatherSensorSiteParams
+from ohgo.models.models import Link
+from ohgo.models.weather_sensor_site import AtmosphericSensor, SurfaceSensor
+from ohgo.testing import OHGOStubServer
+from ohgo.types import Region, SignType
+from ohgo import weather_analytics
+from ohgo.weather_analytics import WeatherFrame
+
+from payloads import ENDPOINTS, load_payload, parse_size
+
+# endpoint -> (model, client method, [(nested model, key on each result)])
+TARGETS = {
+    "cameras": (Camera, "get_cameras", [(CameraView, "cameraViews")]),
+    "digital-signs": (DigitalSign, "get_digital_signs", []),
+    "construction": (Construction, "get_constructions", []),
+    "weather-sensor-sites": (WeatherSensorSite, "get_weather_sensor_sites",
+                             [(AtmosphericSensor, "atmosphericSensors"), (SurfaceSensor, "surfaceSensors")]),
+    "incidents": (Incident, "get_incidents", []),
+    "dangerous-slowdowns": (DangerousSlowdown, "get_dangerous_slowdowns", []),
+    "travel-delays": (TravelDelay, "get_travel_delays", []),
+}
+
+QUERY_PARAMS = [
+    QueryParams(region=Region.COLUMBUS, page_size=10, page=2),
+    QueryParams(map_bounds_sw=(39.9612, -82.9988), map_bounds_ne=(40.0150, -82.8874), radius=(39.9, -82.9, 10)),
+    DigitalSignParams(sign_type=SignType.DMS, page_all=True),
+    ConstructionParams(include_future=datetime(2024, 1, 15), region="cleveland"),
+    WeatherSensorSiteParams(hazards_only=True),
+]
+QUERY_PARAMS_ITERATIONS = 10000
+
+BENCHMARKS = ["decode", "result", "from_dict", "to_dict", "query_params", "get", "analytics"]
+
+
+def measure(fn, repeat):
+    """
+    Times fn over several runs and measures its peak traced memory in a separate run
+    :param fn: A zero argument callable
+    :param repeat: The number of timed runs
+    :return: (best seconds, median seconds, peak bytes)
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), statistics.median(timings), peak
+
+
+def record(results, name, target, endpoint, size, items, payload_bytes, fn, repeat):
+    best, median, peak = measure(fn, repeat)
+    results.append({
+        "name": name,
+        "target": target,
+        "endpoint": endpoint,
+        "size": size,
+        "items": items,
+        "best_s": best,
+        "median_s": median,
+        "items_per_s": items / best if best else float("inf"),
+        "mb_per_s": payload_bytes / best / 1e6 if best and payload_bytes else None,
+        "peak_kb": peak / 1024,
+    })
+
+
+def run_endpoint(results, endpoint, size_arg, repeat, only, stub, client):
+    model, method, nested = TARGETS[endpoint]
+    payload = load_payload(endpoint, parse_size(endpoint, size_arg))
+    items = payload["results"]
+    body_bytes = len(json.dumps(payload).encode("utf-8"))
+    size = len(items)
+
+    if "decode" in only:
+        body = json.dumps(payload).encode("utf-8")
+        for decoder_class in DECODERS:
+            try:
+                decoder = decoder_class()
+            except ImportError:
+                continue
+            record(results, "decode", decoder.name, endpoint, size, size, body_bytes,
+                   lambda: decoder.decode(body), repeat)
+
+    if "result" in only:
+        record(results, "result", "Result", endpoint, size, size, body_bytes,
+               lambda: Result(200, "OK", payload, "etag"), repeat)
+
+    if "from_dict" in only:
+        record(results, "from_dict", model.__name__, endpoint, size, size, body_bytes,
+               lambda: [model.from_dict(item) for item in items], repeat)
+        links = [link for item in items for link in item["links"]]
+        record(results, "from_dict", "Link", endpoint, size, len(links), 0,
+               lambda: [Link.from_dict(link) for link in links], repeat)
+        for nested_model, key in nested:
+            children = [child for item in items for child in item[key]]
+            record(results, "from_dict", nested_model.__name__, endpoint, size, len(children), 0,
+                   lambda: [nested_model.from_dict(child) for child in children], repeat)
+
+    if "to_dict" in only:
+        models = [model.from_dict(item) for item in items]
+        record(results, "to_dict", model.__name__, endpoint, size, size, body_bytes,
+               lambda: [m.to_dict() for m in models], repeat)
+
+    if "analytics" in only and endpoint == "weather-sensor-sites" and weather_analytics.np is not None:
+        sites = [model.from_dict(item) for item in items]
+        record(results, "analytics", "WeatherFrame.from_sites", endpoint, size, size, 0,
+               lambda: WeatherFrame.from_sites(sites), repeat)
+        frame = WeatherFrame.from_sites(sites)
+        record(results, "analytics", "WeatherFrame stats", endpoint, size, size, 0,
+               lambda: (frame.temperature_stats(), frame.icing_risk(), frame.top_severe()), repeat)
+
+    if "get" in only:
+        stub.set_results(endpoint, items)
+        get = getattr(client, method)
+        record(results, "get", method, endpoint, size, size, body_bytes,
+               lambda: get(params=QueryParams(page_all=True)), repeat)
+
+
+def run(sizes, repeat, only):
+    results = []
+    with OHGOStubServer() as stub:
+        client = OHGOClient("benchmark", hostname=stub.hostname)
+        for endpoint in ENDPOINTS:
+            for size_arg in sizes:
+                run_endpoint(results, endpoint, size_arg, repeat, only, stub, client)
+
+    if "query_params" in only:
+        def to_dicts():
+            for _ in range(QUERY_PARAMS_ITERATIONS):
+                for params in QUERY_PARAMS:
+                    params.to_dict()
+
+        record(results, "query_params", "QueryParams.to_dict", "-", len(QUERY_PARAMS),
+               QUERY_PARAMS_ITERATIONS * len(QUERY_PARAMS), 0, to_dicts, repeat)
+    return results
+
+
+def _key(row):
+    return row["name"], row["target"], row["endpoint"], row["size"]
+
+
+def print_table(results, baseline=None):
+    previous = {_key(row): row for row in baseline or []}
+    header = "{:<13} {:<26} {:<21} {:>6} {:>11} {:>13} {:>8} {:>10}".format(
+        "benchmark", "target", "endpoint", "size", "best ms", "items/s", "MB/s", "peak KiB")
+    if baseline is not None:
+        header += " {:>8}".format("vs base")
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        line = "{:<13} {:<26} {:<21} {:>6} {:>11.3f} {:>13,.0f} {:>8} {:>10,.1f}".format(
+            row["name"], row["target"], row["endpoint"], row["size"], row["best_s"] * 1000, row["items_per_s"],
+            "{:.1f}".format(row["mb_per_s"]) if row["mb_per_s"] else "-", row["peak_kb"])
+        if baseline is not None:
+            old = previous.get(_key(row))
+            line += " {:>8}".format("{:.2f}x".format(old["best_s"] / row["best_s"]) if old and row["best_s"] else "-")
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ohgo parsing and request handling.")
+    parser.add_argument("--sizes", default="1,50,500,all",
+                        help="Comma separated result counts per endpoint, 'all' is a full statewide page-all payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark, the best run is reported")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help="Comma separated subset of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--json", help="Write results to this file for later comparison")
+    parser.add_argument("--compare", help="A results file from a previous run to compare against (>1x is faster)")
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(","))
+    unknown = only - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+
+    results = run(args.sizes.split(","), args.repeat, only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version, "created": datetime.now().isoformat(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,14 @@
-from ohgo.ohgo_client import OHGOClient
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ohgo.ohgo_client import OHGOClient
+
+__all__ = ["OHGOClient"]
+
+
+def __getattr__(name):
+    # Submodules are loaded on first use so "import ohgo" stays cheap
+    if name == "OHGOClient":
+        from ohgo.ohgo_client import OHGOClient
+        return OHGOClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
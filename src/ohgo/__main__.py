@@ -0,0 +1,48 @@
+import argparse
+import logging
+import os
+
+
+def serve(args):
+    from ohgo.ohgo_client import OHGOClient
+    from ohgo.proxy import OHGOProxy
+    from ohgo.shared_cache import SharedCache
+
+    if not args.api_key:
+        raise SystemExit("An API key is required, pass --api-key or set OHGO_API_KEY")
+    client = OHGOClient(api_key=args.api_key, hostname=args.upstream)
+    cache = SharedCache(args.cache or ":memory:", ttl=args.ttl, max_entries=args.max_entries)
+    proxy = OHGOProxy(client, args.host, args.port, cache, upstream_workers=args.upstream_workers)
+    print("Serving {} on {}/api/v1/".format(proxy.upstream_url, proxy.hostname))
+    proxy.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ohgo", description="Tools for the OHGO API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run a local caching proxy for the OHGO API",
+                                       description="Serve the OHGO v1 API routes locally from a shared cache, so "
+                                                   "every service on a cluster shares one API key and upstream feed.")
+    serve_parser.add_argument("--api-key", default=os.environ.get("OHGO_API_KEY"),
+                              help="OHGO API key, defaults to $OHGO_API_KEY")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--upstream", default="publicapi.ohgo.com", help="Hostname of the OHGO API")
+    serve_parser.add_argument("--ttl", type=float, default=30.0,
+                              help="Seconds a response is served before it is revalidated")
+    serve_parser.add_argument("--cache", help="SQLite file to share the cache between proxy processes, "
+                                              "defaults to an in-memory cache")
+    serve_parser.add_argument("--max-entries", type=int, default=1000, help="Maximum number of cached responses")
+    serve_parser.add_argument("--upstream-workers", type=int, default=4,
+                              help="Concurrent requests (and connections) to the OHGO API")
+    serve_parser.add_argument("--log-level", default="WARNING")
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from ohgo.exceptions import OHGOException
+from ohgo.models import QueryParams
+from ohgo.ohgo_client import OHGOClient
+from ohgo.planner import ENDPOINTS
+
+logger = logging.getLogger(__name__)
+
+# client method -> endpoint, e.g. "get_cameras" -> "cameras"
+METHODS = {method: endpoint for endpoint, (method, _) in ENDPOINTS.items()}
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker stops calls to a failing upstream. After failure_threshold consecutive failures the circuit opens
+    and calls are refused for reset_timeout seconds. Then one trial call is let through (half open): success closes
+    the circuit, failure opens it again.
+
+    Attributes:
+    state: "closed", "open" or "half-open"
+
+    Methods:
+    allow: Returns whether a call may be made now
+    record_success: Records a successful call
+    record_failure: Records a failed call
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Constructor for CircuitBreaker.
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may be made now. While half open only one trial call is allowed at a time.
+        """
+        with self._lock:
+            if self._opened is None:
+                return True
+            if time.monotonic() - self._opened < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        """
+        Records a successful call, closing the circuit
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = False
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the circuit after failure_threshold in a row or a failed trial call
+        """
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+            self._trial = False
+
+
+class _Entry:
+    # A cached list result
+    __slots__ = ("result", "etag", "fetched", "refreshing")
+
+    def __init__(self, result, fetched: float):
+        self.result = result
+        self.etag = result.etag
+        self.fetched = fetched
+        self.refreshing: Optional[Future] = None
+
+
+class SWRCache:
+    """
+    SWRCache serves list results stale-while-revalidate. A result younger than fresh_for seconds is returned as is. A
+    result younger than stale_for seconds is returned immediately and refreshed on a background thread (with its ETag,
+    so unchanged results cost a 304), so callers do not wait on the OHGO API. Older or missing results are fetched
+    before returning.
+
+    If the API fails, the last good result is served whatever its age, and a CircuitBreaker stops requests to the
+    failing API until it recovers. Concurrent callers needing the same missing or expired result share one request.
+    At most max_entries results are kept, the least recently used are evicted first.
+
+    It has the get_* list methods of OHGOClient, e.g. cache.get_cameras(params).
+
+    Attributes:
+    breaker: The CircuitBreaker guarding the API
+    stats: Counters of fresh, stale and failed-over (served stale after an error) results, fetches, refreshes and
+    callers that shared a concurrent fetch
+
+    Methods:
+    get: Returns the list result of an endpoint
+    age: Returns the age of a cached result
+    refresh: Refreshes a cached result in the background
+    clear: Empties the cache
+    """
+
+    def __init__(self, client: OHGOClient, fresh_for: float = 30.0, stale_for: float = 300.0,
+                 breaker: CircuitBreaker = None, max_workers: int = 4, max_entries: int = 1000):
+        """
+        Constructor for SWRCache.
+        :param client: The OHGOClient used to fetch
+        :param fresh_for: Seconds a result is served without refreshing it
+        :param stale_for: Seconds a result is served while it is refreshed in the background. Older results are fetched
+        before returning, unless the API is failing.
+        :param breaker: (optional) The CircuitBreaker guarding the API, defaults to opening after 5 failures for 30s
+        :param max_workers: The maximum number of concurrent background refreshes
+        :param max_entries: The maximum number of cached results, e.g. one per endpoint and params
+        """
+        if fresh_for > stale_for:
+            raise OHGOException("fresh_for must not be greater than stale_for")
+        self._client = client
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.breaker = breaker or CircuitBreaker()
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ohgo-swr")
+        # Insertion order is recency order, the least recently used entry is first
+        self._entries: Dict[Tuple, _Entry] = {}
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "failed_over": 0, "fetched": 0, "refreshed": 0, "shared": 0}
+
+    @staticmethod
+    def _key(endpoint: str, params: Optional[QueryParams]) -> Tuple:
+        if endpoint not in ENDPOINTS:
+            raise OHGOException(f"Unknown endpoint {endpoint}")
+        return endpoint, tuple(sorted((key, str(value)) for key, value in dict(params or {}).items()))
+
+    def get(self, endpoint: str, params: QueryParams = None):
+        """
+        Returns the list result of an endpoint
+        :param endpoint: The endpoint, e.g. "cameras"
+        :param params: (optional) The QueryParams of the query
+        :return: The list result, e.g. CameraListResult
+        """
+        key = self._key(endpoint, params)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+        now = time.monotonic()
+        if entry is not None:
+            age = now - entry.fetched
+            if age <= self.fresh_for:
+                self._count("fresh")
+                return entry.result
+            if age <= self.stale_for:
+                self._count("stale")
+                self._refresh(key, params)
+                return entry.result
+        try:
+            return self._fetch_shared(key, params, entry)
+        except (OHGOException, OSError):  # requests' connection errors are OSErrors
+            if entry is None:
+                raise
+            logger.warning(f"Serving {endpoint} from {now - entry.fetched:.0f}s ago, the OHGO API is failing")
+            self._count("failed_over")
+            return entry.result
+
+    def __getattr__(self, name: str):
+        endpoint = METHODS.get(name)
+        if endpoint is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        def get(params: QueryParams = None):
+            return self.get(endpoint, params)
+        get.__doc__ = f"Returns the {endpoint} list result, see SWRCache.get"
+        return get
+
+    def age(self, endpoint: str, params: QueryParams = None) -> Optional[float]:
+        """
+        Returns the seconds since a result was last fetched or revalidated, None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(endpoint, params))
+        return None if entry is None else time.monotonic() - entry.fetched
+
+    def refresh(self, endpoint: str, params: QueryParams = None) -> Optional[Future]:
+        """
+        Refreshes a cached result in the background, e.g. to warm it before it goes stale
+        :return: The Future of the refresh, None if the result is not cached or the circuit is open
+        """
+        return self._refresh(self._key(endpoint, params), params)
+
+    def clear(self):
+        """
+        Empties the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _refresh(self, key: Tuple, params: Optional[QueryParams]) -> Optional[Future]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.refreshing is not None:
+                return entry.refreshing
+            if not self.breaker.allow():
+                return None
+            entry.refreshing = self._executor.submit(self._revalidate, key, params, entry)
+            return entry.refreshing
+
+    def _revalidate(self, key: Tuple, params: Optional[QueryParams], entry: _Entry):
+        try:
+            self._fetch(key, params, entry, guarded=False)
+            self._count("refreshed")
+        except Exception as e:  # Also model parsing errors, the future of a refresh is rarely read
+            logger.warning(f"Background refresh of {key[0]} failed: {e!r}")
+        finally:
+            entry.refreshing = None
+
+    def _fetch_shared(self, key: Tuple, params: Optional[QueryParams], entry: Optional[_Entry]):
+        # The first caller fetches, concurrent callers for the same key wait for its result (or error)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["shared"] += 1
+        if not owner:
+            return future.result()
+        try:
+            result = self._fetch(key, params, entry)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, key: Tuple, params: Optional[QueryParams], entry: _Entry = None, guarded: bool = True):
+        # guarded is False when the caller already passed breaker.allow()
+        if guarded and not self.breaker.allow():
+            raise OHGOException(f"Circuit open, not calling the OHGO API for {key[0]}")
+        method, _ = ENDPOINTS[key[0]]
+        succeeded = False
+        try:
+            result = getattr(self._client, method)(params=params, etag=entry.etag if entry else None)
+            succeeded = True
+        finally:
+            # Every outcome is recorded, an unexpected error must not leave a half-open trial call pending forever
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        fetched = time.monotonic()
+        with self._lock:
+            current = entry or self._entries.get(key)
+            self._entries.pop(key, None)
+            if result.cached and current is not None:
+                # 304, the cached result is still current. Re-inserted in case it was evicted during the request.
+                current.fetched = fetched
+                self._entries[key] = current
+                self._evict()
+                return current.result
+            self._entries[key] = _Entry(result, fetched)
+            self._evict()
+            self.stats["fetched"] += 1
+        return result
+
+    def _evict(self):
+        # Called with the lock held
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def close(self):
+        """
+        Waits for background refreshes and shuts down their threads
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,96 @@
+import json
+from typing import Any, Union
+
+from ohgo.exceptions import OHGOException
+
+
+class JSONDecoder:
+    """
+    JSONDecoder decodes OHGO API response bodies. Subclasses wrap faster optional JSON libraries. All decoders take
+    the raw response bytes so no intermediate text copy is made.
+
+    Attributes:
+    name: The name of the decoder, used to select it by name
+
+    Methods:
+    decode: Decodes JSON bytes into Python objects
+    """
+
+    name = "json"
+
+    def decode(self, data: bytes) -> Any:
+        """
+        Decodes a JSON document. The stdlib decoder detects the UTF encoding of bytes itself.
+        :param data: The raw JSON bytes
+        :return: The decoded document
+        """
+        return json.loads(data)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class OrjsonDecoder(JSONDecoder):
+    """
+    JSONDecoder backed by orjson (pip install orjson), usually several times faster than the stdlib.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+
+    def decode(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+class UjsonDecoder(JSONDecoder):
+    """
+    JSONDecoder backed by ujson (pip install ujson).
+    """
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._loads = ujson.loads
+
+    def decode(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+# Tried in order by default_decoder, the stdlib decoder is always available
+DECODERS = [OrjsonDecoder, UjsonDecoder, JSONDecoder]
+
+
+def get_decoder(decoder: Union[str, JSONDecoder, None] = None) -> JSONDecoder:
+    """
+    Resolves a decoder argument into a JSONDecoder
+    :param decoder: A JSONDecoder, the name of one ("orjson", "ujson" or "json"), or None for the fastest installed
+    :return: A JSONDecoder
+    """
+    if decoder is None:
+        return default_decoder()
+    if isinstance(decoder, JSONDecoder):
+        return decoder
+    for decoder_class in DECODERS:
+        if decoder_class.name == decoder:
+            try:
+                return decoder_class()
+            except ImportError as e:
+                raise OHGOException(f"JSON decoder {decoder} is not installed") from e
+    raise OHGOException(f"Unknown JSON decoder {decoder}")
+
+
+def default_decoder() -> JSONDecoder:
+    """
+    Returns the fastest installed decoder, falling back to the stdlib json module
+    :return: A JSONDecoder
+    """
+    for decoder_class in DECODERS:
+        try:
+            return decoder_class()
+        except ImportError:
+            continue
+    return JSONDecoder()
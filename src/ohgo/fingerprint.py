@@ -0,0 +1,283 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ohgo.exceptions import OHGOException
+from ohgo.image_handler import decode
+from ohgo.models import CameraView
+from ohgo.ohgo_client import OHGOClient
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, pip install ohgo[analytics]. The hash falls back to pure Python.
+    np = None
+
+HASH_SIZE = 8
+# Frames with a grayscale standard deviation at or below this are blank (black, grey or a solid color slate)
+BLANK_STDDEV = 4.0
+# Frames whose hashes differ in at most this many bits are the same picture (JPEG noise and timestamp overlays)
+FROZEN_DISTANCE = 4
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """
+    Fingerprint is the perceptual hash and brightness statistics of a frame.
+
+    Attributes:
+    hash: The difference hash, HASH_SIZE * HASH_SIZE bits
+    mean: The mean grayscale brightness, 0 to 255
+    stddev: The grayscale standard deviation, near 0 for blank frames
+
+    Methods:
+    distance: The number of hash bits that differ from another Fingerprint
+    """
+    hash: int
+    mean: float
+    stddev: float
+
+    def distance(self, other: "Fingerprint") -> int:
+        return bin(self.hash ^ other.hash).count("1")
+
+    @property
+    def blank(self) -> bool:
+        return self.stddev <= BLANK_STDDEV
+
+
+def fingerprint(data: bytes, hash_size: int = HASH_SIZE) -> Fingerprint:
+    """
+    Computes the difference hash (dHash) of an image: the frame is decoded at reduced resolution, shrunk to
+    (hash_size + 1) x hash_size grayscale pixels and each bit records whether a pixel is brighter than its left
+    neighbour. Similar pictures have hashes that differ in few bits.
+    :param data: The encoded image
+    :param hash_size: The hash is hash_size * hash_size bits
+    :return: The Fingerprint of the image
+    """
+    from PIL import Image
+    gray = decode(data, (hash_size * 8, hash_size * 8)).convert("L")
+    small = gray.resize((hash_size + 1, hash_size), Image.BILINEAR)
+    if np is not None:
+        pixels = np.asarray(small, dtype=np.int16)
+        bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+        values = np.asarray(gray, dtype=np.float32)
+        return Fingerprint(int.from_bytes(bits.tobytes(), "big"), float(values.mean()), float(values.std()))
+
+    from PIL import ImageStat
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column + 1] > pixels[offset + column])
+    stat = ImageStat.Stat(gray)
+    return Fingerprint(value, stat.mean[0], stat.stddev[0])
+
+
+class FrameStatus(Enum):
+    """
+    FrameStatus is an Enum for what a new frame of a camera view shows.
+
+    Attributes:
+    CHANGED: The picture changed since the last frame
+    FROZEN: The picture is the same as the last frame
+    BLANK: The frame is a solid color
+    DUPLICATE: The frame is the same picture another view is serving, e.g. a shared "camera unavailable" slate
+    """
+    CHANGED = "changed"
+    FROZEN = "frozen"
+    BLANK = "blank"
+    DUPLICATE = "duplicate"
+
+
+@dataclass
+class ViewStats:
+    """
+    ViewStats are the staleness statistics of one camera view.
+
+    Attributes:
+    frames: The number of frames observed
+    changed / frozen / blank / duplicate: The number of frames with each FrameStatus
+    errors: The number of fetches that failed
+    last_status: The FrameStatus of the last frame
+    last_changed: When the picture last changed, seconds since the epoch
+    last_seen: When the last frame was observed, seconds since the epoch
+    stale_polls: The number of stale (not changed) frames in a row
+    interval: The current poll interval in seconds
+    next_poll: When the view is next due, seconds since the epoch
+    """
+    frames: int = 0
+    changed: int = 0
+    frozen: int = 0
+    blank: int = 0
+    duplicate: int = 0
+    errors: int = 0
+    last_status: Optional[FrameStatus] = None
+    last_changed: Optional[float] = None
+    last_seen: Optional[float] = None
+    stale_polls: int = 0
+    interval: float = 0.0
+    next_poll: float = 0.0
+
+    @property
+    def stale_seconds(self) -> float:
+        """
+        Seconds the picture has not changed for, as of the last frame
+        """
+        if self.last_changed is None or self.last_seen is None:
+            return 0.0
+        return self.last_seen - self.last_changed
+
+
+class FrameMonitor:
+    """
+    FrameMonitor fingerprints camera frames and detects views serving frozen, blank or duplicate frames. Stale views
+    back off: each stale frame in a row multiplies the poll interval by backoff up to max_interval, and a changed frame
+    resets it to min_interval. poll only fetches the views that are due, so frozen cameras stop costing bandwidth.
+
+    FrameMonitor(client) attaches the monitor to the client's image_handler, so every image fetched through it is
+    observed too, not only the frames fetched by poll: client.get_image, client.get_images, ImagePipeline and
+    MosaicRenderer.
+
+    Attributes:
+    stats: ViewStats by image URL
+
+    Methods:
+    observe: Classifies a frame of a view and updates its stats and poll interval
+    record_error: Counts a failed fetch of a view and schedules its next poll
+    due: Returns the views due for a poll
+    poll: Fetches the views that are due through the client, which observes them
+    stale: Returns the URLs of views whose last frame was stale
+    """
+
+    def __init__(self, client: OHGOClient = None, min_interval: float = 5.0, max_interval: float = 600.0,
+                 backoff: float = 2.0, frozen_distance: int = FROZEN_DISTANCE, view_size: str = "small",
+                 max_workers: int = 8):
+        """
+        Constructor for FrameMonitor.
+        :param client: (optional) The OHGOClient to attach to, used by poll to fetch images
+        :param min_interval: The poll interval of views whose picture changes, in seconds
+        :param max_interval: The longest poll interval of stale views, in seconds
+        :param backoff: The factor the interval grows by per stale frame
+        :param frozen_distance: Frames whose hashes differ in at most this many bits are the same picture
+        :param view_size: Which CameraView image to fetch, "small" or "large"
+        :param max_workers: The maximum number of concurrent image fetches in poll
+        """
+        self._image_handler = client.image_handler if client else None
+        if self._image_handler is not None:
+            if self._image_handler.frame_monitor not in (None, self):
+                raise OHGOException("The client already has a FrameMonitor")
+            self._image_handler.frame_monitor = self
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.frozen_distance = frozen_distance
+        self.view_size = view_size
+        self._max_workers = max_workers
+        self.stats: Dict[str, ViewStats] = {}
+        self._last: Dict[str, Fingerprint] = {}
+        # hash -> URL of the view whose latest frame has it, to spot views serving the same picture
+        self._owners: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _url(self, view: Union[CameraView, str]) -> str:
+        if isinstance(view, CameraView):
+            return view.small_url if self.view_size == "small" else view.large_url
+        return view
+
+    def observe(self, view: Union[CameraView, str], data: bytes, timestamp: float = None) -> FrameStatus:
+        """
+        Classifies a frame of a view and updates its stats and poll interval
+        :param view: The CameraView (or image URL) the frame came from
+        :param data: The encoded frame
+        :param timestamp: (optional) When the frame was fetched, seconds since the epoch. Defaults to now.
+        :return: The FrameStatus of the frame
+        """
+        frame = fingerprint(data)
+        timestamp = time.time() if timestamp is None else timestamp
+        url = self._url(view)
+        with self._lock:
+            stats = self.stats.setdefault(url, ViewStats())
+            previous = self._last.get(url)
+            owner = self._owners.get(frame.hash)
+            if frame.blank:
+                status = FrameStatus.BLANK
+            elif owner is not None and owner != url:
+                status = FrameStatus.DUPLICATE
+            elif previous is not None and frame.distance(previous) <= self.frozen_distance:
+                status = FrameStatus.FROZEN
+            else:
+                status = FrameStatus.CHANGED
+
+            # A view repeating its own frame keeps owning it, so other views serving it stay duplicates
+            if previous is not None and previous.hash != frame.hash and self._owners.get(previous.hash) == url:
+                del self._owners[previous.hash]
+            if owner is None:
+                self._owners[frame.hash] = url
+            self._last[url] = frame
+
+            stats.frames += 1
+            setattr(stats, status.value, getattr(stats, status.value) + 1)
+            stats.last_status = status
+            stats.last_seen = timestamp
+            if status is FrameStatus.CHANGED or stats.last_changed is None:
+                stats.last_changed = timestamp
+            stats.stale_polls = 0 if status is FrameStatus.CHANGED else stats.stale_polls + 1
+            stats.interval = min(self.min_interval * self.backoff ** stats.stale_polls, self.max_interval)
+            stats.next_poll = timestamp + stats.interval
+        return status
+
+    def due(self, views: Iterable[Union[CameraView, str]], now: float = None) -> List[Union[CameraView, str]]:
+        """
+        Returns the views due for a poll, views never observed are always due
+        :param views: CameraViews or image URLs
+        :param now: (optional) Seconds since the epoch, defaults to now
+        :return: The views that are due
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return [view for view in views
+                    if self.stats.get(self._url(view)) is None or self.stats[self._url(view)].next_poll <= now]
+
+    def record_error(self, view: Union[CameraView, str], timestamp: float = None):
+        """
+        Counts a failed fetch or decode of a view and schedules its next poll after its current interval
+        :param view: The CameraView (or image URL)
+        :param timestamp: (optional) When the fetch failed, seconds since the epoch. Defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            stats = self.stats.setdefault(self._url(view), ViewStats())
+            stats.errors += 1
+            stats.next_poll = timestamp + (stats.interval or self.min_interval)
+
+    def poll(self, views: Iterable[Union[CameraView, str]]) -> List[Tuple[Union[CameraView, str], FrameStatus]]:
+        """
+        Fetches the views that are due through the client, which observes them. Views whose fetch or decode fails are
+        skipped and counted as errors.
+        :param views: CameraViews or image URLs
+        :return: (view, FrameStatus) of every view observed
+        """
+        if self._image_handler is None:
+            raise OHGOException("FrameMonitor needs a client to poll")
+        due = self.due(views)
+
+        def check(view):
+            url = self._url(view)
+            if self._image_handler.fetch(url) is None:
+                return None
+            with self._lock:
+                return view, self.stats[url].last_status
+
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="ohgo-frames") as executor:
+            return [result for result in executor.map(check, due) if result is not None]
+
+    def stale(self) -> List[str]:
+        """
+        Returns the image URLs of views whose last frame was frozen, blank or a duplicate
+        """
+        with self._lock:
+            return [url for url, stats in self.stats.items()
+                    if stats.last_status is not None and stats.last_status is not FrameStatus.CHANGED]
@@ -1,8 +1,48 @@
-from typing import Union
+import logging
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional, Tuple, Union
 
 from ohgo.exceptions import OHGOException
 from ohgo.rest_adapter import RestAdapter
-from PIL import Image
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from ohgo.fingerprint import FrameMonitor
+
+logger = logging.getLogger(__name__)
+
+
+def decode(data: bytes, size: Optional[Tuple[int, int]] = None) -> "Image.Image":
+    """
+    Decodes image bytes. With a size, JPEGs are decoded at reduced resolution (draft mode scales by 1/2 to 1/8 while
+    decoding, which is much cheaper than a full decode) and the image is then shrunk to fit within size.
+    :param data: The encoded image
+    :param size: (optional) The (width, height) the image must fit within, aspect ratio is kept
+    :return: A PIL Image object in RGB mode
+    """
+    from PIL import Image
+    image = Image.open(BytesIO(data))
+    if size:
+        image.draft("RGB", size)
+    image = image.convert("RGB")
+    if size:
+        image.thumbnail(size, Image.BILINEAR)
+    return image
+
+
+def thumbnail(data: bytes, size: Tuple[int, int], image_format: str = "WEBP", quality: int = 80) -> bytes:
+    """
+    Decodes image bytes at reduced resolution, shrinks the image to fit within size and encodes it again. Module level
+    so it can run in a process pool.
+    :param data: The encoded image
+    :param size: The (width, height) the thumbnail must fit within, aspect ratio is kept
+    :param image_format: The PIL format to encode, e.g. "WEBP", "JPEG" or "PNG"
+    :param quality: The encoder quality for lossy formats
+    :return: The encoded thumbnail
+    """
+    output = BytesIO()
+    decode(data, size).save(output, image_format, quality=quality)
+    return output.getvalue()
 
 
 class ImageHandler:
@@ -11,26 +51,57 @@ class ImageHandler:
 
     Attributes:
     _rest_adapter: RestAdapter for making HTTP requests to the OHGO API
+    frame_monitor: The FrameMonitor every fetched frame is observed by, if any
 
     Methods:
     fetch: Fetches an image from a URL
+    fetch_bytes: Fetches the encoded bytes of an image from a URL
     """
 
-    def __init__(self, rest_adapter: RestAdapter):
+    def __init__(self, rest_adapter: RestAdapter, frame_monitor: "FrameMonitor" = None):
         """
         Constructor for ImageHandler. Initializes the RestAdapter for making HTTP requests to the OHGO API.
         :param rest_adapter: RestAdapter for making HTTP requests to the OHGO API
+        :param frame_monitor: (optional) A FrameMonitor to observe every fetched frame, to detect frozen, blank and
+        duplicate cameras
         """
         self._rest_adapter = rest_adapter
+        self.frame_monitor = frame_monitor
 
-    def fetch(self, url: str) -> Union[Image.Image, None]:
+    def fetch(self, url: str) -> Union["Image.Image", None]:
         """
-        Fetches an image from a URL. Returns None if the image cannot be fetched.
+        Fetches an image from a URL. Returns None if the image cannot be fetched, or with a frame monitor, cannot be
+        decoded.
         :param url: A string URL to fetch the image from.
         :return: A PIL Image object
         """
         try:
-            image_bytes = self._rest_adapter.get_image(url)
+            data = self.fetch_bytes(url)
         except OHGOException:
             return None
-        return Image.open(image_bytes)
+        # Imported here so PIL is only loaded when images are used
+        from PIL import Image
+        return Image.open(BytesIO(data))
+
+    def fetch_bytes(self, url: str) -> bytes:
+        """
+        Fetches the encoded bytes of an image from a URL, for callers that decode images themselves. Like fetch, the
+        image goes through the image store and is observed by the frame monitor.
+        :param url: A string URL to fetch the image from.
+        :return: The encoded image
+        :raises OHGOException: If the image cannot be fetched, or with a frame monitor, cannot be decoded
+        """
+        try:
+            data = self._rest_adapter.get_image(url).getvalue()
+        except OHGOException:
+            if self.frame_monitor is not None:
+                self.frame_monitor.record_error(url)
+            raise
+        if self.frame_monitor is not None:
+            try:
+                self.frame_monitor.observe(url, data)
+            except OSError as e:  # PIL raises UnidentifiedImageError (an OSError) for corrupt images
+                logger.warning(f"Could not decode the frame from {url}: {e}")
+                self.frame_monitor.record_error(url)
+                raise OHGOException(f"Could not decode the image from {url}: {e}") from e
+        return data
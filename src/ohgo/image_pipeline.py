@@ -0,0 +1,141 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from ohgo.image_handler import thumbnail
+from ohgo.models import Camera, CameraView
+from ohgo.ohgo_client import OHGOClient
+
+
+@dataclass
+class ProcessedImage:
+    """
+    ProcessedImage is the result of one image in an ImagePipeline.
+
+    Attributes:
+    source: The URL or CameraView the image came from
+    url: The URL of the image
+    data: The encoded thumbnail, None if fetching or decoding failed
+    error: The error message if fetching or decoding failed
+    """
+    source: Any
+    url: str
+    data: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+class ImagePipeline:
+    """
+    ImagePipeline fetches images in a thread pool and decodes, resizes and re-encodes them in a process pool, so
+    thumbnailing uses every core. JPEGs are decoded at reduced resolution (draft mode). At most max_pending images are
+    fetched but not yet consumed, so a slow consumer pauses fetching instead of buffering every image. Results are
+    yielded as they finish, not in input order.
+
+    Methods:
+    process: Processes images, yielding ProcessedImage results as they finish
+    close: Shuts down the pools
+    """
+
+    def __init__(self, client: OHGOClient, size: Tuple[int, int] = (320, 240), image_format: str = "WEBP",
+                 quality: int = 80, view_size: str = "large", fetch_workers: int = 8, processes: int = None,
+                 max_pending: int = None):
+        """
+        Constructor for ImagePipeline.
+        :param client: The OHGOClient used to fetch images
+        :param size: The (width, height) thumbnails must fit within
+        :param image_format: The PIL format of the thumbnails, e.g. "WEBP" or "JPEG"
+        :param quality: The encoder quality
+        :param view_size: Which CameraView image to fetch, "small" or "large"
+        :param fetch_workers: The number of fetching threads
+        :param processes: The number of decoding processes, defaults to the number of CPUs
+        :param max_pending: The maximum number of images in flight, defaults to 4 per process
+        """
+        self._image_handler = client.image_handler
+        self.size = size
+        self.image_format = image_format
+        self.quality = quality
+        self.view_size = view_size
+        processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * processes
+        self._fetchers = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="ohgo-image-fetch")
+        self._decoders = ProcessPoolExecutor(max_workers=processes)
+
+    def _urls(self, sources: Iterable) -> Iterator[Tuple[Any, str]]:
+        for source in sources:
+            if isinstance(source, Camera):
+                yield from self._urls(source.camera_views)
+            elif isinstance(source, CameraView):
+                yield source, source.large_url if self.view_size == "large" else source.small_url
+            else:
+                yield source, source
+
+    def process(self, sources: Iterable) -> Iterator[ProcessedImage]:
+        """
+        Fetches and thumbnails images, yielding results as they finish
+        :param sources: URLs, CameraViews or Cameras (every view is processed)
+        :return: An iterator of ProcessedImage
+        """
+        results: "queue.Queue[ProcessedImage]" = queue.Queue()
+        slots = threading.Semaphore(self.max_pending)
+        stopped = threading.Event()
+        submitted = [0]
+        done_submitting = threading.Event()
+
+        def decoded(future: Future, source, url):
+            try:
+                results.put(ProcessedImage(source, url, data=future.result()))
+            except Exception as e:  # Decoder errors come back from the worker process
+                results.put(ProcessedImage(source, url, error=f"Failed to decode image: {e}"))
+
+        def fetch(source, url):
+            try:
+                data = self._image_handler.fetch_bytes(url)
+                future = self._decoders.submit(thumbnail, data, self.size, self.image_format, self.quality)
+            except Exception as e:  # Every image must produce a result, or the consumer waits for it forever
+                results.put(ProcessedImage(source, url, error=str(e) or type(e).__name__))
+                return
+            future.add_done_callback(lambda f: decoded(f, source, url))
+
+        def produce():
+            try:
+                for source, url in self._urls(sources):
+                    slots.acquire()
+                    if stopped.is_set():
+                        return
+                    submitted[0] += 1
+                    self._fetchers.submit(fetch, source, url)
+            finally:
+                done_submitting.set()
+                results.put(None)  # Wakes the consumer to recheck whether everything was yielded
+
+        producer = threading.Thread(target=produce, name="ohgo-image-producer", daemon=True)
+        producer.start()
+        yielded = 0
+        try:
+            while not (done_submitting.is_set() and yielded == submitted[0]):
+                item = results.get()
+                if item is None:
+                    continue
+                yielded += 1
+                slots.release()
+                yield item
+        finally:
+            stopped.set()
+            # Unblock the producer if the consumer stopped early
+            slots.release()
+
+    def close(self):
+        """
+        Shuts down the fetching threads and decoding processes
+        """
+        self._fetchers.shutdown(wait=True)
+        self._decoders.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
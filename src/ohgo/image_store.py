@@ -0,0 +1,218 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS fetches (
+    url TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fetches_url ON fetches (url, fetched);
+CREATE INDEX IF NOT EXISTS fetches_hash ON fetches (hash);
+"""
+
+
+class ImageStore:
+    """
+    ImageStore is a content-addressed on-disk image store. Each unique image is written once, named by its sha256, and
+    a SQLite index maps every (URL, fetch time) to the hash, so the same sign image on many signs or a frozen camera
+    frame over many polls costs no extra disk. When the images exceed max_bytes the least recently used are evicted
+    together with the fetches pointing at them.
+
+    Fetch history is kept compact: a run of fetches of a URL returning the same image is stored as its first and last
+    fetch, and fetches older than max_history seconds are pruned.
+
+    Pass it to OHGOClient(image_store=...) to store every fetched image. Images fetched less than max_age seconds ago
+    are then read from disk instead of the network.
+
+    Attributes:
+    path: The directory of the store
+    max_bytes: The maximum total size of the stored images
+    max_age: Seconds a fetched image is served from the store, 0 to always fetch
+    max_history: Seconds fetches are kept in the history, 0 to keep them forever
+    total_bytes: The total size of the stored images
+
+    Methods:
+    put: Stores an image fetched from a URL
+    get: Reads an image by hash
+    latest: Reads the last image fetched from a URL
+    history: Lists the fetches of a URL
+    evict: Evicts least recently used images until the store fits within max_bytes
+    close: Closes the index
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, max_age: float = 0.0,
+                 max_history: float = 7 * 24 * 3600):
+        """
+        Constructor for ImageStore. Creates the directory and index if they do not exist.
+        :param path: The directory of the store
+        :param max_bytes: The maximum total size of the stored images, defaults to 512 MiB
+        :param max_age: Seconds a fetched image is served from the store by RestAdapter.get_image, defaults to 0
+        (always fetch). Camera frames change every few seconds, sign images rarely.
+        :param max_history: Seconds fetches are kept in the history, defaults to 7 days. 0 keeps them forever.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_history = max_history
+        self._next_prune = 0.0
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, digest: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.path, "objects", digest[:2], digest[2:])
+
+    def put(self, url: str, data: bytes, timestamp: float = None) -> str:
+        """
+        Stores an image fetched from a URL. The bytes are only written if no stored image has the same hash.
+        :param url: The URL the image was fetched from
+        :param data: The image bytes
+        :param timestamp: (optional) When the image was fetched, seconds since the epoch. Defaults to now.
+        :return: The sha256 hex digest of the image
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            row = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Written to a temporary file and renamed, so a crash never leaves a truncated image under its hash
+                temporary = "{}.{}.tmp".format(path, threading.get_ident())
+                with open(temporary, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, path)
+                self.total_bytes += len(data)
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO blobs (hash, size, last_access) VALUES (?, ?, ?)",
+                                 (digest, len(data), time.time()))
+                self._record_fetch(url, timestamp, digest)
+            self._prune()
+            if self.total_bytes > self.max_bytes:
+                # Shrinks to 90% of the limit so eviction does not run on every put once the store is full
+                self._evict(int(self.max_bytes * 0.9))
+        return digest
+
+    def _record_fetch(self, url: str, timestamp: float, digest: str):
+        # A run of fetches returning the same image keeps its first and last row, the last one is moved forward
+        last_two = self._db.execute("SELECT rowid, fetched, hash FROM fetches WHERE url = ? ORDER BY fetched DESC "
+                                    "LIMIT 2", (url,)).fetchall()
+        if len(last_two) == 2 and last_two[0][2] == last_two[1][2] == digest and timestamp >= last_two[0][1]:
+            self._db.execute("UPDATE fetches SET fetched = ? WHERE rowid = ?", (timestamp, last_two[0][0]))
+        else:
+            self._db.execute("INSERT INTO fetches (url, fetched, hash) VALUES (?, ?, ?)", (url, timestamp, digest))
+
+    def _prune(self):
+        # Runs at most once per tenth of max_history
+        now = time.time()
+        if not self.max_history or now < self._next_prune:
+            return
+        self._next_prune = now + self.max_history / 10
+        with self._db:
+            self._db.execute("DELETE FROM fetches WHERE fetched < ?", (now - self.max_history,))
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """
+        Reads an image by hash
+        :param digest: The sha256 hex digest of the image
+        :return: The image bytes, None if the image is not stored
+        """
+        with self._lock:
+            with self._db:
+                updated = self._db.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), digest))
+            if updated.rowcount == 0:
+                return None
+            try:
+                with open(self._blob_path(digest), "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+    def latest(self, url: str, max_age: float = None) -> Optional[bytes]:
+        """
+        Reads the last image fetched from a URL
+        :param url: The URL of the image
+        :param max_age: (optional) Only return the image if it was fetched at most this many seconds ago
+        :return: The image bytes, None if the URL was not fetched (recently enough)
+        """
+        with self._lock:
+            row = self._db.execute("SELECT fetched, hash FROM fetches WHERE url = ? ORDER BY fetched DESC LIMIT 1",
+                                   (url,)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        return self.get(row[1])
+
+    def history(self, url: str, start: float = None, end: float = None) -> List[Tuple[float, str]]:
+        """
+        Lists the fetches of a URL, oldest first
+        :param url: The URL of the image
+        :param start: (optional) Earliest fetch time, seconds since the epoch
+        :param end: (optional) Latest fetch time, seconds since the epoch
+        :return: A list of (fetch time, hash). Consecutive fetches with the same hash returned the same image, runs of
+        them are stored as their first and last fetch.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT fetched, hash FROM fetches WHERE url = ? AND fetched >= ? AND fetched <= ? ORDER BY fetched",
+                (url, float("-inf") if start is None else start, float("inf") if end is None else end)).fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is not None
+
+    def evict(self, max_bytes: int = None):
+        """
+        Evicts least recently used images, and the fetches pointing at them, until the store fits within max_bytes
+        :param max_bytes: (optional) The size to shrink to, defaults to the max_bytes of the store
+        """
+        with self._lock:
+            self._evict(self.max_bytes if max_bytes is None else max_bytes)
+
+    def _evict(self, target: int):
+        evicted = []
+        for digest, size in self._db.execute("SELECT hash, size FROM blobs ORDER BY last_access").fetchall():
+            if self.total_bytes <= target:
+                break
+            evicted.append((digest,))
+            self.total_bytes -= size
+        with self._db:
+            self._db.executemany("DELETE FROM fetches WHERE hash = ?", evicted)
+            self._db.executemany("DELETE FROM blobs WHERE hash = ?", evicted)
+        for (digest,) in evicted:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """
+        Closes the index
+        """
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
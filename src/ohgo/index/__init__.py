@@ -0,0 +1,4 @@
+from .text import TextIndex, tokenize
+from .interval import IntervalTree
+from .route import RouteIndex, normalize_route, normalize_direction
+from .temporal import ScheduleIndex
@@ -0,0 +1,118 @@
+from bisect import bisect_right
+from typing import Any, Dict, Hashable, Iterator, List, Tuple
+
+NEGATIVE_INFINITY = float("-inf")
+
+
+class IntervalTree:
+    """
+    IntervalTree indexes closed intervals [start, end] by key and answers overlap and point (stabbing) queries in
+    O(log n + k) time. Intervals are kept sorted by start with a tree of the maximum end over each range, so a query
+    only descends into ranges that can contain an overlapping interval.
+
+    Adding, replacing or removing an interval is O(1) and marks the tree dirty, it is rebuilt in O(n log n) by the
+    next query. Polls change many intervals at once and are queried afterwards, so each poll pays for one rebuild.
+    Replacing the value of a key without moving its interval does not mark the tree dirty.
+
+    Methods:
+    add: Adds or replaces the interval of a key
+    remove: Removes the interval of a key
+    overlap: Returns the values of the intervals overlapping [start, end]
+    at: Returns the values of the intervals containing a point
+    """
+
+    def __init__(self):
+        """
+        Constructor for IntervalTree.
+        """
+        # key -> (start, end, value)
+        self._intervals: Dict[Hashable, Tuple[float, float, Any]] = {}
+        self._dirty = False
+        self._starts: List[float] = []
+        self._keys: List[Hashable] = []
+        self._max_end: List[float] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._intervals
+
+    def __iter__(self) -> Iterator[Tuple[Hashable, float, float, Any]]:
+        for key, (start, end, value) in self._intervals.items():
+            yield key, start, end, value
+
+    def get(self, key: Hashable) -> Tuple[float, float, Any]:
+        """
+        Returns the (start, end, value) of a key
+        """
+        return self._intervals[key]
+
+    def add(self, key: Hashable, start: float, end: float, value: Any = None):
+        """
+        Adds or replaces the interval of a key
+        :param key: A unique key, e.g. the id of the item
+        :param start: The start of the interval
+        :param end: The end of the interval, swapped with start if smaller
+        :param value: (optional) The value returned by queries, defaults to the key
+        """
+        if end < start:
+            start, end = end, start
+        current = self._intervals.get(key)
+        if current is None or current[0] != start or current[1] != end:
+            self._dirty = True
+        self._intervals[key] = (start, end, key if value is None else value)
+
+    def remove(self, key: Hashable):
+        """
+        Removes the interval of a key, if it is indexed
+        """
+        if self._intervals.pop(key, None) is not None:
+            self._dirty = True
+
+    def overlap(self, start: float, end: float) -> List:
+        """
+        Returns the values of the intervals overlapping [start, end], ordered by interval start
+        """
+        if self._dirty:
+            self._build()
+        if end < start:
+            start, end = end, start
+        # Only intervals starting at or before end can overlap, the tree finds those ending at or after start
+        limit = bisect_right(self._starts, end)
+        found = []
+        stack = [(1, 0, self._size)] if limit else []
+        while stack:
+            node, low, high = stack.pop()
+            if low >= limit or self._max_end[node] < start:
+                continue
+            if high - low == 1:
+                found.append(low)
+                continue
+            middle = (low + high) // 2
+            # Right child first, so the left child is popped first and indexes come out in order
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        return [self._intervals[self._keys[index]][2] for index in found]
+
+    def at(self, point: float) -> List:
+        """
+        Returns the values of the intervals containing a point, ordered by interval start
+        """
+        return self.overlap(point, point)
+
+    def _build(self):
+        ordered = sorted(self._intervals.items(), key=lambda entry: entry[1][:2])
+        self._keys = [key for key, _ in ordered]
+        self._starts = [interval[0] for _, interval in ordered]
+        size = 1
+        while size < len(ordered):
+            size *= 2
+        self._size = size
+        max_end = [NEGATIVE_INFINITY] * (2 * size)
+        max_end[size:size + len(ordered)] = [interval[1] for _, interval in ordered]
+        for node in range(size - 1, 0, -1):
+            max_end[node] = max(max_end[2 * node], max_end[2 * node + 1])
+        self._max_end = max_end
+        self._dirty = False
@@ -0,0 +1,305 @@
+import math
+import re
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ohgo.exceptions import OHGOException
+from ohgo.index.interval import IntervalTree
+from ohgo.models import Construction, DangerousSlowdown, Incident, TravelDelay
+from ohgo.planner import EARTH_RADIUS_MILES, distance_miles
+
+# Model -> kind
+ROUTE_KINDS = {
+    TravelDelay: "travel-delays",
+    Incident: "incidents",
+    Construction: "construction",
+    DangerousSlowdown: "dangerous-slowdowns",
+}
+
+# Spellings of each direction -> its normalized letter
+DIRECTIONS = {spelling: name[0] for name in ("NORTH", "SOUTH", "EAST", "WEST")
+              for spelling in (name[0], name[0] + "B", name, name + "BOUND")}
+
+Key = Tuple[str, str]
+# Delay midpoints of a route sorted along its longer axis: (axis, sorted coordinates, (lat, lon, mile) per coordinate,
+# the largest absolute latitude)
+DelayPoints = Tuple[int, List[float], List[Tuple[float, float, float]], float]
+
+
+def normalize_route(route_name: str) -> str:
+    """
+    Normalizes a route name, e.g. "i 71" -> "I-71"
+    """
+    return re.sub(r"[\s-]+", "-", (route_name or "").strip().upper())
+
+
+def normalize_direction(direction: Optional[str]) -> str:
+    """
+    Normalizes a direction to "N", "S", "E" or "W", e.g. "North" or "NB" -> "N". Other directions (e.g. "Both") are
+    returned upper cased.
+    """
+    direction = (direction or "").strip().upper()
+    return DIRECTIONS.get(direction, direction)
+
+
+class RouteIndex:
+    """
+    RouteIndex indexes travel delays, incidents, construction and dangerous slowdowns by route, direction and mile
+    marker, one IntervalTree per route and direction. It answers "everything affecting I-71 N between mile 100 and
+    120" and "which delay segment contains mile 112" in logarithmic time.
+
+    Travel delays carry their mile markers. The other models only have a position, so they are placed on their route
+    by interpolating between the two nearest travel delay segments of the route (pass locate to place them
+    differently). Items that cannot be placed yet, e.g. before travel delays were indexed, are retried on every update.
+    Items of an unknown or two-way direction match queries for any direction.
+
+    Methods:
+    update: Indexes a poll of items, moving only the items that changed
+    remove: Removes an item from the index
+    query: Returns the items on a route overlapping a mile range
+    segment_at: Returns the travel delay segment containing a mile marker
+    locate: Estimates the mile marker of a position on a route
+    routes: Returns the indexed (route, direction) pairs
+    """
+
+    def __init__(self, locate: Callable[[Any], Optional[float]] = None):
+        """
+        Constructor for RouteIndex.
+        :param locate: (optional) A function returning the mile marker of an incident, construction or slowdown, or
+        None if unknown. Defaults to interpolating between travel delay segments.
+        """
+        self._locate = locate
+        self._trees: Dict[Tuple[str, str], IntervalTree] = {}
+        # route -> directions with a tree
+        self._directions: Dict[str, Set[str]] = {}
+        # (kind, id) -> (route, direction) of the tree the item is in
+        self._placed: Dict[Key, Tuple[str, str]] = {}
+        # (kind, id) -> item, for items without a mile marker yet
+        self._unplaced: Dict[Key, Any] = {}
+        # route -> its travel delays for locate, rebuilt on the first locate after its delays changed
+        self._delay_points: Dict[str, DelayPoints] = {}
+
+    def __len__(self) -> int:
+        return len(self._placed) + len(self._unplaced)
+
+    @property
+    def unplaced(self) -> List:
+        """
+        The items that could not be placed on their route
+        """
+        return list(self._unplaced.values())
+
+    def routes(self) -> List[Tuple[str, str]]:
+        """
+        Returns the indexed (route, direction) pairs
+        """
+        return sorted(bucket for bucket, tree in self._trees.items() if len(tree))
+
+    def update(self, items: Iterable, complete: bool = True, kind: str = None) -> int:
+        """
+        Indexes a poll of items. Items whose route, direction and miles are unchanged only have their model replaced.
+        :param items: A TravelDelayListResult, IncidentListResult, ConstructionListResult or
+        DangerousSlowdownListResult, or any iterable of those models. Cached (304) results are ignored.
+        :param complete: If True, items is a complete poll and indexed items of the same kinds missing from it are
+        removed
+        :param kind: (optional) The kind items is a complete poll of, e.g. "incidents". Taken from the class of a list
+        result; pass it for other iterables so that an empty poll removes every item of the kind.
+        :return: The number of items added, moved or removed
+        """
+        if getattr(items, "cached", False):
+            return 0
+        kinds = {self._poll_kind(items, kind)} - {None}
+        changed = 0
+        seen: Set[Key] = set()
+        points = []
+        for item in items:
+            kind = self._kind(item)
+            key = (kind, item.id)
+            seen.add(key)
+            kinds.add(kind)
+            if isinstance(item, TravelDelay):
+                changed += self._place(key, item, item.start_mile_marker, item.end_mile_marker)
+            else:
+                points.append((key, item))
+        if complete:
+            for key in [key for key in list(self._placed) + list(self._unplaced)
+                        if key[0] in kinds and key not in seen]:
+                self.remove(*key)
+                changed += 1
+        # Points are placed after the delays of this poll, which they are interpolated between
+        for key, item in points:
+            changed += self._place_point(key, item)
+        for key, item in list(self._unplaced.items()):
+            if key not in seen:
+                self._place_point(key, item)
+        return changed
+
+    def remove(self, kind: str, item_id: str):
+        """
+        Removes an item from the index
+        :param kind: The kind of the item, e.g. "incidents"
+        :param item_id: The id of the item
+        """
+        key = (kind, item_id)
+        self._unplaced.pop(key, None)
+        bucket = self._placed.pop(key, None)
+        if bucket is not None:
+            self._trees[bucket].remove(key)
+            if kind == ROUTE_KINDS[TravelDelay]:
+                self._delay_points.pop(bucket[0], None)
+
+    def query(self, route_name: str, direction: str = None, start: float = None, end: float = None,
+              kinds: Iterable[str] = None) -> List:
+        """
+        Returns the items on a route overlapping a mile range
+        :param route_name: The route, e.g. "I-71"
+        :param direction: (optional) The direction, e.g. "N" or "North". Items of an unknown or two-way direction are
+        included. Defaults to every direction.
+        :param start: (optional) The first mile marker, defaults to the start of the route
+        :param end: (optional) The last mile marker, defaults to the end of the route
+        :param kinds: (optional) Only return items of these kinds, e.g. ["incidents", "construction"]
+        :return: The matching items, ordered by mile marker within each direction
+        """
+        route = normalize_route(route_name)
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        direction = normalize_direction(direction) if direction else None
+        kinds = set(kinds) if kinds is not None else None
+        found = []
+        for tree_direction in sorted(self._directions.get(route, ())):
+            if direction is not None and tree_direction in DIRECTIONS and tree_direction != direction:
+                continue
+            found.extend(item for item in self._trees[(route, tree_direction)].overlap(start, end)
+                         if kinds is None or self._kind(item) in kinds)
+        return found
+
+    def segment_at(self, route_name: str, direction: str, mile: float) -> Optional[TravelDelay]:
+        """
+        Returns the travel delay segment containing a mile marker
+        :param route_name: The route, e.g. "I-71"
+        :param direction: The direction, e.g. "N" or "North"
+        :param mile: The mile marker
+        :return: The shortest TravelDelay containing the mile marker, None if there is none
+        """
+        tree = self._trees.get((normalize_route(route_name), normalize_direction(direction)))
+        if tree is None:
+            return None
+        segments = [item for item in tree.at(mile) if isinstance(item, TravelDelay)]
+        if not segments:
+            return None
+        return min(segments, key=lambda delay: abs(delay.end_mile_marker - delay.start_mile_marker))
+
+    def locate(self, route_name: str, latitude: float, longitude: float) -> Optional[float]:
+        """
+        Estimates the mile marker of a position on a route by interpolating between the two nearest travel delay
+        segments of the route, weighted by distance. Delays are sorted along the longer axis of the route, so the
+        search starts at the position and stops once the axis distance alone exceeds the second nearest delay.
+        :return: The estimated mile marker, None if the route has no indexed travel delays
+        """
+        route = normalize_route(route_name)
+        points = self._delay_points.get(route)
+        if points is None:
+            points = self._delay_points[route] = self._sort_delays(route)
+        axis, coordinates, delays, max_latitude = points
+        if not delays:
+            return None
+        value = (latitude, longitude)[axis]
+        # cos of the highest latitude involved bounds how short a degree of longitude can be
+        cos_latitude = math.cos(math.radians(max(max_latitude, abs(latitude))))
+        nearest: List[Tuple[float, float]] = []
+        low, high = bisect_left(coordinates, value) - 1, bisect_left(coordinates, value)
+        while low >= 0 or high < len(coordinates):
+            if high >= len(coordinates) or (low >= 0 and value - coordinates[low] <= coordinates[high] - value):
+                index, low = low, low - 1
+            else:
+                index, high = high, high + 1
+            if len(nearest) == 2 and self._axis_miles(axis, abs(coordinates[index] - value), cos_latitude) > \
+                    nearest[1][0]:
+                break
+            delay_latitude, delay_longitude, mile = delays[index]
+            nearest.append((distance_miles(latitude, longitude, delay_latitude, delay_longitude), mile))
+            nearest = sorted(nearest)[:2]
+        if len(nearest) == 1 or nearest[0][0] == 0:
+            return nearest[0][1]
+        (d1, m1), (d2, m2) = nearest
+        return (m1 * d2 + m2 * d1) / (d1 + d2)
+
+    @staticmethod
+    def _axis_miles(axis: int, degrees: float, cos_latitude: float) -> float:
+        # A lower bound of the distance between points this many degrees of latitude (axis 0) or longitude apart
+        if axis == 0:
+            return EARTH_RADIUS_MILES * math.radians(degrees)
+        return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, cos_latitude * math.sin(math.radians(degrees) / 2)))
+
+    def _sort_delays(self, route: str) -> DelayPoints:
+        delays = [(item.latitude, item.longitude, (start + end) / 2)
+                  for direction in self._directions.get(route, ())
+                  for _, start, end, item in self._trees[(route, direction)] if isinstance(item, TravelDelay)]
+        if not delays:
+            return 0, [], [], 0.0
+        latitudes = [delay[0] for delay in delays]
+        longitudes = [delay[1] for delay in delays]
+        max_latitude = max(abs(latitude) for latitude in latitudes)
+        lat_span = max(latitudes) - min(latitudes)
+        lon_span = (max(longitudes) - min(longitudes)) * math.cos(math.radians(max_latitude))
+        axis = 0 if lat_span >= lon_span else 1
+        delays.sort(key=lambda delay: delay[axis])
+        return axis, [delay[axis] for delay in delays], delays, max_latitude
+
+    @staticmethod
+    def _poll_kind(items: Iterable, kind: str = None) -> Optional[str]:
+        # The kind of a poll, known even when it is empty
+        if kind is None:
+            model_class = getattr(type(items), "model_class", None)
+            return ROUTE_KINDS.get(model_class()) if model_class else None
+        if kind not in ROUTE_KINDS.values():
+            raise OHGOException(f"Cannot index kind {kind}")
+        return kind
+
+    @staticmethod
+    def _kind(item) -> str:
+        kind = ROUTE_KINDS.get(type(item))
+        if kind is None:
+            for model, model_kind in ROUTE_KINDS.items():
+                if isinstance(item, model):
+                    return model_kind
+            raise OHGOException(f"Cannot index {type(item).__name__}, expected one of "
+                                f"{', '.join(model.__name__ for model in ROUTE_KINDS)}")
+        return kind
+
+    def _place(self, key: Key, item, start: float, end: float) -> int:
+        bucket = (normalize_route(item.route_name), normalize_direction(item.direction))
+        previous = self._placed.get(key)
+        moved = previous != bucket
+        if previous is not None and moved:
+            self._trees[previous].remove(key)
+        elif previous is not None:
+            current_start, current_end, _ = self._trees[bucket].get(key)
+            moved = (current_start, current_end) != (min(start, end), max(start, end))
+        self._unplaced.pop(key, None)
+        if isinstance(item, TravelDelay):
+            self._delay_points.pop(bucket[0], None)
+            if previous is not None:
+                self._delay_points.pop(previous[0], None)
+        if bucket not in self._trees:
+            self._trees[bucket] = IntervalTree()
+            self._directions.setdefault(bucket[0], set()).add(bucket[1])
+        self._trees[bucket].add(key, start, end, item)
+        self._placed[key] = bucket
+        return int(moved)
+
+    def _place_point(self, key: Key, item) -> int:
+        previous = self._placed.get(key)
+        if previous is not None:
+            _, _, current = self._trees[previous].get(key)
+            if (current.route_name, current.direction, current.latitude, current.longitude) == \
+                    (item.route_name, item.direction, item.latitude, item.longitude):
+                # Unchanged position, keeps the mile marker it was placed at
+                mile = self._trees[previous].get(key)[0]
+                return self._place(key, item, mile, mile)
+        mile = self._locate(item) if self._locate else self.locate(item.route_name, item.latitude, item.longitude)
+        if mile is None:
+            self.remove(*key)
+            self._unplaced[key] = item
+            return int(previous is not None)
+        return self._place(key, item, mile, mile)
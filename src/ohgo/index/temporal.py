@@ -0,0 +1,111 @@
+from typing import Iterable, List, Optional, Set, Tuple
+
+from ohgo.index.interval import IntervalTree
+from ohgo.index.route import normalize_direction, normalize_route
+from ohgo.models import Construction
+from ohgo.planner import Bounds, distance_miles
+from ohgo.timeseries import Timestamp, to_epoch
+
+
+class ScheduleIndex:
+    """
+    ScheduleIndex indexes construction by its start_date to end_date range in an IntervalTree, so "what is active at
+    time T" and "what overlaps window W" only touch the matching construction instead of scanning every record. Queries
+    can be narrowed by map bounds, a radius, route, direction and status. update is incremental: construction whose
+    dates did not change since the last poll does not cause a rebuild.
+
+    Methods:
+    update: Indexes a poll of construction
+    remove: Removes construction from the index
+    active_at: Returns the construction active at a point in time
+    overlapping: Returns the construction active at any time during a window
+    """
+
+    def __init__(self):
+        """
+        Constructor for ScheduleIndex.
+        """
+        self._tree = IntervalTree()
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def update(self, constructions: Iterable[Construction], complete: bool = True) -> int:
+        """
+        Indexes a poll of construction. Construction whose dates are unchanged only has its model replaced.
+        :param constructions: A ConstructionListResult (e.g. fetched with ConstructionParams(include_future=...)) or
+        any iterable of Construction. Cached (304) results are ignored.
+        :param complete: If True, constructions is a complete poll and indexed construction missing from it is removed
+        :return: The number of construction records added, rescheduled or removed
+        """
+        if getattr(constructions, "cached", False):
+            return 0
+        changed = 0
+        seen: Set[str] = set()
+        for construction in constructions:
+            seen.add(construction.id)
+            start, end = to_epoch(construction.start_date), to_epoch(construction.end_date)
+            if construction.id not in self._tree or self._tree.get(construction.id)[:2] != (min(start, end),
+                                                                                              max(start, end)):
+                changed += 1
+            self._tree.add(construction.id, start, end, construction)
+        if complete:
+            for key in [key for key, _, _, _ in self._tree if key not in seen]:
+                self._tree.remove(key)
+                changed += 1
+        return changed
+
+    def remove(self, construction_id: str):
+        """
+        Removes construction from the index
+        :param construction_id: The id of the construction
+        """
+        self._tree.remove(construction_id)
+
+    def active_at(self, when: Timestamp = None, **filters) -> List[Construction]:
+        """
+        Returns the construction active at a point in time
+        :param when: (optional) A datetime or epoch seconds, defaults to now
+        :param filters: (optional) bounds, radius, route_name, direction and status, see overlapping
+        :return: The matching construction, ordered by start date
+        """
+        when = to_epoch(when)
+        return self.overlapping(when, when, **filters)
+
+    def overlapping(self, start: Timestamp, end: Timestamp, bounds: Bounds = None,
+                    radius: Tuple[float, float, float] = None, route_name: str = None, direction: str = None,
+                    status: str = None) -> List[Construction]:
+        """
+        Returns the construction active at any time during a window
+        :param start: The start of the window, a datetime or epoch seconds
+        :param end: The end of the window, a datetime or epoch seconds
+        :param bounds: (optional) Only construction within (min lat, min lon, max lat, max lon)
+        :param radius: (optional) Only construction within (lat, lon, miles)
+        :param route_name: (optional) Only construction on this route, e.g. "I-71"
+        :param direction: (optional) Only construction in this direction, e.g. "N" or "North"
+        :param status: (optional) Only construction with this status, e.g. "Closed"
+        :return: The matching construction, ordered by start date
+        """
+        found = self._tree.overlap(to_epoch(start), to_epoch(end))
+        route_name = normalize_route(route_name) if route_name else None
+        direction = normalize_direction(direction) if direction else None
+        return [construction for construction in found
+                if self._matches(construction, bounds, radius, route_name, direction, status)]
+
+    @staticmethod
+    def _matches(construction: Construction, bounds: Optional[Bounds], radius: Optional[Tuple[float, float, float]],
+                 route_name: Optional[str], direction: Optional[str], status: Optional[str]) -> bool:
+        if status is not None and construction.status != status:
+            return False
+        if route_name is not None and normalize_route(construction.route_name) != route_name:
+            return False
+        if direction is not None and normalize_direction(construction.direction) != direction:
+            return False
+        if bounds is not None and not (bounds[0] <= construction.latitude <= bounds[2]
+                                       and bounds[1] <= construction.longitude <= bounds[3]):
+            return False
+        if radius is not None:
+            lat, lon, miles = radius
+            if distance_miles(lat, lon, construction.latitude, construction.longitude) > miles:
+                return False
+        return True
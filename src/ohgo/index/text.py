@@ -0,0 +1,210 @@
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ohgo.exceptions import OHGOException
+from ohgo.models import Construction, DigitalSign, Incident
+
+# Model -> (kind, text fields)
+TEXT_FIELDS = {
+    DigitalSign: ("digital-signs", ("messages",)),
+    Incident: ("incidents", ("description", "location")),
+    Construction: ("construction", ("description", "location")),
+}
+
+# Words, numbers and hyphenated route names such as "I-71" or "US-33"
+TOKEN = re.compile(r"[A-Z0-9]+(?:[-'][A-Z0-9]+)*")
+# A quoted phrase or a bare term
+TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+Key = Tuple[str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into upper case tokens
+    """
+    return TOKEN.findall(text.upper())
+
+
+class TextIndex:
+    """
+    TextIndex is an inverted index over the text of digital sign messages and incident and construction descriptions
+    and locations. Each token maps to the positions it appears at in each item, so token, prefix and phrase queries
+    only touch the items that contain the query tokens instead of scanning every message. update is incremental:
+    items whose text did not change since the last poll are not re-indexed.
+
+    Attributes:
+    vocabulary: The sorted indexed tokens
+
+    Methods:
+    update: Indexes a poll of items, re-indexing only the items whose text changed
+    remove: Removes an item from the index
+    search: Returns the items matching every term of a query
+    """
+
+    def __init__(self):
+        """
+        Constructor for TextIndex.
+        """
+        # token -> (kind, id) -> positions
+        self._postings: Dict[str, Dict[Key, List[int]]] = {}
+        self.vocabulary: List[str] = []
+        # (kind, id) -> (indexed texts, latest item)
+        self._documents: Dict[Key, Tuple[Tuple[str, ...], Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def update(self, items: Iterable, complete: bool = True, kind: str = None) -> int:
+        """
+        Indexes a poll of items. Items whose text is unchanged only have their model replaced.
+        :param items: A DigitalSignListResult, IncidentListResult or ConstructionListResult, or any iterable of those
+        models. Cached (304) results are ignored.
+        :param complete: If True, items is a complete poll and indexed items of the same kinds missing from it are
+        removed
+        :param kind: (optional) The kind items is a complete poll of, e.g. "incidents". Taken from the class of a list
+        result; pass it for other iterables so that an empty poll removes every item of the kind.
+        :return: The number of items added, re-indexed or removed
+        """
+        if getattr(items, "cached", False):
+            return 0
+        kinds = {self._kind(items, kind)} - {None}
+        changed = 0
+        seen: Set[Key] = set()
+        for item in items:
+            kind, fields = self._fields(item)
+            key = (kind, item.id)
+            seen.add(key)
+            kinds.add(kind)
+            texts = self._texts(item, fields)
+            current = self._documents.get(key)
+            if current is not None and current[0] == texts:
+                self._documents[key] = (texts, item)
+                continue
+            if current is not None:
+                self._unindex(key, current[0])
+            self._index(key, texts)
+            self._documents[key] = (texts, item)
+            changed += 1
+        if complete:
+            for key in [key for key in self._documents if key[0] in kinds and key not in seen]:
+                self.remove(*key)
+                changed += 1
+        return changed
+
+    def remove(self, kind: str, item_id: str):
+        """
+        Removes an item from the index
+        :param kind: The kind of the item, e.g. "digital-signs"
+        :param item_id: The id of the item
+        """
+        document = self._documents.pop((kind, item_id), None)
+        if document is not None:
+            self._unindex((kind, item_id), document[0])
+
+    def search(self, query: str, kinds: Iterable[str] = None) -> List:
+        """
+        Returns the items matching every term of a query. Terms are case insensitive tokens ("CRASH"), prefixes
+        ("CLOS*") or quoted phrases ('"EXIT 110 CLOSED"').
+        :param query: The query
+        :param kinds: (optional) Only return items of these kinds, e.g. ["digital-signs"]
+        :return: The matching items, ordered by kind and id
+        """
+        matches = None
+        for phrase, term in TERM.findall(query):
+            if term.endswith("*"):
+                keys = self._prefix(term[:-1].upper())
+            else:
+                keys = self._phrase(tokenize(phrase or term))
+            matches = keys if matches is None else matches & keys
+            if not matches:
+                return []
+        if matches is None:
+            raise OHGOException("Empty query")
+        if kinds is not None:
+            kinds = set(kinds)
+            matches = {key for key in matches if key[0] in kinds}
+        return [self._documents[key][1] for key in sorted(matches)]
+
+    @staticmethod
+    def _kind(items: Iterable, kind: str = None) -> Optional[str]:
+        # The kind of a poll, known even when it is empty
+        if kind is None:
+            model_class = getattr(type(items), "model_class", None)
+            return TEXT_FIELDS[model_class()][0] if model_class and model_class() in TEXT_FIELDS else None
+        if kind not in {model_kind for model_kind, _ in TEXT_FIELDS.values()}:
+            raise OHGOException(f"Cannot index kind {kind}")
+        return kind
+
+    @staticmethod
+    def _fields(item) -> Tuple[str, Tuple[str, ...]]:
+        for model, fields in TEXT_FIELDS.items():
+            if isinstance(item, model):
+                return fields
+        raise OHGOException(f"Cannot index {type(item).__name__}, expected one of "
+                            f"{', '.join(model.__name__ for model in TEXT_FIELDS)}")
+
+    @staticmethod
+    def _texts(item, fields: Tuple[str, ...]) -> Tuple[str, ...]:
+        texts = []
+        for field in fields:
+            value = getattr(item, field)
+            texts.extend(value if isinstance(value, list) else [value])
+        return tuple(text or "" for text in texts)
+
+    @staticmethod
+    def _positions(texts: Tuple[str, ...]) -> Dict[str, List[int]]:
+        positions: Dict[str, List[int]] = {}
+        start = 0
+        for text in texts:
+            tokens = tokenize(text)
+            for offset, token in enumerate(tokens):
+                positions.setdefault(token, []).append(start + offset)
+            # Leaves a gap so phrases never match across two messages or fields
+            start += len(tokens) + 1
+        return positions
+
+    def _index(self, key: Key, texts: Tuple[str, ...]):
+        for token, positions in self._positions(texts).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self.vocabulary, token)
+            postings[key] = positions
+
+    def _unindex(self, key: Key, texts: Tuple[str, ...]):
+        for token in self._positions(texts):
+            postings = self._postings[token]
+            del postings[key]
+            if not postings:
+                del self._postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def _prefix(self, prefix: str) -> Set[Key]:
+        keys: Set[Key] = set()
+        index = bisect_left(self.vocabulary, prefix)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(prefix):
+            keys.update(self._postings[self.vocabulary[index]])
+            index += 1
+        return keys
+
+    def _phrase(self, tokens: List[str]) -> Set[Key]:
+        if not tokens:
+            return set()
+        postings = [self._postings.get(token) for token in tokens]
+        if not all(postings):
+            return set()
+        # Intersects starting from the rarest token
+        keys = set(min(postings, key=len))
+        for token_postings in postings:
+            keys.intersection_update(token_postings)
+        if len(tokens) == 1:
+            return keys
+        return {key for key in keys if self._adjacent(key, postings)}
+
+    @staticmethod
+    def _adjacent(key: Key, postings: List[Dict[Key, List[int]]]) -> bool:
+        following = [set(token_postings[key]) for token_postings in postings[1:]]
+        return any(all(start + offset in positions for offset, positions in enumerate(following, 1))
+                   for start in postings[0][key])
@@ -10,4 +10,4 @@ from .results.ohgo_results import CameraItemResult, CameraListResult, TravelDela
     DangerousSlowdownItemResult, DangerousSlowdownListResult, DigitalSignItemResult, DigitalSignListResult, \
     IncidentItemResult, IncidentListResult, WeatherSensorSiteItemResult, WeatherSensorSiteListResult, \
     ConstructionItemResult, ConstructionListResult
-from .results.http_results import Result, CachedResult
+from .results.http_results import Result, CachedResult, RawResult
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import List, Any
 
 from .base_model import BaseModel
-from .models import from_list, from_str, from_float, to_class, to_float, Link
+from .models import from_list, from_str, from_float, to_class, to_float, Link, from_interned_str
 
 
 @dataclass
@@ -43,10 +43,10 @@ class CameraView:
     @staticmethod
     def from_dict(obj: Any) -> "CameraView":
         assert isinstance(obj, dict)
-        direction = from_str(obj.get("direction"))
+        direction = from_interned_str(obj.get("direction"))
         small_url = from_str(obj.get("smallUrl"))
         large_url = from_str(obj.get("largeUrl"))
-        main_route = from_str(obj.get("mainRoute"))
+        main_route = from_interned_str(obj.get("mainRoute"))
         return CameraView(direction, small_url, large_url, main_route)
 
     def to_dict(self) -> dict:
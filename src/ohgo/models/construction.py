@@ -3,7 +3,8 @@ from datetime import datetime
 from typing import List, Any
 
 from .base_model import BaseModel
-from .models import Link, from_list, from_str, from_float, from_datetime, to_float, to_class
+from .models import Link, from_list, from_str, from_float, from_datetime, to_float, to_class, \
+    from_interned_str
 
 
 @dataclass
@@ -78,11 +79,11 @@ class Construction(BaseModel):
         :return: A Construction object.
         """
         base_model = BaseModel.from_base_dict(obj)  # Parse common fields using BaseModel
-        category = from_str(obj.get("category"))
-        direction = from_str(obj.get("direction"))
-        district = from_str(obj.get("district"))
-        route_name = from_str(obj.get("routeName"))
-        status = from_str(obj.get("status"))
+        category = from_interned_str(obj.get("category"))
+        direction = from_interned_str(obj.get("direction"))
+        district = from_interned_str(obj.get("district"))
+        route_name = from_interned_str(obj.get("routeName"))
+        status = from_interned_str(obj.get("status"))
         start_date = from_datetime(obj.get("startDate"))
         end_date = from_datetime(obj.get("endDate"))
         return Construction(
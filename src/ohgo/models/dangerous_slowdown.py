@@ -1,7 +1,7 @@
 from typing import Any, List
 
 from .base_model import BaseModel
-from .models import from_list, from_str, from_float, from_int, Link, to_float, to_class
+from .models import from_list, from_str, from_float, from_int, Link, to_float, to_class, from_interned_str
 
 
 class DangerousSlowdown(BaseModel):
@@ -32,8 +32,8 @@ class DangerousSlowdown(BaseModel):
         base_model = BaseModel.from_base_dict(obj)  # Reuse the parent class method for base fields
         normal_mph = from_float(obj.get("normalMPH"))
         current_mph = from_float(obj.get("currentMPH"))
-        route_name = from_str(obj.get("routeName"))
-        direction = from_str(obj.get("direction"))
+        route_name = from_interned_str(obj.get("routeName"))
+        direction = from_interned_str(obj.get("direction"))
         return DangerousSlowdown(base_model.links, base_model.id, base_model.latitude, base_model.longitude, base_model.location, base_model.description, normal_mph, current_mph, route_name, direction)
 
     def to_dict(self) -> dict:
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import List, Any
 
 from .base_model import BaseModel
-from .models import from_list, from_str, from_float, to_float, to_class, Link
+from .models import from_list, from_str, from_float, to_float, to_class, Link, from_interned_str
 
 
 @dataclass
@@ -57,8 +57,8 @@ class DigitalSign(BaseModel):
         :return: A DigitalSign object.
         """
         base_model = BaseModel.from_base_dict(obj)  # Get common fields using BaseModel
-        sign_type_name = from_str(obj.get("signTypeName"))
-        messages = from_list(from_str, obj.get("messages"))
+        sign_type_name = from_interned_str(obj.get("signTypeName"))
+        messages = from_list(from_interned_str, obj.get("messages"))
         image_urls = from_list(lambda x: x, obj.get("imageUrls"))
         return DigitalSign(base_model.links, base_model.id, base_model.latitude, base_model.longitude,
                            base_model.location, base_model.description, sign_type_name, messages, image_urls)
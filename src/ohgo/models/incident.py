@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Any, List
 
 from .base_model import BaseModel
-from .models import Link, from_list, from_str, from_float, to_float, to_class
+from .models import Link, from_list, from_str, from_float, to_float, to_class, from_interned_str
 
 @dataclass
 class Incident(BaseModel):
@@ -31,10 +31,10 @@ class Incident(BaseModel):
     @staticmethod
     def from_dict(obj: Any) -> 'Incident':
         base_model = BaseModel.from_base_dict(obj)  # Reuse BaseModel for shared fields
-        category = from_str(obj.get("category"))
-        direction = from_str(obj.get("direction"))
-        route_name = from_str(obj.get("routeName"))
-        road_status = from_str(obj.get("roadStatus"))
+        category = from_interned_str(obj.get("category"))
+        direction = from_interned_str(obj.get("direction"))
+        route_name = from_interned_str(obj.get("routeName"))
+        road_status = from_interned_str(obj.get("roadStatus"))
         return Incident(base_model.links, base_model.id, base_model.latitude, base_model.longitude, base_model.location, base_model.description, category, direction, route_name, road_status)
 
     def to_dict(self) -> dict:
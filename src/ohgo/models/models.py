@@ -1,9 +1,8 @@
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 from typing import *
 
-import dateutil.parser
-
 T = TypeVar("T")
 
 
@@ -14,6 +13,14 @@ def from_str(x: Any) -> str:
     return x
 
 
+def from_interned_str(x: Any) -> str:
+    """
+    from_str for fields with few distinct values (directions, routes, statuses, ...). The string is interned so all
+    models share one copy instead of each holding its own.
+    """
+    return sys.intern(from_str(x))
+
+
 def from_list(f: Callable[[Any], T], x: Any) -> List[T]:
     assert isinstance(x, list)
     return [f(y) for y in x]
@@ -45,17 +52,24 @@ def from_bool(x: Any) -> bool:
 
 
 def from_datetime(x: Any) -> datetime:
-    return dateutil.parser.parse(x)
+    try:
+        # OHGO timestamps are ISO 8601, which the stdlib parses much faster. "Z" is only accepted from Python 3.11.
+        return datetime.fromisoformat(x[:-1] + "+00:00" if x.endswith("Z") else x)
+    except ValueError:
+        import dateutil.parser  # Imported here so dateutil is only loaded for other formats
+        return dateutil.parser.parse(x)
 
 
 class Link:
     """
-    Link is a class for storing a link object.
+    Link is a class for storing a link object. Links are stored compactly: the href is split into an interned base
+    URL shared by every link to the same endpoint and the last path segment, and rel is interned.
 
     Attributes:
     href: The URL of the link
     rel: The relationship of the link to the object
     """
+    __slots__ = ("_base", "_name", "rel")
     href: str
     rel: str
 
@@ -65,8 +79,20 @@ class Link:
         :param href: The URL of the link
         :param rel: The relationship of the link to the object
         """
-        self.href = href
-        self.rel = rel
+        split = href.rfind("/") + 1
+        self._base = sys.intern(href[:split])
+        self._name = href[split:]
+        self.rel = sys.intern(rel)
+
+    @property
+    def href(self) -> str:
+        return self._base + self._name
+
+    @href.setter
+    def href(self, href: str):
+        split = href.rfind("/") + 1
+        self._base = sys.intern(href[:split])
+        self._name = href[split:]
 
     @staticmethod
     def from_dict(obj: Any) -> "Link":
@@ -6,7 +6,6 @@ from ohgo.types import *
 import logging
 from enum import Enum
 
-logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
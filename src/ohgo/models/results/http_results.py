@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 
 
 class Result:
@@ -54,4 +54,27 @@ class Result:
 class CachedResult:
     status_code: int = 304
     message: str = "Data has not changed since the last request"
-    etag: str = None
\ No newline at end of file
+    etag: str = None
+
+
+@dataclass
+class RawResult:
+    """
+    RawResult is an undecoded response of the OHGO API, for callers that store or relay response bodies as they are.
+
+    Attributes:
+    status_code: The status code of the response, 304 if the etag passed in is still current
+    message: The reason phrase of the response
+    content: The raw response body, empty for a 304
+    etag: The ETag of the response without quotes, None if there is none
+    content_type: The Content-Type of the response
+    """
+    status_code: int
+    message: str
+    content: bytes
+    etag: Optional[str] = None
+    content_type: str = "application/json; charset=utf-8"
+
+    @property
+    def ok(self) -> bool:
+        return 299 >= self.status_code >= 200
\ No newline at end of file
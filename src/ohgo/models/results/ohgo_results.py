@@ -1,4 +1,4 @@
-from typing import TypeVar, List, Generic, Optional
+from typing import TypeVar, List, Generic, Optional, get_args
 
 from ohgo.models import Camera, DigitalSign, Construction, TravelDelay, DangerousSlowdown, WeatherSensorSite, Incident
 
@@ -39,6 +39,20 @@ class OHGOListResult(Generic[T]):
         # Allow the result object to return the items list when called
         return self.items
 
+    @classmethod
+    def model_class(cls) -> Optional[type]:
+        """
+        Returns the model class of the items, e.g. Camera for a CameraListResult, so consumers know what kind of items
+        an empty result is a complete poll of. None for a plain OHGOListResult.
+        """
+        for base in getattr(cls, "__orig_bases__", ()):
+            for arg in get_args(base):
+                # OHGOListResult[Optional[Model]], so unwrap the Optional
+                model = next((model for model in get_args(arg) or (arg,) if model is not type(None)), None)
+                if isinstance(model, type):
+                    return model
+        return None
+
 
 class OHGOItemResult(Generic[T]):
     """
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Any, List
 
 from .base_model import BaseModel
-from .models import Link, from_list, from_str, from_float, to_float, to_class, from_int
+from .models import Link, from_list, from_str, from_float, to_float, to_class, from_int, from_interned_str
 
 
 @dataclass
@@ -44,8 +44,8 @@ class TravelDelay(BaseModel):
     @staticmethod
     def from_dict(obj: Any) -> 'TravelDelay':
         base_model = BaseModel.from_base_dict(obj)  # Reuse BaseModel for shared fields
-        direction = from_str(obj.get("direction"))
-        route_name = from_str(obj.get("routeName"))
+        direction = from_interned_str(obj.get("direction"))
+        route_name = from_interned_str(obj.get("routeName"))
         travel_time = from_float(obj.get("travelTime"))
         delay_time = from_float(obj.get("delayTime"))
         start_mile_marker = from_float(obj.get("startMileMarker"))
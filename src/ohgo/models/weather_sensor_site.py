@@ -4,7 +4,7 @@ from typing import List, Any, Optional
 
 from .base_model import BaseModel
 from .models import from_list, from_str, Link, from_float, to_class, to_float, from_bool, \
-    from_datetime, from_int
+    from_datetime, from_int, from_interned_str
 
 
 @dataclass
@@ -28,8 +28,8 @@ class AtmosphericSensor:
         humidity = from_float(obj.get("humidity"))
         average_wind_speed = from_float(obj.get("averageWindSpeed"))
         maximum_wind_speed = from_float(obj.get("maximumWindSpeed"))
-        wind_direction = from_str(obj.get("windDirection"))
-        precipitation = from_str(obj.get("precipitation"))
+        wind_direction = from_interned_str(obj.get("windDirection"))
+        precipitation = from_interned_str(obj.get("precipitation"))
         precipitation_rate = from_float(obj.get("precipitationRate"))
         visibility = from_float(obj.get("visibility"))
         last_update = from_datetime(obj.get("lastUpdate"))
@@ -59,8 +59,8 @@ class SurfaceSensor:
     @staticmethod
     def from_dict(obj: Any) -> 'SurfaceSensor':
         assert isinstance(obj, dict)
-        name = from_str(obj.get("name"))
-        status = from_str(obj.get("status"))
+        name = from_interned_str(obj.get("name"))
+        status = from_interned_str(obj.get("status"))
         surface_temperature = from_float(obj.get("surfaceTemperature"))
         sub_surface_temperature = from_float(obj.get("subSurfaceTemperature"))
         last_update = from_datetime(obj.get("lastUpdate"))
@@ -137,8 +137,8 @@ class WeatherSensorSite(BaseModel):
         """
         base_model = BaseModel.from_base_dict(obj)  # Get common fields using BaseModel
         severe = from_bool(obj.get("severe"))
-        condition = from_str(obj.get("condition"))
-        average_air_temperature = from_str(obj.get("averageAirTemperature"))
+        condition = from_interned_str(obj.get("condition"))
+        average_air_temperature = from_interned_str(obj.get("averageAirTemperature"))
         atmospheric_sensors = from_list(AtmosphericSensor.from_dict, obj.get("atmosphericSensors"))
         surface_sensors = from_list(SurfaceSensor.from_dict, obj.get("surfaceSensors"))
         return WeatherSensorSite(base_model.links, base_model.id, base_model.latitude, base_model.longitude,
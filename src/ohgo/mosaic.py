@@ -0,0 +1,134 @@
+import hashlib
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from ohgo.exceptions import OHGOException
+from ohgo.image_handler import decode
+from ohgo.models import Camera, CameraView
+from ohgo.ohgo_client import OHGOClient
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class MosaicRenderer:
+    """
+    MosaicRenderer composes the views of many cameras into one grid image (a contact sheet). Views are fetched
+    concurrently, decoded at reduced resolution straight to tile size and pasted into a canvas allocated once. refresh
+    fetches the views again and only decodes and pastes the tiles whose frame changed, found by a hash of the image
+    bytes.
+
+    Attributes:
+    image: The canvas, a PIL Image. None until render is called.
+    views: The CameraViews of the tiles in row-major order
+    tile_size: The (width, height) of each tile
+    columns: The number of tiles per row
+
+    Methods:
+    render: Lays out and renders a mosaic of cameras
+    refresh: Updates the tiles whose frame changed since the last render or refresh
+    tile_box: Returns the canvas box of a tile
+    """
+
+    def __init__(self, client: OHGOClient, tile_size: Tuple[int, int] = (176, 120), columns: int = None,
+                 view_size: str = "small", background: Tuple[int, int, int] = (0, 0, 0), max_workers: int = 8):
+        """
+        Constructor for MosaicRenderer.
+        :param client: The OHGOClient used to fetch images
+        :param tile_size: The (width, height) of each tile. Frames are shrunk to fit and centered.
+        :param columns: (optional) The number of tiles per row, defaults to a roughly square grid
+        :param view_size: Which CameraView image to fetch, "small" or "large"
+        :param background: The RGB color of the canvas behind tiles and of tiles whose image failed
+        :param max_workers: The maximum number of concurrent image fetches
+        """
+        self._image_handler = client.image_handler
+        self.tile_size = tile_size
+        self.columns = columns
+        self.view_size = view_size
+        self.background = background
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ohgo-mosaic")
+        self.image: Optional["Image.Image"] = None
+        self.views: List[CameraView] = []
+        self._digests: List[Optional[bytes]] = []
+
+    def render(self, cameras: Iterable) -> "Image.Image":
+        """
+        Lays out one tile per camera view and renders every tile
+        :param cameras: A CameraListResult, or any iterable of Cameras or CameraViews
+        :return: The canvas, a PIL Image
+        """
+        from PIL import Image
+        views = []
+        for camera in cameras:
+            views.extend(camera.camera_views if isinstance(camera, Camera) else [camera])
+        if not views:
+            raise OHGOException("No camera views to render")
+        self.views = views
+        columns = self.columns or math.ceil(math.sqrt(len(views)))
+        rows = math.ceil(len(views) / columns)
+        width, height = self.tile_size
+        self._columns = columns
+        self.image = Image.new("RGB", (columns * width, rows * height), self.background)
+        self._digests = [None] * len(views)
+        self.refresh()
+        return self.image
+
+    def refresh(self) -> List[int]:
+        """
+        Fetches every view again and updates the tiles whose frame changed. Tiles whose fetch fails keep their last
+        frame.
+        :return: The indexes of the tiles that were updated
+        """
+        if self.image is None:
+            raise OHGOException("render must be called before refresh")
+        changed = []
+        # Decoding and pasting happen on the worker threads too, PIL releases the GIL while decoding
+        for index in self._executor.map(self._update, range(len(self.views))):
+            if index is not None:
+                changed.append(index)
+        return changed
+
+    def tile_box(self, index: int) -> Tuple[int, int, int, int]:
+        """
+        Returns the canvas box of a tile
+        :param index: The index of the tile in views
+        :return: (left, upper, right, lower)
+        """
+        width, height = self.tile_size
+        row, column = divmod(index, self._columns)
+        return column * width, row * height, (column + 1) * width, (row + 1) * height
+
+    def _update(self, index: int) -> Optional[int]:
+        view = self.views[index]
+        url = view.small_url if self.view_size == "small" else view.large_url
+        try:
+            data = self._image_handler.fetch_bytes(url)
+        except OHGOException:
+            return None
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._digests[index]:
+            return None
+        try:
+            frame = decode(data, self.tile_size)
+        except OSError:  # PIL raises UnidentifiedImageError (an OSError) for corrupt images
+            return None
+        left, upper, right, lower = self.tile_box(index)
+        if frame.size != self.tile_size:
+            self.image.paste(self.background, (left, upper, right, lower))
+        # Tiles never overlap, so concurrent pastes write disjoint regions
+        self.image.paste(frame, (left + (right - left - frame.width) // 2, upper + (lower - upper - frame.height) // 2))
+        self._digests[index] = digest
+        return index
+
+    def close(self):
+        """
+        Shuts down the worker threads
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
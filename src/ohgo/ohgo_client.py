@@ -1,34 +1,76 @@
 import logging
-
-from PIL.Image import Image
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Tuple
 
 from .models import Camera, CameraView, Construction, DigitalSign, Incident, TravelDelay, WeatherSensorSite, \
     DangerousSlowdown
 from .models import QueryParams, DigitalSignParams, ConstructionParams, WeatherSensorSiteParams
 
+from ohgo.decoders import JSONDecoder
 from ohgo.rest_adapter import RestAdapter
 from ohgo.exceptions import OHGOException
 from ohgo.image_handler import ImageHandler
-from typing import List
+from ohgo.streaming import StreamedResult
+from typing import List, Union
 from functools import singledispatchmethod
 
 from .models import CachedResult, CameraListResult, CameraItemResult, DigitalSignListResult, \
     DigitalSignItemResult, ConstructionListResult, ConstructionItemResult, WeatherSensorSiteListResult, \
     WeatherSensorSiteItemResult, IncidentListResult, IncidentItemResult, DangerousSlowdownListResult, \
-    DangerousSlowdownItemResult, TravelDelayListResult, TravelDelayItemResult
+    DangerousSlowdownItemResult, TravelDelayListResult, TravelDelayItemResult, RawResult
+
+if TYPE_CHECKING:
+    # PIL is only imported once an image is fetched
+    from PIL.Image import Image
+    from ohgo.fingerprint import FrameMonitor
+    from ohgo.image_store import ImageStore
+    from ohgo.shared_cache import SharedCache
 
-logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Model parsed from the results of each list endpoint
+ENDPOINT_MODELS = {
+    "cameras": Camera,
+    "digital-signs": DigitalSign,
+    "construction": Construction,
+    "weather-sensor-sites": WeatherSensorSite,
+    "incidents": Incident,
+    "dangerous-slowdowns": DangerousSlowdown,
+    "travel-delays": TravelDelay,
+}
+
+
+@dataclass
+class CallResult:
+    """
+    CallResult is the outcome of one call run by OHGOClient.map.
+
+    Attributes:
+    call: The call as it was passed to map
+    result: The return value of the call, None if it raised
+    error: The exception the call raised, None if it succeeded
+    """
+    call: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class OHGOClient:
     """
     OHGOClient provides methods for fetching data from OHGO including Cameras, Construction, Digital Signage,
-    Incidents, Travel Delays, and Weather Sensors.
+    Incidents, Travel Delays, and Weather Sensors. One client can be shared between threads: every thread uses its own
+    HTTP session and returned models are not shared between calls.
 
     Attributes:
     _rest_adapter: RestAdapter for making HTTP requests to the OHGO API
     _image_handler: ImageHandler for fetching images from OHGO API
+    image_handler: The ImageHandler every image is fetched through, e.g. to fetch encoded image bytes
+    url: The base URL of the OHGO API
 
     Methods:
     get_cameras: Fetches cameras from OHGO API
@@ -45,6 +87,10 @@ class OHGOClient:
     get_incident: Fetches a single incident from OHGO API
     get_dangerous_slowdowns: Fetches dangerous slowdowns from OHGO API
     get_dangerous_slowdown: Fetches a single dangerous slowdown from OHGO API
+    stream: Streams results of any endpoint from OHGO API, parsing them as they arrive
+    get_raw: Fetches the undecoded response of any OHGO API path, e.g. to relay or store it
+    map: Runs a batch of get_* calls concurrently
+    close: Closes the HTTP sessions of every thread
 
     """
 
@@ -55,17 +101,45 @@ class OHGOClient:
             ver: str = "v1",
             ssl_verify: bool = True,
             logger: logging.Logger = None,
+            json_decoder: Union[str, JSONDecoder] = None,
+            image_store: "ImageStore" = None,
+            response_cache: "SharedCache" = None,
+            frame_monitor: "FrameMonitor" = None,
     ):
         """
         Constructor for OHGOClient
         :param api_key: Required API key for OHGO API
-        :param hostname: The hostname of the OHGO API, almost always "publicapi.ohgo.com"
+        :param hostname: The hostname of the OHGO API, almost always "publicapi.ohgo.com". May include a scheme,
+        e.g. "http://127.0.0.1:8080" for a local server
         :param ver: The version of the API to use, defaults to "v1"
         :param ssl_verify: Whether to verify SSL certificates, defaults to True
         :param logger: (optional) A logger to use for logging, defaults to None
+        :param json_decoder: (optional) A JSONDecoder or decoder name ("orjson", "ujson", "json"), defaults to the
+        fastest installed decoder
+        :param image_store: (optional) An ImageStore that fetched images are deduplicated into and served from
+        :param response_cache: (optional) A SharedCache through which processes on a host share responses, so only one
+        of them requests each query from the OHGO API
+        :param frame_monitor: (optional) A FrameMonitor that observes every image fetched, to detect frozen, blank and
+        duplicate cameras. FrameMonitor(client) attaches itself.
+        """
+        self._rest_adapter = RestAdapter(hostname, api_key, ver, ssl_verify, logger, json_decoder, image_store,
+                                         response_cache)
+        self._image_handler = ImageHandler(self._rest_adapter, frame_monitor)
+
+    @property
+    def image_handler(self) -> ImageHandler:
+        """
+        The ImageHandler every image is fetched through. Components that fetch images themselves (e.g. ImagePipeline)
+        use it so the image store and frame monitor see their images too.
+        """
+        return self._image_handler
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the OHGO API, e.g. "https://publicapi.ohgo.com/api/v1/"
         """
-        self._rest_adapter = RestAdapter(hostname, api_key, ver, ssl_verify, logger)
-        self._image_handler = ImageHandler(self._rest_adapter)
+        return self._rest_adapter.url
 
     def get_cameras(self, params: QueryParams = None, fetch_all=False, etag=None, **kwargs) -> CameraListResult:
         """
@@ -123,8 +197,8 @@ class OHGOClient:
         """
         raise NotImplementedError("Cannot get image from this type")
 
-    @get_image.register
-    def _(self, camera_view: CameraView, size="small") -> Image:
+    @get_image.register(CameraView)
+    def _(self, camera_view: CameraView, size="small") -> "Image":
         """
         Fetches an image from a CameraView
         :param camera_view: A CameraView object.
@@ -136,8 +210,8 @@ class OHGOClient:
         elif size == "large":
             return self._image_handler.fetch(camera_view.large_url)
 
-    @get_image.register
-    def _(self, camera: Camera, size="small") -> Image:
+    @get_image.register(Camera)
+    def _(self, camera: Camera, size="small") -> "Image":
         """
         Fetches an image from a Camera
         :param camera: A Camera object
@@ -149,7 +223,7 @@ class OHGOClient:
         return self.get_image(camera.camera_views[0], size)
 
     @singledispatchmethod
-    def get_images(self, obj) -> List[Image]:
+    def get_images(self, obj) -> "List[Image]":
         """
         Generic method for fetching images from an object. Not implemented for all types.
         :param obj: The object to fetch images from
@@ -157,8 +231,8 @@ class OHGOClient:
         """
         raise NotImplementedError("Cannot get images from this type")
 
-    @get_images.register
-    def _(self, camera: Camera, size="small") -> List[Image]:
+    @get_images.register(Camera)
+    def _(self, camera: Camera, size="small") -> "List[Image]":
         """
         Loops through all CameraViews of a Camera and fetches images for each.
         :param camera: A Camera object
@@ -167,8 +241,8 @@ class OHGOClient:
         """
         return [self.get_image(view, size) for view in camera.camera_views]
 
-    @get_images.register
-    def _(self, digital_sign: DigitalSign) -> List[Image]:
+    @get_images.register(DigitalSign)
+    def _(self, digital_sign: DigitalSign) -> "List[Image]":
         """
         Fetches all images from a DigitalSign. Filters out any None values.
         :param digital_sign:
@@ -406,3 +480,85 @@ class OHGOClient:
             raise OHGOException(f"No travel delay found with ID {delay_id}")
 
         return TravelDelayItemResult(TravelDelay.from_dict(result.data[0]), etag=result.etag)
+
+    def get_raw(self, path: str, params: QueryParams = None, etag=None, **kwargs) -> RawResult:
+        """
+        Fetches the undecoded response of an OHGO API path, whatever its status. Bypasses the response cache.
+        :param path: The path below the API base URL, e.g. "cameras" or "cameras/{id}", or a full URL such as a next
+        page link
+        :param params: QueryParams (or subclass) object to pass to the API
+        :param etag: The etag of the query, used for caching
+        :param kwargs: Extra arguments to pass to the API, e.g. the query parameters of a request being relayed
+        :return: A RawResult, with status code 304 if the etag is still current
+        """
+        ep_params = dict(params) if params else {}
+        ep_params.update(kwargs)
+        return self._rest_adapter.get_raw(endpoint=path, ep_params=ep_params, etag=etag)
+
+    def stream(self, endpoint: str, params: QueryParams = None, fetch_all=False, etag=None,
+               **kwargs) -> StreamedResult:
+        """
+        Streams results from the OHGO API. Each result is parsed into a model as soon as it has been received, so
+        memory use stays flat even for statewide page-all queries. links and total_result_count are available once
+        iteration has started, rejected_filters once it has finished.
+        :param endpoint: The endpoint to query, e.g. "cameras" or "travel-delays"
+        :param params: QueryParams (or subclass) object to pass to the API
+        :param fetch_all: Pages through all results if True. Recommended to use page-all param instead.
+        :param etag: The etag of the query, used for caching
+        :param kwargs: Extra arguments to pass to the API.
+        :return: A StreamedResult yielding model objects. Empty with cached set if the data has not changed.
+        """
+        if endpoint not in ENDPOINT_MODELS:
+            raise OHGOException(f"Cannot stream unknown endpoint {endpoint}")
+        ep_params = dict(params) if params else {}
+        ep_params.update(kwargs)
+
+        result = self._rest_adapter.stream(endpoint=endpoint, ep_params=ep_params, fetch_all=fetch_all, etag=etag,
+                                           item_factory=ENDPOINT_MODELS[endpoint].from_dict)
+        if isinstance(result, CachedResult):
+            return StreamedResult(iter(()), result.status_code, result.message, result.etag, cached=True)
+        return result
+
+    @staticmethod
+    def _parse_call(call) -> Tuple[str, tuple, dict]:
+        if isinstance(call, str):
+            return call, (), {}
+        name, *args = call
+        kwargs = args.pop() if args and isinstance(args[-1], dict) else {}
+        return name, tuple(args), kwargs
+
+    def map(self, calls: Iterable, max_workers: int = 8) -> List[CallResult]:
+        """
+        Runs a batch of get_* calls concurrently. A call is a method name, or a tuple of a method name followed by its
+        positional arguments and optionally a dictionary of keyword arguments, e.g.
+        ["get_incidents", ("get_camera", "CAMERA-ID"), ("get_cameras", {"params": QueryParams(region=Region.AKRON)})]
+        :param calls: The calls to run
+        :param max_workers: The maximum number of concurrent calls
+        :return: A CallResult per call, in the order of calls. A call that raised has its exception in error instead of
+        failing the batch.
+        """
+        calls = list(calls)
+        parsed = []
+        for call in calls:
+            name, args, kwargs = self._parse_call(call)
+            if not (name.startswith("get_") and callable(getattr(self, name, None))):
+                raise OHGOException(f"Cannot map {name!r}, expected a get_* method of OHGOClient")
+            parsed.append((getattr(self, name), args, kwargs))
+
+        def run(index: int) -> CallResult:
+            method, args, kwargs = parsed[index]
+            try:
+                return CallResult(calls[index], result=method(*args, **kwargs))
+            except Exception as e:  # Reported per call
+                return CallResult(calls[index], error=e)
+
+        if not calls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls)), thread_name_prefix="ohgo-map") as executor:
+            return list(executor.map(run, range(len(calls))))
+
+    def close(self):
+        """
+        Closes the HTTP sessions of every thread
+        """
+        self._rest_adapter.close()
@@ -0,0 +1,353 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ohgo.exceptions import OHGOException
+from ohgo.models import QueryParams, CameraListResult, DigitalSignListResult, ConstructionListResult, \
+    WeatherSensorSiteListResult, IncidentListResult, DangerousSlowdownListResult, TravelDelayListResult
+from ohgo.ohgo_client import OHGOClient
+from ohgo.types import Region
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (client method, list result)
+ENDPOINTS = {
+    "cameras": ("get_cameras", CameraListResult),
+    "digital-signs": ("get_digital_signs", DigitalSignListResult),
+    "construction": ("get_constructions", ConstructionListResult),
+    "weather-sensor-sites": ("get_weather_sensor_sites", WeatherSensorSiteListResult),
+    "incidents": ("get_incidents", IncidentListResult),
+    "dangerous-slowdowns": ("get_dangerous_slowdowns", DangerousSlowdownListResult),
+    "travel-delays": ("get_travel_delays", TravelDelayListResult),
+}
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+Bounds = Tuple[float, float, float, float]
+
+
+def distance_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle (haversine) distance between two points in miles
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def radius_bounds(lat: float, lon: float, miles: float) -> Bounds:
+    """
+    The bounding box of a circle
+    :return: (min lat, min lon, max lat, max lon)
+    """
+    d_lat = miles / MILES_PER_DEGREE_LAT
+    d_lon = miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon
+
+
+def merge_by_id(results: Iterable[Iterable]) -> List:
+    """
+    Merges results, keeping the first item with each id
+    """
+    merged = {}
+    for result in results:
+        for item in result:
+            merged.setdefault(item.id, item)
+    return list(merged.values())
+
+
+class _Tile:
+    # A cached sub-query result
+    __slots__ = ("items", "etag", "expires")
+
+    def __init__(self, items: List, etag: Optional[str], expires: float):
+        self.items = items
+        self.etag = etag
+        self.expires = expires
+
+
+class QueryPlanner:
+    """
+    QueryPlanner splits large map bounds and radius queries into tiles of a fixed global grid, fetches the tiles
+    concurrently and merges the results, deduplicated by id. Tiles are cached for ttl seconds and revalidated with
+    their ETag afterwards, and concurrent queries that need the same tile share one request, so overlapping queries
+    from different callers reuse tiles instead of fetching them again.
+
+    Attributes:
+    stats: Counters of tiles fetched, served from cache, revalidated (304) and shared with a concurrent query
+
+    Methods:
+    query: Runs a query, tiled if it has map bounds or a radius
+    tiles: Returns the tiles covering a bounding box
+    clear: Empties the tile cache
+    """
+
+    def __init__(self, client: OHGOClient, tile_size: float = 0.25, ttl: float = 60.0, max_workers: int = 8,
+                 max_tiles: int = 256, max_cached_tiles: int = 4096):
+        """
+        Constructor for QueryPlanner.
+        :param client: The OHGOClient used for the sub-queries
+        :param tile_size: The tile width and height in degrees
+        :param ttl: Seconds a tile is served from cache before it is revalidated
+        :param max_workers: The maximum number of concurrent sub-queries
+        :param max_tiles: Queries needing more tiles than this raise an OHGOException
+        :param max_cached_tiles: The maximum number of cached tiles, the least recently fetched are evicted first.
+        Tiles are also evicted once they expired more than ttl seconds ago.
+        """
+        self._client = client
+        self.tile_size = tile_size
+        self.ttl = ttl
+        self.max_tiles = max_tiles
+        self.max_cached_tiles = max_cached_tiles
+        self._next_purge = time.monotonic() + ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ohgo-planner")
+        self._cache: Dict[Tuple, _Tile] = {}
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "cached": 0, "revalidated": 0, "shared": 0}
+
+    def tiles(self, bounds: Bounds) -> List[Tuple[int, int]]:
+        """
+        Returns the grid tiles covering a bounding box
+        :param bounds: (min lat, min lon, max lat, max lon)
+        :return: A list of (row, column) tiles
+        """
+        min_lat, min_lon, max_lat, max_lon = bounds
+        rows = range(math.floor(min_lat / self.tile_size), math.floor(max_lat / self.tile_size) + 1)
+        columns = range(math.floor(min_lon / self.tile_size), math.floor(max_lon / self.tile_size) + 1)
+        if len(rows) * len(columns) > self.max_tiles:
+            raise OHGOException(f"Query needs {len(rows) * len(columns)} tiles, more than max_tiles {self.max_tiles}")
+        return [(row, column) for row in rows for column in columns]
+
+    def query(self, endpoint: str, params: QueryParams = None):
+        """
+        Runs a query. Queries with map bounds or a radius are split into tiles, fetched concurrently and filtered back
+        to the requested area. Other queries are passed through as one page_all request.
+        :param endpoint: The endpoint, e.g. "cameras" or "travel-delays"
+        :param params: The QueryParams (or DigitalSignParams, ...) of the query. page and page_size are ignored.
+        :return: The list result of the endpoint, e.g. CameraListResult, deduplicated by id
+        """
+        if endpoint not in ENDPOINTS:
+            raise OHGOException(f"Unknown endpoint {endpoint}")
+        method, list_result = ENDPOINTS[endpoint]
+        params = params or QueryParams()
+
+        if params.radius:
+            lat, lon, miles = map(float, params.radius)
+            bounds = radius_bounds(lat, lon, miles)
+
+            def keep(item):
+                return distance_miles(lat, lon, item.latitude, item.longitude) <= miles
+        elif params.map_bounds_sw and params.map_bounds_ne:
+            (min_lat, min_lon), (max_lat, max_lon) = params.map_bounds_sw, params.map_bounds_ne
+            bounds = (float(min_lat), float(min_lon), float(max_lat), float(max_lon))
+
+            def keep(item):
+                return bounds[0] <= item.latitude <= bounds[2] and bounds[1] <= item.longitude <= bounds[3]
+        else:
+            result = getattr(self._client, method)(params=replace(params, page_all=True, page=None, page_size=None))
+            return list_result(merge_by_id([result]))
+
+        # Every tile query carries the other filters, so they are part of the cache key
+        base = replace(params, map_bounds_sw=None, map_bounds_ne=None, radius=None, page=None, page_size=None,
+                       page_all=True)
+        filters = tuple(sorted((key, str(value)) for key, value in base.to_dict().items()))
+        futures = [self._tile(endpoint, method, base, filters, tile) for tile in self.tiles(bounds)]
+        items = merge_by_id(future.result() for future in futures)
+        return list_result([item for item in items if keep(item)])
+
+    def _tile(self, endpoint: str, method: str, base: QueryParams, filters: Tuple, tile: Tuple[int, int]) -> Future:
+        key = (endpoint, filters, tile)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached.expires > time.monotonic():
+                self.stats["cached"] += 1
+                future = Future()
+                future.set_result(cached.items)
+                return future
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats["shared"] += 1
+                return inflight
+            future = self._inflight[key] = self._executor.submit(self._fetch, key, method, base, tile, cached)
+            return future
+
+    def _fetch(self, key: Tuple, method: str, base: QueryParams, tile: Tuple[int, int],
+               cached: Optional[_Tile]) -> List:
+        row, column = tile
+        size = self.tile_size
+        params = replace(base, map_bounds_sw=(round(row * size, 6), round(column * size, 6)),
+                         map_bounds_ne=(round((row + 1) * size, 6), round((column + 1) * size, 6)))
+        try:
+            result = getattr(self._client, method)(params=params, etag=cached.etag if cached else None)
+            with self._lock:
+                if result.cached and cached is not None:
+                    self.stats["revalidated"] += 1
+                    items = cached.items
+                else:
+                    self.stats["fetched"] += 1
+                    items = list(result)
+                # Reinserted so the dict stays ordered from least to most recently fetched
+                self._cache.pop(key, None)
+                self._cache[key] = _Tile(items, result.etag, time.monotonic() + self.ttl)
+                self._evict()
+            return items
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _evict(self):
+        # Expired tiles are kept for one more ttl so they can still be revalidated with their ETag
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._next_purge = now + self.ttl
+            for key in [key for key, tile in self._cache.items() if tile.expires + self.ttl < now]:
+                del self._cache[key]
+        while len(self._cache) > self.max_cached_tiles:
+            del self._cache[next(iter(self._cache))]
+
+    def clear(self):
+        """
+        Empties the tile cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        """
+        Shuts down the worker threads
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RegionShardedFetcher:
+    """
+    RegionShardedFetcher fetches a whole endpoint statewide as one query per Region, run concurrently, and merges the
+    results deduplicated by id (regions overlap). Each region keeps its own ETag, so on later polls only the regions
+    that changed are downloaded again and the others are reused. If a region fails but was fetched before, its
+    previous results are reused so one slow or failing region does not fail the whole refresh.
+
+    Regions do not necessarily cover every result, so each fetch also requests the statewide totalResultCount (one
+    result per page). If the merged regions hold a different number of results, the endpoint is fetched statewide in
+    one query instead.
+
+    Attributes:
+    changed: The regions downloaded by the last fetch, the others were unchanged (304)
+    failed: The regions whose previous results were reused by the last fetch because their request failed
+    fell_back: True if the regions did not match the statewide count in the last fetch, which then made one statewide
+    query
+
+    Methods:
+    fetch: Fetches an endpoint statewide
+    """
+
+    def __init__(self, client: OHGOClient, regions: Iterable[Region] = None, max_workers: int = None):
+        """
+        Constructor for RegionShardedFetcher.
+        :param client: The OHGOClient used for the region queries
+        :param regions: (optional) The regions to query, defaults to every Region
+        :param max_workers: (optional) The maximum number of concurrent queries, defaults to one per region plus one
+        for the statewide count
+        """
+        self._client = client
+        self.regions = list(regions or Region)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.regions) + 1,
+                                            thread_name_prefix="ohgo-regions")
+        self._shards: Dict[Tuple, _Tile] = {}
+        self._lock = threading.Lock()
+        self.changed: List[Region] = []
+        self.failed: List[Region] = []
+        self.fell_back = False
+
+    def fetch(self, endpoint: str, params: QueryParams = None):
+        """
+        Fetches an endpoint statewide, one concurrent query per region
+        :param endpoint: The endpoint, e.g. "cameras" or "travel-delays"
+        :param params: (optional) Extra filters, e.g. DigitalSignParams(sign_type=SignType.DMS). region, bounds and
+        paging are ignored.
+        :return: The list result of the endpoint, e.g. CameraListResult, deduplicated by id. Unlike the get_* methods
+        of OHGOClient, it always holds every result, also when no region changed: check changed (empty if every region
+        was a 304) instead of cached, which is always False. If the regions missed results, the result of a statewide
+        query, with fell_back set.
+        """
+        if endpoint not in ENDPOINTS:
+            raise OHGOException(f"Unknown endpoint {endpoint}")
+        method, list_result = ENDPOINTS[endpoint]
+        base = replace(params or QueryParams(), region=None, map_bounds_sw=None, map_bounds_ne=None, radius=None,
+                       page=None, page_size=None, page_all=True)
+        filters = tuple(sorted((key, str(value)) for key, value in base.to_dict().items()))
+        futures = {region: self._executor.submit(self._fetch, (endpoint, filters, region), method, base, region)
+                   for region in self.regions}
+        total = self._executor.submit(self._total, endpoint, base)
+
+        changed, failed, shards = [], [], []
+        for region, future in futures.items():
+            try:
+                items, downloaded = future.result()
+            except (OHGOException, OSError):  # requests' connection errors are OSErrors
+                with self._lock:
+                    previous = self._shards.get((endpoint, filters, region))
+                if previous is None:
+                    raise
+                items, downloaded = previous.items, False
+                failed.append(region)
+            if downloaded:
+                changed.append(region)
+            shards.append(items)
+        self.changed, self.failed = changed, failed
+        merged = merge_by_id(shards)
+        try:
+            expected = total.result()
+        except (OHGOException, OSError) as e:
+            logger.warning(f"Could not check that the regions cover every {endpoint} result: {e}")
+            expected = None
+        self.fell_back = expected is not None and expected != len(merged)
+        if self.fell_back:
+            logger.warning(f"The regions returned {len(merged)} of {expected} {endpoint} results, fetching statewide")
+            merged, _ = self._fetch((endpoint, filters, None), method, base, None)
+        return list_result(merged)
+
+    def _total(self, endpoint: str, base: QueryParams) -> Optional[int]:
+        # The statewide totalResultCount, with a single result per page so the response stays small
+        params = replace(base, page_size=1, page_all=None)
+        result = self._client.stream(endpoint, params)
+        for _ in result:
+            pass
+        return result.total_result_count
+
+    def _fetch(self, key: Tuple, method: str, base: QueryParams, region: Region) -> Tuple[List, bool]:
+        with self._lock:
+            previous = self._shards.get(key)
+        result = getattr(self._client, method)(params=replace(base, region=region) if region else base,
+                                               etag=previous.etag if previous else None)
+        if result.cached and previous is not None:
+            return previous.items, False
+        items = list(result)
+        with self._lock:
+            self._shards[key] = _Tile(items, result.etag, 0.0)
+        return items, True
+
+    def close(self):
+        """
+        Shuts down the worker threads
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
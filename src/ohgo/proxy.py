@@ -0,0 +1,243 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from ohgo.exceptions import OHGOException
+from ohgo.models import ConstructionParams, DigitalSignParams, QueryParams, WeatherSensorSiteParams
+from ohgo.ohgo_client import OHGOClient
+from ohgo.planner import ENDPOINTS
+from ohgo.shared_cache import CacheEntry, SharedCache
+
+logger = logging.getLogger(__name__)
+
+
+def _param_names(params_class: type) -> frozenset:
+    # The query parameters of a params dataclass, as the OHGO API names them
+    return frozenset(field.name.replace("_", "-") for field in fields(params_class))
+
+
+# Query parameters forwarded for each endpoint, others are dropped so they cannot create cache entries
+ENDPOINT_PARAMS = {endpoint: _param_names(QueryParams) for endpoint in ENDPOINTS}
+ENDPOINT_PARAMS.update({
+    "digital-signs": _param_names(DigitalSignParams),
+    "construction": _param_names(ConstructionParams),
+    "weather-sensor-sites": _param_names(WeatherSensorSiteParams),
+})
+
+
+class _UpstreamError(OHGOException):
+    # A non-2xx response from the OHGO API, relayed to the downstream client as is
+    def __init__(self, status_code: int, reason: str, content: bytes, content_type: str):
+        super().__init__(f"{status_code}: {reason}")
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+
+
+class _ProxyHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, proxy: "OHGOProxy"):
+        self.proxy = proxy
+        super().__init__(address, _ProxyHandler)
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body back on kept-alive connections
+    disable_nagle_algorithm = True
+    server: _ProxyHTTPServer
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        proxy = self.server.proxy
+        proxy._count("requests")
+        url = urlsplit(self.path)
+        prefix = "/api/{}/".format(proxy.ver)
+        parts = url.path[len(prefix):].strip("/").split("/") if url.path.startswith(prefix) else []
+        if not parts or parts[0] not in ENDPOINTS or len(parts) > 2:
+            self._send(404, {"message": "Not found"})
+            return
+
+        try:
+            entry, stale = proxy.fetch("/".join(parts), parse_qsl(url.query))
+        except _UpstreamError as e:
+            proxy._count("upstream_errors")
+            self._write(e.status_code, e.content, e.content_type)
+            return
+        except (OHGOException, OSError) as e:  # requests' connection errors are OSErrors
+            proxy._count("upstream_errors")
+            self._send(502, {"message": f"OHGO API request failed: {e}"})
+            return
+
+        headers = {"Age": str(max(int(time.time() - entry.fetched), 0))}
+        if entry.etag:
+            headers["ETag"] = '"{}"'.format(entry.etag)
+        if stale:
+            headers["Warning"] = '110 - "Response is Stale"'
+        if entry.etag and self.headers.get("If-None-Match", "").strip('"') == entry.etag:
+            proxy._count("not_modified")
+            self._write(304, b"", None, headers)
+            return
+        # Links in the body point at the OHGO API, point them at this server so next pages are proxied too
+        host = self.headers.get("Host") or "{}:{}".format(*self.server.server_address[:2])
+        body = entry.body.replace(proxy.upstream_url.encode("utf-8"),
+                                  "http://{}{}".format(host, prefix).encode("utf-8"))
+        self._write(200, body, "application/json; charset=utf-8", headers)
+
+    def _send(self, status: int, body: Dict):
+        self._write(status, json.dumps(body).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _write(self, status: int, payload: bytes, content_type: Optional[str], headers: Dict = None):
+        self.server.proxy._count(str(status))
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class OHGOProxy:
+    """
+    OHGOProxy is a local caching proxy for the OHGO v1 API. It serves the same /api/v1/ routes as the OHGO API from a
+    SharedCache, so any number of services (OHGOClient(hostname="http://proxy-host:8080") or plain HTTP) share one
+    API key and one upstream feed.
+
+    Each query is requested from the OHGO API at most once per ttl: concurrent requests for a query are coalesced into
+    one upstream request (single flight), expired entries are revalidated with their ETag so unchanged data costs a
+    304, and downstream If-None-Match headers matching the cached ETag are answered with a 304. Processes (or hosts on
+    a shared filesystem) running proxies on the same cache file share it too. If the OHGO API fails, the last good
+    response is served with a Warning header.
+
+    Query parameters the endpoint does not support are dropped and the others normalized before they key the cache,
+    and upstream requests run on a fixed pool of upstream_workers threads, so downstream clients can neither grow the
+    cache beyond its max_entries nor the number of upstream connections.
+
+    Attributes:
+    hostname: The http://host:port to pass as the hostname of OHGOClient
+    upstream_url: The base URL of the OHGO API requests are forwarded to
+    cache: The SharedCache responses are served from
+    stats: Counters for requests, 304s, upstream errors, stale responses and each status code
+
+    Methods:
+    fetch: Returns the cached response of an API path and query, fetching or revalidating it if it expired
+    start: Starts serving on a background thread
+    serve_forever: Serves on the current thread until interrupted
+    stop: Stops the server
+    """
+
+    def __init__(self, client: OHGOClient, host: str = "127.0.0.1", port: int = 8080, cache: SharedCache = None,
+                 ttl: float = 30.0, max_entries: int = 1000, upstream_workers: int = 4):
+        """
+        Constructor for OHGOProxy. The server is bound immediately but only serves once started.
+        :param client: The OHGOClient, with the API key, requests are forwarded with
+        :param host: Interface to bind, defaults to localhost
+        :param port: Port to bind, 0 for any free port
+        :param cache: (optional) The SharedCache to serve from. Defaults to one in memory, pass a file to share it
+        between proxy processes.
+        :param ttl: Seconds a response is served without revalidating it, used if no cache is passed
+        :param max_entries: The maximum number of cached responses, used if no cache is passed
+        :param upstream_workers: The number of threads (and so connections) making requests to the OHGO API
+        """
+        self._client = client
+        self.upstream_url = client.url
+        self.ver = self.upstream_url.rstrip("/").rsplit("/", 1)[-1]
+        self.cache = cache or SharedCache(":memory:", ttl=ttl, max_entries=max_entries)
+        # Handler threads live for one downstream connection, upstream Sessions belong to these long-lived threads
+        self._upstream = ThreadPoolExecutor(max_workers=upstream_workers, thread_name_prefix="ohgo-proxy-upstream")
+        self.stats: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = _ProxyHTTPServer((host, port), self)
+        self.hostname = "http://{}:{}".format(*self._httpd.server_address[:2])
+
+    def fetch(self, path: str, query=()) -> Tuple[CacheEntry, bool]:
+        """
+        Returns the cached response of an API path and query, fetching or revalidating it if it expired
+        :param path: The path below the API base URL, e.g. "cameras" or "cameras/{id}"
+        :param query: The query parameters as (key, value) pairs. Parameters the endpoint does not support are dropped.
+        :return: The CacheEntry and whether it is a stale one served because the OHGO API failed
+        """
+        params = self._normalize(path.split("/", 1)[0], query)
+        key = self.upstream_url + path + "?" + urlencode(sorted(params.items()))
+
+        def refresh(etag: Optional[str]):
+            response = self._upstream.submit(self._client.get_raw, path, etag=etag, **params).result()
+            if response.status_code == 304:
+                return None
+            if response.ok:
+                return response.content, response.etag
+            raise _UpstreamError(response.status_code, response.message, response.content, response.content_type)
+
+        try:
+            return self.cache.fetch(key, refresh), False
+        except (OHGOException, OSError) as e:
+            entry = self.cache.get(key)
+            # 4xx answers (e.g. an unknown id) are relayed, other failures fall back to the last good response
+            if entry is None or (isinstance(e, _UpstreamError) and e.status_code < 500 and e.status_code != 429):
+                raise
+            logger.warning(f"Serving {path} from {time.time() - entry.fetched:.0f}s ago, the OHGO API is failing: {e}")
+            self._count("stale")
+            return entry, True
+
+    @staticmethod
+    def _normalize(endpoint: str, query) -> Dict[str, str]:
+        allowed = ENDPOINT_PARAMS.get(endpoint, frozenset())
+        params = {}
+        for name, value in query:
+            name, value = name.strip().lower(), value.strip()
+            if name not in allowed:
+                logger.debug(f"Dropping unsupported parameter {name} of {endpoint}")
+                continue
+            params[name] = value.lower() if value.lower() in ("true", "false") else value
+        return params
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def start(self) -> "OHGOProxy":
+        """
+        Starts serving on a daemon thread
+        :return: The proxy itself
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="ohgo-proxy", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serves on the current thread until interrupted, then closes the socket
+        """
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+            self._upstream.shutdown(wait=True)
+
+    def stop(self):
+        """
+        Stops the server, closes its socket and stops the upstream threads
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._upstream.shutdown(wait=True)
+
+    def __enter__(self) -> "OHGOProxy":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
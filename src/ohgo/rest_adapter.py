@@ -1,26 +1,56 @@
-import requests
-import requests.packages
-from typing import Dict, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Union
+from .decoders import JSONDecoder, get_decoder
 from .exceptions import OHGOException
-from .models import Result, CachedResult
+from .models import Result, CachedResult, RawResult
+from .streaming import IncrementalResultParser, StreamedResult
 from json import JSONDecodeError
 import logging
+import threading
+import weakref
 from io import BytesIO
+from urllib.parse import urlencode
+
+if TYPE_CHECKING:
+    # requests is imported on first use, it dominates the import time of the package
+    import requests
+    from .image_store import ImageStore
+    from .shared_cache import SharedCache
+
+# Bytes read from the socket at a time when streaming a response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _ThreadSession:
+    # Owns the Session of one thread. Only the thread's local data references it, so when the thread ends it is
+    # collected and its finalizer closes the Session and its kept-alive connections.
+    __slots__ = ("session", "__weakref__")
+
+    def __init__(self, session: "requests.Session"):
+        self.session = session
+        weakref.finalize(self, session.close)
 
 
 class RestAdapter:
     """
-    RestAdapter is a class for making HTTP requests to the OHGO API
+    RestAdapter is a class for making HTTP requests to the OHGO API. It is safe to share between threads: each thread
+    gets its own requests Session (Sessions are not thread safe), which keeps that thread's connections alive between
+    requests and is closed when the thread ends.
 
     Attributes:
     url: The base URL of the OHGO API
     _api_key: The API key for the OHGO API
     _ssl_verify: Whether to verify SSL certificates
     _logger: A logger for logging messages
+    _decoder: The JSONDecoder used to decode response bodies
+    _image_store: The ImageStore fetched images are written to and served from, if any
+    _response_cache: The SharedCache GET responses are shared through, if any
 
     Methods:
     get: Makes a GET request to the OHGO API
+    get_raw: Makes a GET request to the OHGO API and returns the undecoded response
     get_image: Fetches an image from a URL
+    stream: Makes a GET request to the OHGO API and parses the results as they arrive
+    close: Closes the Sessions of every thread
     _do: Makes a request to the OHGO API
     """
     def __init__(
@@ -30,23 +60,67 @@ class RestAdapter:
             ver: str = "v1",
             ssl_verify: bool = True,
             logger: logging.Logger = None,
+            decoder: Union[str, JSONDecoder] = None,
+            image_store: "ImageStore" = None,
+            response_cache: "SharedCache" = None,
     ):
         """
-        Constructor for RestAdapter. Initializes the base URL, API key, SSL verification, and logger.
-        :param hostname: hostname of the OHGO API. Almost always "publicapi.ohgo.com"
+        Constructor for RestAdapter. Initializes the base URL, API key, SSL verification, logger and JSON decoder.
+        :param hostname: hostname of the OHGO API. Almost always "publicapi.ohgo.com". May include a scheme
+        (e.g. "http://127.0.0.1:8080") to point the adapter at a local server, otherwise https is used.
         :param api_key: API key for the OHGO API
         :param ver: Version of the API to use. Defaults to "v1"
         :param ssl_verify: Whether to verify SSL certificates. Defaults to True
         :param logger: (optional) A logger to use for logging. Defaults to None. A new logger will be created if None.
+        :param decoder: (optional) A JSONDecoder or decoder name ("orjson", "ujson", "json"). Defaults to the fastest
+        installed decoder.
+        :param image_store: (optional) An ImageStore to write fetched images to. Images fetched less than its max_age
+        seconds ago are read from it instead of the network.
+        :param response_cache: (optional) A SharedCache to share GET responses through with other processes
         """
 
-        self.url = "https://{}/api/{}/".format(hostname, ver)
+        if "://" not in hostname:
+            hostname = "https://" + hostname
+        self.url = "{}/api/{}/".format(hostname.rstrip("/"), ver)
         self._api_key = api_key
         self._ssl_verify = ssl_verify
         self._logger = logger or logging.getLogger(__name__)
+        self._decoder = get_decoder(decoder)
+        self._image_store = image_store
+        self._response_cache = response_cache
+        self._local = threading.local()
+        # The Sessions of live threads, for close
+        self._sessions: "weakref.WeakSet[_ThreadSession]" = weakref.WeakSet()
+        self._sessions_lock = threading.Lock()
         if not ssl_verify:
+            import requests.packages
             requests.packages.urllib3.disable_warnings()
 
+    def _session(self) -> "requests.Session":
+        """
+        Returns the requests Session of the current thread, creating it on first use
+        """
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            import requests
+            session = requests.Session()
+            session.verify = self._ssl_verify
+            owner = self._local.owner = _ThreadSession(session)
+            with self._sessions_lock:
+                self._sessions.add(owner)
+        return owner.session
+
+    def close(self):
+        """
+        Closes the Sessions of every thread. Threads using the adapter afterwards get a new Session.
+        """
+        with self._sessions_lock:
+            owners = list(self._sessions)
+            self._sessions = weakref.WeakSet()
+        self._local = threading.local()
+        for owner in owners:
+            owner.session.close()
+
     def get(self, endpoint: str, ep_params: Dict = {}, fetch_all=False, etag: str = None) -> Result:
         """
         Makes a GET request to the OHGO API. If etag is provided and matches the etag from the next request we return
@@ -68,19 +142,99 @@ class RestAdapter:
                 next_page_url = page_result.next_page
         return result
 
+    def get_raw(self, endpoint: str, ep_params: Dict = {}, etag: str = None) -> RawResult:
+        """
+        Makes a GET request to the OHGO API and returns the response undecoded, whatever its status. It bypasses the
+        response cache, e.g. for a proxy or cache that stores the response itself.
+        :param endpoint: The endpoint (or full URL) to make the request to
+        :param ep_params: The parameters to pass to the endpoint
+        :param etag: The etag of the query, used for caching
+        :return: A RawResult object, with status code 304 if the etag is still current
+        """
+        response = self._request("GET", endpoint, ep_params, etag=etag)
+        return RawResult(response.status_code, response.reason, response.content,
+                         response.headers.get("ETag", "").strip('"') or None,
+                         response.headers.get("Content-Type", "application/json; charset=utf-8"))
+
     def get_image(self, url) -> BytesIO:
         """
-        Fetches an image from a URL
+        Fetches an image from a URL. With an image store, recently fetched images are read from disk and every fetched
+        image is stored.
         :param url: The URL to fetch the image from
         :return: A BytesIO object containing the image
         """
+        if self._image_store is not None:
+            # Already loaded by the store, imported here only to catch its errors
+            import sqlite3
+            if self._image_store.max_age > 0:
+                try:
+                    stored = self._image_store.latest(url, self._image_store.max_age)
+                except (sqlite3.Error, OSError) as e:
+                    self._logger.warning(f"Could not read {url} from the image store: {e}")
+                    stored = None
+                if stored is not None:
+                    return BytesIO(stored)
+        import requests
         try:
-            response = requests.get(url, verify=self._ssl_verify)
+            response = self._session().get(url)
             response.raise_for_status()
-            return BytesIO(response.content)
         except requests.RequestException as e:
             self._logger.error(f"Error while fetching image from {url}: {e}")
             raise OHGOException(f"Failed to fetch image from {url}") from e
+        if self._image_store is not None:
+            # A failing store (locked index, full disk) must not fail a fetch that succeeded
+            try:
+                self._image_store.put(url, response.content)
+            except (sqlite3.Error, OSError) as e:
+                self._logger.warning(f"Could not store {url} in the image store: {e}")
+        return BytesIO(response.content)
+
+    def stream(self, endpoint: str, ep_params: Dict = {}, fetch_all=False, etag: str = None,
+               item_factory: Callable[[Dict], Any] = None) -> Union[StreamedResult, CachedResult]:
+        """
+        Makes a GET request to the OHGO API and parses the response incrementally as it arrives. Results are yielded
+        one at a time, so memory stays flat regardless of the size of the response (e.g. with page-all).
+        :param endpoint: The endpoint to make the request to
+        :param ep_params: The parameters to pass to the endpoint
+        :param fetch_all: Whether to follow next page links. Defaults to False.
+        :param etag: The etag of the query, used for caching
+        :param item_factory: (optional) Converts each result dictionary as it is parsed, e.g. Camera.from_dict
+        :return: A StreamedResult to iterate over, or a CachedResult if the data has not changed
+        """
+        response = self._request("GET", endpoint, ep_params, etag=etag, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return CachedResult(etag=etag)
+        if not 299 >= response.status_code >= 200:
+            response.close()
+            raise OHGOException(f"{response.status_code}: {response.reason}")
+        pages = self._stream_pages(response, ep_params, fetch_all)
+        return StreamedResult(pages, response.status_code, response.reason,
+                              response.headers.get("ETag", "").strip('"'), item_factory)
+
+    def _stream_pages(self, response: "requests.Response", ep_params: Dict, fetch_all: bool):
+        """
+        Generator that feeds each response page through an IncrementalResultParser, following next page links if
+        fetch_all is set. Yields (envelope, items) for every chunk received.
+        """
+        while response is not None:
+            parser = IncrementalResultParser(self._decoder)
+            try:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    yield parser.envelope, parser.feed(chunk)
+            finally:
+                response.close()
+            parser.close()
+            self._log_rejected_filters(parser.envelope.get("rejectedFilters", []))
+
+            response = None
+            next_page = next((link['href'] for link in parser.envelope.get("links", [])
+                              if link['rel'] == 'next-page'), None)
+            if fetch_all and next_page:
+                response = self._request("GET", next_page, ep_params, stream=True)
+                if not 299 >= response.status_code >= 200:
+                    response.close()
+                    raise OHGOException(f"{response.status_code}: {response.reason}")
 
     def _do(
             self, http_method: str, endpoint: str, ep_params: Dict = {}, data: Dict = {}, etag: str = None
@@ -94,6 +248,76 @@ class RestAdapter:
         :param etag: The etag of the query, used for caching
         :return: A Result object
         """
+        if self._response_cache is not None and http_method == "GET":
+            return self._do_shared(endpoint, ep_params, etag)
+        response = self._request(http_method, endpoint, ep_params, data, etag)
+        if 299 >= response.status_code >= 200:
+            # ETag seems to come back surrounded by quotes, so we strip them
+            return self._result(response.status_code, response.reason, response.content,
+                                response.headers.get("ETag", "").strip('"'))
+        elif response.status_code == 304:
+            # Return cached result object with original etag
+            return CachedResult(etag=etag)
+
+        raise OHGOException(f"{response.status_code}: {response.reason}")
+
+    def _do_shared(self, endpoint: str, ep_params: Dict, etag: str = None) -> Union[Result, CachedResult]:
+        """
+        Helper method that serves a GET through the shared response cache. The cache revalidates with its own ETag,
+        the etag of the caller is compared with the cached response.
+        """
+        full_url = endpoint if endpoint.startswith('http') else self.url + endpoint
+        key = full_url + "?" + urlencode(sorted((k, str(v)) for k, v in ep_params.items() if v is not None))
+
+        def refresh(cached_etag: str):
+            response = self.get_raw(endpoint, ep_params, etag=cached_etag)
+            if response.status_code == 304:
+                return None
+            if response.ok:
+                return response.content, response.etag
+            raise OHGOException(f"{response.status_code}: {response.message}")
+
+        entry = self._response_cache.fetch(key, refresh)
+        if etag and entry.etag == etag:
+            return CachedResult(etag=etag)
+        return self._result(200, "OK", entry.body, entry.etag)
+
+    def _result(self, status_code: int, reason: str, content: bytes, etag: str) -> Result:
+        """
+        Helper method that decodes a response body into a Result
+        """
+        try:
+            # Decode straight from the response bytes, skipping requests' text decoding
+            data_out = self._decoder.decode(content)
+        except ValueError as e:
+            raise OHGOException("Failed to decode response.") from e
+
+        # Successful request
+        result = Result(
+            status_code=status_code,
+            message=reason,
+            data=data_out,
+            etag=etag,
+        )
+
+        self._log_rejected_filters(result.rejected_filters)
+
+        return result
+
+    def _request(
+            self, http_method: str, endpoint: str, ep_params: Dict = {}, data: Dict = {}, etag: str = None,
+            stream: bool = False
+    ) -> "requests.Response":
+        """
+        Helper method that sends a request to the OHGO API and returns the raw response
+        :param http_method: The HTTP method to use. Currently, OHGO only supports GET
+        :param endpoint: The endpoint (or full URL) to make the request to
+        :param ep_params: The parameters to pass to the endpoint
+        :param data: The data to pass to the endpoint.
+        :param etag: The etag of the query, used for caching
+        :param stream: Whether to defer downloading the response body
+        :return: A requests Response object
+        """
         full_url = endpoint if endpoint.startswith('http') else self.url + endpoint
         headers = {
             "Authorization": f"APIKEY {self._api_key}"
@@ -102,36 +326,19 @@ class RestAdapter:
             headers["If-None-Match"] = etag
         ep_params = {k: v for k, v in ep_params.items() if v is not None}
         try:
-            response = requests.request(
+            return self._session().request(
                 method=http_method,
                 url=full_url,
-                verify=self._ssl_verify,
                 headers=headers,
                 params=ep_params,
-                json=data,
+                # GETs have no body. An empty JSON body would be left unread on kept-alive connections.
+                json=data or None,
+                stream=stream,
             )
         except (ValueError, JSONDecodeError) as e:
             raise OHGOException("Request failed.") from e
-        if 299 >= response.status_code >= 200:
-            data_out = response.json()
-            # ETag seems to come back surrounded by quotes, so we strip them
-            etag = response.headers.get("ETag", "").strip('"')
-
-            # Successful request
-            result = Result(
-                status_code=response.status_code,
-                message=response.reason,
-                data=data_out,
-                etag=etag,
-            )
-
-            for query_filter in result.rejected_filters:
-                # OHGO rejected a filter, log a warning
-                self._logger.warning(f" Error: {query_filter['error']} - {query_filter['key']}:{query_filter['value']}")
-
-            return result
-        elif response.status_code == 304:
-            # Return cached result object with original etag
-            return CachedResult(etag=etag)
 
-        raise OHGOException(f"{response.status_code}: {response.reason}")
+    def _log_rejected_filters(self, rejected_filters: List[Dict]):
+        for query_filter in rejected_filters:
+            # OHGO rejected a filter, log a warning
+            self._logger.warning(f" Error: {query_filter['error']} - {query_filter['key']}:{query_filter['value']}")
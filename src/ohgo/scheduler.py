@@ -0,0 +1,263 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from ohgo.exceptions import OHGOException
+from ohgo.models import QueryParams
+from ohgo.ohgo_client import OHGOClient
+from ohgo.planner import ENDPOINTS
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest poll in the change rate estimate
+ALPHA = 0.2
+# Change rate floor, in changes per second, so an endpoint that never changed is still polled at max_interval
+MIN_RATE = 1e-6
+
+
+@dataclass
+class Watch:
+    """
+    Watch is an endpoint and params polled by a WatchScheduler.
+
+    Attributes:
+    endpoint: The endpoint, e.g. "dangerous-slowdowns"
+    params: The QueryParams of the poll
+    callback: Called with the new list result whenever it changed
+    min_interval / max_interval: The bounds of the poll interval in seconds
+    result: The last list result that changed, None before the first successful poll
+    etag: The ETag of result
+    interval: The current poll interval in seconds
+    next_poll: When the watch is next due, time.monotonic() seconds
+    last_poll / last_attempt: When the watch was last polled successfully / at all, time.monotonic() seconds
+    polls / changes / not_modified / errors: Counters of polls, 200s, 304s and failed polls
+    """
+    endpoint: str
+    params: QueryParams
+    callback: Optional[Callable[[Any], None]] = None
+    min_interval: float = 5.0
+    max_interval: float = 900.0
+    result: Any = None
+    etag: Optional[str] = None
+    interval: float = 0.0
+    next_poll: float = 0.0
+    last_poll: Optional[float] = None
+    last_attempt: Optional[float] = None
+    polls: int = 0
+    changes: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    # EWMA of changes per poll and seconds per poll, their ratio estimates changes per second
+    _changes: float = field(default=1.0, repr=False)
+    _seconds: float = field(default=0.0, repr=False)
+
+    @property
+    def rate(self) -> float:
+        """
+        The estimated change rate in changes per second
+        """
+        return max(self._changes / (self._seconds or self.min_interval), MIN_RATE)
+
+    def observe(self, changed: bool, elapsed: float):
+        """
+        Updates the change rate estimate with a poll
+        :param changed: True for a 200 with new data, False for a 304
+        :param elapsed: Seconds since the previous successful poll
+        """
+        if not self._seconds:
+            self._seconds = elapsed
+        self._changes = (1 - ALPHA) * self._changes + ALPHA * changed
+        self._seconds = (1 - ALPHA) * self._seconds + ALPHA * elapsed
+
+
+class WatchScheduler:
+    """
+    WatchScheduler polls endpoints with ETags and adapts each poll interval to how often the endpoint actually changes.
+    The change rate of each watch is learned from its 200 vs 304 history (an exponentially weighted moving average),
+    and the request budget is split so that each interval is proportional to 1 / sqrt(change rate): fast-changing
+    endpoints are polled more often, but rarely changing ones are not starved. Intervals stay within the min and max
+    of each watch.
+
+    Attributes:
+    budget: The total requests per second spread over every watch
+
+    Methods:
+    watch: Adds an endpoint and params to poll
+    unwatch: Removes a watch
+    poll_due: Polls the watches that are due
+    run: Polls until stopped
+    start: Polls on a background thread
+    stop: Stops the background thread
+    """
+
+    def __init__(self, client: OHGOClient, budget: float = 1.0):
+        """
+        Constructor for WatchScheduler.
+        :param client: The OHGOClient used to poll
+        :param budget: The total requests per second spread over every watch. A watch is never polled more often than
+        its min_interval, so less may be used.
+        """
+        self._client = client
+        self.budget = budget
+        self.watches: List[Watch] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watch(self, endpoint: str, params: QueryParams = None, callback: Callable[[Any], None] = None,
+              min_interval: float = 5.0, max_interval: float = 900.0) -> Watch:
+        """
+        Adds an endpoint and params to poll. The first poll is due immediately.
+        :param endpoint: The endpoint, e.g. "dangerous-slowdowns"
+        :param params: (optional) The QueryParams of the poll
+        :param callback: (optional) Called with the new list result whenever it changed
+        :param min_interval: The shortest poll interval in seconds
+        :param max_interval: The longest poll interval in seconds
+        :return: The Watch, its result and counters are updated by every poll
+        """
+        if endpoint not in ENDPOINTS:
+            raise OHGOException(f"Unknown endpoint {endpoint}")
+        if min_interval > max_interval:
+            raise OHGOException("min_interval must not be greater than max_interval")
+        # next_poll stays 0, so the first poll is due whichever clock poll_due is given
+        watch = Watch(endpoint, params or QueryParams(), callback, min_interval, max_interval, interval=min_interval)
+        with self._lock:
+            self.watches.append(watch)
+            self._plan()
+        return watch
+
+    def unwatch(self, watch: Watch):
+        """
+        Removes a watch
+        """
+        with self._lock:
+            self.watches.remove(watch)
+            self._plan()
+
+    def _plan(self):
+        # Interval = scale / sqrt(rate), with scale chosen so the polls per second add up to the budget. Watches
+        # clamped to their min or max are fixed and the scale is solved again for the rest.
+        free = list(self.watches)
+        fixed_rate = 0.0
+        for _ in range(len(self.watches) + 1):
+            if not free:
+                break
+            roots = sum(math.sqrt(watch.rate) for watch in free)
+            remaining = self.budget - fixed_rate
+            scale = roots / remaining if remaining > 0 else math.inf
+            clamped = []
+            for watch in free:
+                interval = scale / math.sqrt(watch.rate)
+                watch.interval = min(max(interval, watch.min_interval), watch.max_interval)
+                if watch.interval != interval:
+                    clamped.append(watch)
+            if not clamped:
+                break
+            for watch in clamped:
+                free.remove(watch)
+                fixed_rate += 1 / watch.interval
+        for watch in self.watches:
+            if watch.last_attempt is not None:
+                watch.next_poll = watch.last_attempt + watch.interval
+
+    def poll_due(self, now: float = None) -> List[Watch]:
+        """
+        Polls the watches that are due and replans the intervals
+        :param now: (optional) time.monotonic() seconds, defaults to now. A caller supplied clock (e.g. in a
+        simulation) is also used to stamp the polls, so it must be used for every call.
+        :return: The watches whose result changed
+        """
+        until = time.monotonic() if now is None else now
+        with self._lock:
+            due = [watch for watch in self.watches if watch.next_poll <= until]
+        changed = [watch for watch in due if self._poll(watch, now)]
+        with self._lock:
+            self._plan()
+        for watch in changed:
+            if watch.callback is not None:
+                try:
+                    watch.callback(watch.result)
+                except Exception:  # A failing callback must not stop the other watches
+                    logger.exception(f"Watch callback for {watch.endpoint} failed")
+        return changed
+
+    def _poll(self, watch: Watch, now: float = None) -> bool:
+        method, _ = ENDPOINTS[watch.endpoint]
+        started = time.monotonic() if now is None else now
+        watch.last_attempt = started
+        try:
+            result = getattr(self._client, method)(params=watch.params, etag=watch.etag)
+        except (OHGOException, OSError) as e:  # requests' connection errors are OSErrors
+            logger.warning(f"Polling {watch.endpoint} failed: {e}")
+            with self._lock:
+                watch.errors += 1
+                watch.next_poll = started + watch.interval
+            return False
+        with self._lock:
+            watch.polls += 1
+            modified = not result.cached or watch.result is None
+            if watch.last_poll is not None:
+                watch.observe(modified, started - watch.last_poll)
+            watch.last_poll = started
+            if modified:
+                watch.changes += 1
+                watch.result, watch.etag = result, result.etag
+            else:
+                watch.not_modified += 1
+            watch.next_poll = started + watch.interval
+        return modified
+
+    def seconds_until_due(self, now: float = None) -> float:
+        """
+        Seconds until the next watch is due, 0 if one is due
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self.watches:
+                return math.inf
+            return max(min(watch.next_poll for watch in self.watches) - now, 0.0)
+
+    def run(self):
+        """
+        Polls until stop is called
+        """
+        while not self._stopped.is_set():
+            self.poll_due()
+            self._stopped.wait(min(self.seconds_until_due(), 1.0))
+
+    def start(self) -> "WatchScheduler":
+        """
+        Polls on a daemon thread
+        :return: The scheduler itself
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, name="ohgo-watch-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the background thread after its current poll
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "WatchScheduler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stats(self) -> List[Dict]:
+        """
+        Returns the counters, change rate and interval of every watch
+        """
+        with self._lock:
+            return [{"endpoint": watch.endpoint, "params": dict(watch.params), "polls": watch.polls,
+                     "changes": watch.changes, "not_modified": watch.not_modified, "errors": watch.errors,
+                     "changes_per_hour": watch.rate * 3600, "interval": watch.interval} for watch in self.watches]
@@ -0,0 +1,282 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from ohgo.exceptions import OHGOException
+
+logger = logging.getLogger(__name__)
+
+# Seconds a statement waits for another process holding the database lock before failing
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    body BLOB NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_fetched ON entries (fetched);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+# Returns (body, etag) for a 200 or None for a 304, given the ETag of the cached body
+Refresh = Callable[[Optional[str]], Optional[Tuple[bytes, str]]]
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """
+    CacheEntry is a response body in a SharedCache.
+
+    Attributes:
+    body: The raw response body
+    etag: The ETag of the response
+    fetched: When the response was fetched or last revalidated, seconds since the epoch
+    """
+    body: bytes
+    etag: Optional[str]
+    fetched: float
+
+
+class SharedCache:
+    """
+    SharedCache is a response cache in a SQLite file that every process on a host can share. When an entry is older
+    than ttl one process (or thread) takes a lease on its key and refreshes it with an ETag revalidation, and the
+    others keep reading the previous entry, or wait for the refresh if there is none, instead of making their own
+    requests. Leases expire after lease_timeout seconds, so a process that dies while refreshing does not block the key.
+
+    Entries not refreshed for max_age seconds are purged, and past max_entries the least recently refreshed are. If
+    the database fails (e.g. it stays locked), fetch bypasses it and calls refresh directly.
+
+    Pass it to OHGOClient(response_cache=...) to share every GET between the processes using the same file.
+
+    Attributes:
+    path: The SQLite file
+    ttl: Seconds an entry is served without refreshing it
+    max_entries: The maximum number of entries
+    max_age: Seconds an entry is kept without being refreshed, 0 to keep it until evicted by max_entries
+    stats: Counters of this process: fresh and stale hits, refreshes, 304 revalidations, waits for another process
+    and fetches that bypassed a failing database
+
+    Methods:
+    get: Returns the entry of a key, whatever its age
+    fetch: Returns the entry of a key, refreshing it first if it is older than ttl and no other process is
+    invalidate: Removes the entry of a key
+    clear: Removes every entry
+    """
+
+    def __init__(self, path: str, ttl: float = 30.0, lease_timeout: float = 30.0, wait_timeout: float = None,
+                 poll_interval: float = 0.05, max_entries: int = 10000, max_age: float = 24 * 3600):
+        """
+        Constructor for SharedCache. Creates the file if it does not exist.
+        :param path: The SQLite file, shared by every process using the cache
+        :param ttl: Seconds an entry is served without refreshing it
+        :param lease_timeout: Seconds a refresh may take before another process may take over the key
+        :param wait_timeout: (optional) Seconds to wait for another process to fetch a key that has no entry yet,
+        defaults to lease_timeout
+        :param poll_interval: Seconds between checks while waiting for another process
+        :param max_entries: The maximum number of entries, the least recently refreshed are evicted first
+        :param max_age: Seconds an entry is kept without being refreshed, defaults to a day. 0 keeps it until evicted
+        by max_entries.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = lease_timeout if wait_timeout is None else wait_timeout
+        self.poll_interval = poll_interval
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.stats = {"fresh": 0, "stale": 0, "refreshed": 0, "revalidated": 0, "waited": 0, "bypassed": 0}
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._next_purge = 0.0
+        try:
+            with self._lock:
+                self._connection().executescript(SCHEMA)
+        except sqlite3.Error as e:
+            raise OHGOException(f"Could not open the shared cache {path}: {e}") from e
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork, so a forked worker opens its own
+        if self._db is None or self._pid != os.getpid():
+            # Transactions are managed explicitly, so the lease check and update run in one BEGIN IMMEDIATE
+            self._db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._db
+
+    @staticmethod
+    def _owner() -> str:
+        return "{}:{}".format(os.getpid(), threading.get_ident())
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the entry of a key, whatever its age
+        :param key: The key, e.g. the URL of the request
+        :return: The CacheEntry, None if the key has no entry
+        """
+        try:
+            return self._get(key)
+        except sqlite3.Error as e:
+            raise OHGOException(f"Shared cache {self.path} failed: {e}") from e
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._connection().execute("SELECT body, etag, fetched FROM entries WHERE key = ?",
+                                             (key,)).fetchone()
+        return None if row is None else CacheEntry(bytes(row[0]), row[1], row[2])
+
+    def fetch(self, key: str, refresh: Refresh) -> CacheEntry:
+        """
+        Returns the entry of a key. If it is older than ttl, refreshes it unless another process already is, in which
+        case the older entry is returned, or waited for if there is none.
+        :param key: The key, e.g. the URL of the request
+        :param refresh: Called with the ETag of the entry (None if there is none), returns (body, etag) for new data
+        or None if the data has not changed (a 304)
+        :return: The CacheEntry
+        """
+        entry = None
+        try:
+            entry = self._get(key)
+            if entry is not None and time.time() - entry.fetched <= self.ttl:
+                self._count("fresh")
+                return entry
+            deadline = time.monotonic() + self.wait_timeout
+            waited = False
+            while True:
+                if self._acquire(key):
+                    try:
+                        return self._refresh(key, refresh)
+                    finally:
+                        self._release(key)
+                if entry is not None:
+                    # Another process is refreshing it
+                    self._count("stale")
+                    return entry
+                if not waited:
+                    waited = True
+                    self._count("waited")
+                if time.monotonic() > deadline:
+                    raise OHGOException(f"Timed out waiting for another process to fetch {key}")
+                time.sleep(self.poll_interval)
+                entry = self._get(key)
+                if entry is not None:
+                    return entry
+        except sqlite3.Error as e:
+            # A failing cache must not fail the request, it is fetched without the cache
+            logger.warning(f"Shared cache {self.path} failed, fetching {key} directly: {e}")
+            self._count("bypassed")
+            fetched = refresh(entry.etag if entry is not None else None)
+            if fetched is not None:
+                return CacheEntry(fetched[0], fetched[1], time.time())
+            if entry is None:
+                raise OHGOException(f"Got a 304 for {key} without a cached entry") from e
+            return CacheEntry(entry.body, entry.etag, time.time())
+
+    def _refresh(self, key: str, refresh: Refresh) -> CacheEntry:
+        # Another process may have refreshed the key between the first read and the lease
+        entry = self._get(key)
+        if entry is not None and time.time() - entry.fetched <= self.ttl:
+            self._count("fresh")
+            return entry
+        fetched = refresh(entry.etag if entry is not None else None)
+        now = time.time()
+        if fetched is None:
+            if entry is None:
+                raise OHGOException(f"Got a 304 for {key} without a cached entry")
+            entry = CacheEntry(entry.body, entry.etag, now)
+            name, sql, args = "revalidated", "UPDATE entries SET fetched = ? WHERE key = ?", (now, key)
+        else:
+            entry = CacheEntry(fetched[0], fetched[1], now)
+            name = "refreshed"
+            sql = "INSERT OR REPLACE INTO entries (key, etag, body, fetched) VALUES (?, ?, ?, ?)"
+            args = (key, entry.etag, entry.body, now)
+        try:
+            with self._lock:
+                db = self._connection()
+                db.execute(sql, args)
+                self.stats[name] += 1
+                self._purge(db, now)
+        except sqlite3.Error as e:
+            # The response was fetched, it is returned even if it could not be stored
+            logger.warning(f"Could not store {key} in the shared cache {self.path}: {e}")
+        return entry
+
+    def _purge(self, db: sqlite3.Connection, now: float):
+        # The cap walks at most max_entries rows of the fetched index, so it runs on every write. Purging old entries
+        # and expired leases runs at most once per ttl (and per second) in each process.
+        db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY fetched DESC LIMIT -1 "
+                   "OFFSET ?)", (self.max_entries,))
+        if now < self._next_purge:
+            return
+        self._next_purge = now + max(self.ttl, 1.0)
+        if self.max_age:
+            db.execute("DELETE FROM entries WHERE fetched < ?", (now - self.max_age,))
+        db.execute("DELETE FROM leases WHERE expires < ?", (now,))
+
+    def _acquire(self, key: str) -> bool:
+        now = time.time()
+        owner = self._owner()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT owner, expires FROM leases WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now and row[0] != owner:
+                    return False
+                db.execute("INSERT OR REPLACE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                           (key, owner, now + self.lease_timeout))
+                return True
+            finally:
+                db.execute("COMMIT")
+
+    def _release(self, key: str):
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._owner()))
+        except sqlite3.Error as e:
+            # The lease expires after lease_timeout anyway
+            logger.warning(f"Could not release the lease on {key}: {e}")
+
+    def invalidate(self, key: str):
+        """
+        Removes the entry of a key
+        """
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            raise OHGOException(f"Shared cache {self.path} failed: {e}") from e
+
+    def clear(self):
+        """
+        Removes every entry
+        """
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            raise OHGOException(f"Shared cache {self.path} failed: {e}") from e
+
+    def close(self):
+        """
+        Closes the connection of this process
+        """
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
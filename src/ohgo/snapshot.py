@@ -0,0 +1,382 @@
+import inspect
+import json
+import mmap
+import os
+import sys
+import typing
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from ohgo.exceptions import OHGOException
+
+MAGIC = b"OHGOSNP1"
+VERSION = 1
+_ALIGN = 8
+_NULL_TIME = -2 ** 63
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Column kind -> array typecode
+_TYPECODES = {"float": "d", "int": "q", "bool": "b", "datetime": "q", "str": "i", "json": "i", "list": "q"}
+
+
+def _schema(model_class: Type) -> Tuple:
+    """
+    Derives the columnar schema of a model class from its constructor parameters and type hints
+    :return: ("struct", model_class, [(field, node), ...])
+    """
+    hints = typing.get_type_hints(model_class)
+    parameters = [name for name in inspect.signature(model_class.__init__).parameters if name != "self"]
+    return "struct", model_class, [(name, _node(hints[name])) for name in parameters]
+
+
+def _node(hint) -> Tuple:
+    origin = typing.get_origin(hint)
+    if origin is Union:
+        # Optional[X] is stored as X, strings and datetimes store None with a sentinel
+        hint = next(arg for arg in typing.get_args(hint) if arg is not type(None))
+        origin = typing.get_origin(hint)
+    if origin in (list, List):
+        return "list", _node(typing.get_args(hint)[0])
+    if hint is bool:
+        return ("bool",)
+    if hint is int:
+        return ("int",)
+    if hint is float:
+        return ("float",)
+    if hint is str:
+        return ("str",)
+    if hint is datetime:
+        return ("datetime",)
+    if inspect.isclass(hint) and hasattr(hint, "from_dict"):
+        return _schema(hint)
+    return ("json",)
+
+
+def _schema_to_header(node: Tuple) -> Any:
+    if node[0] == "struct":
+        return {"struct": node[1].__name__, "fields": [[name, _schema_to_header(child)] for name, child in node[2]]}
+    if node[0] == "list":
+        return {"list": _schema_to_header(node[1])}
+    return node[0]
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NULL_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(value: int, aware: bool) -> Optional[datetime]:
+    if value == _NULL_TIME:
+        return None
+    when = datetime.fromtimestamp(value // 1000000, tz=timezone.utc).replace(microsecond=value % 1000000)
+    return when if aware else when.replace(tzinfo=None)
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+
+def _encode(node: Tuple, path: str, values: List[Any], columns: Dict, strings: _StringTable):
+    kind = node[0]
+    if kind == "struct":
+        for name, child in node[2]:
+            _encode(child, f"{path}.{name}" if path else name, [getattr(value, name) for value in values], columns,
+                    strings)
+        return
+    if kind == "list":
+        offsets = array("q", [0])
+        flat = []
+        for value in values:
+            flat.extend(value or [])
+            offsets.append(len(flat))
+        columns[path] = {"kind": kind, "data": offsets}
+        _encode(node[1], path + "[]", flat, columns, strings)
+        return
+
+    column = {"kind": kind}
+    if kind == "str":
+        data = array("i", [strings.add(value) for value in values])
+    elif kind == "json":
+        data = array("i", [strings.add(json.dumps(value)) for value in values])
+    elif kind == "datetime":
+        data = array("q", [_to_micros(value) for value in values])
+        column["aware"] = any(value is not None and value.tzinfo is not None for value in values)
+    elif kind == "float":
+        data = array("d", [float("nan") if value is None else value for value in values])
+    else:
+        data = array(_TYPECODES[kind], [int(value) for value in values])
+    column["data"] = data
+    columns[path] = column
+
+
+def write_snapshot(path: str, items: Iterable[Any], model_class: Type = None, metadata: Dict = None) -> int:
+    """
+    Writes models to a compact, columnar binary snapshot. Strings are deduplicated across the whole file and
+    datetimes are stored as int64 microseconds since the epoch.
+    :param path: The file to write, replaced atomically
+    :param items: A list result (e.g. from client.get_cameras()) or any iterable of models of one type
+    :param model_class: The model class, required only if items may be empty
+    :param metadata: (optional) JSON serializable metadata to store, e.g. the poll time. The etag of a list result is
+    stored automatically.
+    :return: The number of bytes written
+    """
+    metadata = dict(metadata or {})
+    if getattr(items, "etag", None) and "etag" not in metadata:
+        metadata["etag"] = items.etag
+    items = list(items)
+    if model_class is None:
+        if not items:
+            raise OHGOException("model_class is required to write an empty snapshot")
+        model_class = type(items[0])
+
+    schema = _schema(model_class)
+    columns: Dict[str, Dict] = {}
+    strings = _StringTable()
+    _encode(schema, "", items, columns, strings)
+
+    blob = bytearray()
+    string_offsets = array("q", [0])
+    for value in strings.strings:
+        blob += value.encode("utf-8")
+        string_offsets.append(len(blob))
+
+    # Lay out the data blocks, each aligned so that columns can be cast in place
+    blocks: List[Tuple[str, bytes]] = [("#string_offsets", string_offsets.tobytes()), ("#string_data", bytes(blob))]
+    blocks += [(name, column["data"].tobytes()) for name, column in columns.items()]
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "model": model_class.__name__,
+        "count": len(items),
+        "strings": len(strings.strings),
+        "schema": _schema_to_header(schema),
+        "metadata": metadata,
+        "columns": {name: {key: value for key, value in column.items() if key != "data"}
+                    for name, column in columns.items()},
+        "blocks": {},
+    }
+    # The header stores block offsets, which depend on the header length, so lay out until the length is stable
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, data in blocks:
+            header["blocks"][name] = [offset, len(data)]
+            offset = _aligned(offset + len(data))
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        header_end = _aligned(len(MAGIC) + 8 + len(header_bytes))
+        if header_end <= data_start:
+            break
+        data_start = header_end
+    header_bytes += b" " * (data_start - len(MAGIC) - 8 - len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, data in blocks:
+            f.write(b"\0" * (header["blocks"][name][0] - f.tell()))
+            f.write(data)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class StringColumn:
+    """
+    StringColumn is a read-only view of a string column of a Snapshot. codes holds the int32 index of each row into
+    the snapshot's deduplicated string table (-1 for None). Strings are decoded lazily on access.
+    """
+
+    def __init__(self, snapshot: "Snapshot", codes: memoryview, is_json: bool = False):
+        self._snapshot = snapshot
+        self.codes = codes
+        self._is_json = is_json
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> Any:
+        value = self._snapshot.string(self.codes[index])
+        return json.loads(value) if self._is_json and value is not None else value
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self.codes)):
+            yield self[index]
+
+
+class Snapshot:
+    """
+    Snapshot reads a snapshot written by write_snapshot. The file is memory-mapped: numeric columns are exposed as
+    zero-copy memoryviews (which numpy.frombuffer can wrap without copying) and models are only built when rows are
+    accessed.
+
+    Attributes:
+    model_class: The model class stored in the snapshot
+    metadata: The metadata stored with the snapshot
+    etag: The etag of the stored result, if any
+
+    Methods:
+    column: Returns a column by its dotted path, e.g. "latitude" or "camera_views[].direction"
+    string: Returns an entry of the string table
+    close: Unmaps the file
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens and memory-maps a snapshot file.
+        :param path: The snapshot file
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC) + 8:
+                raise OHGOException(f"{path} is not an ohgo snapshot")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if bytes(self._view[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise OHGOException(f"{path} is not an ohgo snapshot")
+        header_length = int.from_bytes(self._view[len(MAGIC):len(MAGIC) + 8], "little")
+        start = len(MAGIC) + 8
+        try:
+            self._header = json.loads(bytes(self._view[start:start + header_length]))
+            if self._header["version"] != VERSION or self._header["byteorder"] != sys.byteorder:
+                raise OHGOException(f"{path} was written by an incompatible version or platform")
+            # A truncated file would otherwise only fail (or read garbage) once a column is accessed
+            if any(offset + length > len(self._view) for offset, length in self._header["blocks"].values()):
+                raise OHGOException(f"{path} is truncated")
+        except (ValueError, KeyError, TypeError) as e:
+            self.close()
+            raise OHGOException(f"{path} has a corrupt header: {e}") from e
+        except OHGOException:
+            self.close()
+            raise
+
+        self.metadata = self._header["metadata"]
+        self.etag = self.metadata.get("etag")
+        self.model_class = self._resolve_model(self._header["model"])
+        self._schema = _schema(self.model_class)
+        self._columns: Dict[str, Any] = {}
+        self._string_offsets = self._block("#string_offsets").cast("q")
+        self._string_data = self._block("#string_data")
+        self._strings: List[Optional[str]] = [None] * self._header["strings"]
+
+    @staticmethod
+    def _resolve_model(name: str) -> Type:
+        from ohgo import models
+        from ohgo.models import weather_sensor_site
+        model_class = getattr(models, name, None) or getattr(weather_sensor_site, name, None)
+        if model_class is None:
+            raise OHGOException(f"Unknown model {name} in snapshot")
+        return model_class
+
+    def _block(self, name: str) -> memoryview:
+        offset, length = self._header["blocks"][name]
+        return self._view[offset:offset + length]
+
+    def string(self, code: int) -> Optional[str]:
+        """
+        Returns an entry of the deduplicated string table
+        :param code: The index of the string, -1 for None
+        :return: The string
+        """
+        if code < 0:
+            return None
+        value = self._strings[code]
+        if value is None:
+            value = str(self._string_data[self._string_offsets[code]:self._string_offsets[code + 1]], "utf-8")
+            self._strings[code] = value
+        return value
+
+    def column(self, path: str) -> Union[memoryview, StringColumn]:
+        """
+        Returns a column without copying it. Floats, ints, bools and datetimes (int64 microseconds since the epoch)
+        are memoryviews over the mapped file, strings are StringColumns. Nested columns are addressed as e.g.
+        "camera_views[].direction"; list columns ("camera_views") hold the n + 1 offsets of each row's items.
+        :param path: The dotted path of the column
+        :return: A memoryview or StringColumn
+        """
+        column = self._columns.get(path)
+        if column is None:
+            info = self._header["columns"].get(path)
+            if info is None:
+                raise OHGOException(f"No column {path} in snapshot")
+            column = self._block(path).cast(_TYPECODES[info["kind"]])
+            if info["kind"] in ("str", "json"):
+                column = StringColumn(self, column, info["kind"] == "json")
+            self._columns[path] = column
+        return column
+
+    def _read(self, node: Tuple, path: str, row: int) -> Any:
+        kind = node[0]
+        if kind == "struct":
+            return node[1](*[self._read(child, f"{path}.{name}" if path else name, row) for name, child in node[2]])
+        column = self.column(path)
+        if kind == "list":
+            return [self._read(node[1], path + "[]", index) for index in range(column[row], column[row + 1])]
+        value = column[row]
+        if kind == "datetime":
+            return _from_micros(value, self._header["columns"][path]["aware"])
+        if kind == "bool":
+            return bool(value)
+        return value
+
+    def __len__(self) -> int:
+        return self._header["count"]
+
+    def __getitem__(self, row: int) -> Any:
+        """
+        Builds the model stored at a row
+        :param row: The row index
+        :return: A model object
+        """
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("Snapshot row out of range")
+        return self._read(self._schema, "", row)
+
+    def __iter__(self) -> Iterator[Any]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def close(self):
+        """
+        Releases the memory map. Columns obtained from the snapshot must not be used afterwards.
+        """
+        self._columns = {}
+        self._string_offsets = self._string_data = None
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # A caller still holds a column view, the map is released once it is garbage collected
+            pass
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"Snapshot({self.model_class.__name__}, count={len(self)})"
@@ -0,0 +1,248 @@
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ohgo.decoders import JSONDecoder
+from ohgo.exceptions import OHGOException
+
+_WHITESPACE = b" \t\n\r"
+# Characters that can end a value or change nesting depth
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb'[,}\]\s]')
+
+_START, _KEY, _COLON, _VALUE, _ARRAY, _DONE = range(6)
+
+
+class IncrementalResultParser:
+    """
+    IncrementalResultParser parses an OHGO response body as it arrives. Items of the top level "results" array are
+    decoded and returned one at a time as soon as they are complete, while every other top level key (links,
+    totalResultCount, rejectedFilters, ...) is collected into envelope. Consumed bytes are discarded, so memory use is
+    bounded by the largest single item rather than the whole response.
+
+    Attributes:
+    envelope: The decoded top level keys other than "results"
+    done: True once the closing brace of the response has been parsed
+
+    Methods:
+    feed: Parses the next chunk of bytes and returns the results completed by it
+    close: Checks that the whole document was parsed
+    """
+
+    def __init__(self, decoder: JSONDecoder, results_key: str = "results"):
+        """
+        Constructor for IncrementalResultParser.
+        :param decoder: The JSONDecoder used to decode each item and envelope value
+        :param results_key: The top level key whose array items are streamed
+        """
+        self.envelope: Dict[str, Any] = {}
+        self.done = False
+        self._decoder = decoder
+        self._results_key = results_key
+        self._buffer = bytearray()
+        self._pos = 0
+        self._state = _START
+        self._key = None
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """
+        Parses the next chunk of the response
+        :param chunk: The next bytes of the response body
+        :return: The decoded result items completed by this chunk, possibly empty
+        """
+        self._buffer += chunk
+        items = []
+        while self._step(items):
+            pass
+        # Drop everything already parsed so the buffer only holds the item currently arriving
+        del self._buffer[:self._pos]
+        self._pos = 0
+        return items
+
+    def close(self):
+        """
+        Ends parsing. Raises OHGOException if the response was truncated.
+        """
+        if not self.done:
+            raise OHGOException("Response ended before the JSON document was complete.")
+
+    def _skip_whitespace(self) -> bool:
+        buffer = self._buffer
+        while self._pos < len(buffer) and buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        return self._pos < len(buffer)
+
+    def _step(self, items: List[Any]) -> bool:
+        """
+        Advances the parser by one token. Returns False when more data is needed.
+        """
+        if self._state == _DONE or not self._skip_whitespace():
+            return False
+        buffer = self._buffer
+        char = buffer[self._pos]
+
+        if self._state == _START:
+            self._expect(char, b"{")
+            self._state = _KEY
+        elif self._state == _KEY:
+            if char == ord("}"):
+                self._pos += 1
+                self._state = _DONE
+                self.done = True
+                return False
+            if char == ord(","):
+                self._pos += 1
+                return True
+            end = _scan_value(buffer, self._pos)
+            if end < 0:
+                return False
+            self._key = self._decode(self._pos, end)
+            self._pos = end
+            self._state = _COLON
+        elif self._state == _COLON:
+            self._expect(char, b":")
+            self._state = _VALUE
+        elif self._state == _VALUE:
+            if self._key == self._results_key and char == ord("["):
+                self._pos += 1
+                self._state = _ARRAY
+                return True
+            end = _scan_value(buffer, self._pos)
+            if end < 0:
+                return False
+            self.envelope[self._key] = self._decode(self._pos, end)
+            self._pos = end
+            self._state = _KEY
+        elif self._state == _ARRAY:
+            if char == ord("]"):
+                self._pos += 1
+                self._state = _KEY
+                return True
+            if char == ord(","):
+                self._pos += 1
+                return True
+            end = _scan_value(buffer, self._pos)
+            if end < 0:
+                return False
+            items.append(self._decode(self._pos, end))
+            self._pos = end
+        return True
+
+    def _expect(self, char: int, expected: bytes):
+        if char != expected[0]:
+            raise OHGOException(f"Unexpected {chr(char)!r} in response, expected {expected.decode()!r}.")
+        self._pos += 1
+
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return self._decoder.decode(bytes(self._buffer[start:end]))
+        except ValueError as e:
+            raise OHGOException("Failed to decode response.") from e
+
+
+def _scan_value(buffer: bytearray, start: int) -> int:
+    """
+    Finds the end of the JSON value starting at start
+    :return: The index just past the value, or -1 if the value is not complete yet
+    """
+    first = buffer[start]
+    if first == ord('"'):
+        return _scan_string(buffer, start + 1)
+    if first not in b"{[":
+        match = _SCALAR_END.search(buffer, start)
+        return match.start() if match else -1
+
+    depth = 0
+    pos = start
+    while True:
+        match = _STRUCTURAL.search(buffer, pos)
+        if match is None:
+            return -1
+        char = buffer[match.start()]
+        if char == ord('"'):
+            pos = _scan_string(buffer, match.start() + 1)
+            if pos < 0:
+                return -1
+            continue
+        depth += 1 if char in b"{[" else -1
+        pos = match.start() + 1
+        if depth == 0:
+            return pos
+
+
+def _scan_string(buffer: bytearray, pos: int) -> int:
+    """
+    Finds the end of a JSON string whose opening quote is just before pos
+    :return: The index just past the closing quote, or -1 if the string is not complete yet
+    """
+    while True:
+        match = _STRING_SPECIAL.search(buffer, pos)
+        if match is None:
+            return -1
+        if buffer[match.start()] == ord('"'):
+            return match.start() + 1
+        # Skip the escaped character
+        pos = match.start() + 2
+        if pos > len(buffer):
+            return -1
+
+
+class StreamedResult:
+    """
+    StreamedResult is an iterator over the results of an OHGO API query that parses the response as it arrives.
+    links and total_result_count are available once the first result has been yielded, rejected_filters once
+    iteration has finished (OHGO sends it after the results).
+
+    Attributes:
+    status_code: The status code of the first response
+    message: The message of the first response
+    etag: The etag of the first response
+    links: The links returned from the query
+    total_result_count: The total number of results of the query
+    rejected_filters: The rejected filters returned from the query
+    cached: True if the data has not changed since the etag passed in, the stream is then empty
+    """
+
+    def __init__(self, pages: Iterator[Any], status_code: int, message: str = "", etag: str = None,
+                 item_factory: Callable[[Any], Any] = None, cached: bool = False):
+        """
+        Initializes the StreamedResult.
+        :param pages: An iterator of (envelope, items) pairs, one per chunk parsed, where envelope holds the top level
+        keys of the page seen so far and items the results completed by the chunk
+        :param status_code: The status code of the first response
+        :param message: The message of the first response
+        :param etag: The etag of the first response
+        :param item_factory: (optional) Converts each result dictionary, e.g. Camera.from_dict
+        :param cached: Whether this is an empty stream for an unchanged (304) query
+        """
+        self.status_code = status_code
+        self.message = message
+        self.etag = etag
+        self.links: List[Dict] = []
+        self.total_result_count: Optional[int] = None
+        self.rejected_filters: List[Dict] = []
+        self._pages = pages
+        self._item_factory = item_factory
+        self._consumed = False
+        self.cached = cached
+
+    def __iter__(self):
+        if self._consumed:
+            raise OHGOException("A StreamedResult can only be iterated once.")
+        self._consumed = True
+        for envelope, items in self._pages:
+            self._update(envelope)
+            for item in items:
+                yield self._item_factory(item) if self._item_factory else item
+
+    def _update(self, envelope: Dict):
+        # Links and counts describe the query as a whole, so they are taken from the first page
+        if "links" in envelope and not self.links:
+            self.links = envelope["links"]
+        if "totalResultCount" in envelope and self.total_result_count is None:
+            self.total_result_count = envelope["totalResultCount"]
+        if "rejectedFilters" in envelope:
+            self.rejected_filters = envelope["rejectedFilters"]
+
+    def __repr__(self):
+        return f"StreamedResult(status_code={self.status_code}, etag={self.etag})"
@@ -0,0 +1,2 @@
+from .payloads import ENDPOINTS, STATEWIDE_COUNTS, synthetic_results, envelope
+from .server import OHGOStubServer
@@ -0,0 +1,213 @@
+"""
+Synthetic OHGO v1 payloads. Results are deterministic for a given seed and follow the shape and value distribution
+of the real API, so they can stand in for recorded data in benchmarks, load tests and the stub server.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+BASE_URL = "https://publicapi.ohgo.com/api/v1/"
+IMAGE_URL = "https://itscameras.dot.state.oh.us/images/"
+
+ROUTES = ["I-70", "I-71", "I-75", "I-76", "I-77", "I-80", "I-90", "I-270", "I-271", "I-275", "I-475", "I-480",
+          "I-670", "I-675", "US-23", "US-30", "US-33", "US-35", "US-42", "US-62", "SR-2", "SR-4", "SR-8", "SR-315"]
+DIRECTIONS = ["North", "South", "East", "West"]
+SHORT_DIRECTIONS = ["N", "S", "E", "W", "PTZ"]
+DISTRICTS = ["District {}".format(i) for i in range(1, 13)]
+CONSTRUCTION_CATEGORIES = ["Roadwork - Planned", "Roadwork - Unplanned", "Bridge Work", "Utility Work"]
+CONSTRUCTION_STATUSES = ["Open", "Restricted", "Closed"]
+INCIDENT_CATEGORIES = ["Crash", "Disabled Vehicle", "Debris", "Flooding", "Police Activity"]
+ROAD_STATUSES = ["Open", "Restricted", "Closed"]
+SIGN_TYPES = ["DMS", "Message Board", "DDMS", "Travel Time", "Sign Queue", "Slow Traffic", "VSL"]
+SIGN_MESSAGES = ["CRASH AHEAD", "RIGHT LANE CLOSED", "EXIT 110 CLOSED", "USE CAUTION", "SLOW TRAFFIC AHEAD",
+                 "DOWNTOWN 12 MIN", "I-270 8 MIN", "BUCKLE UP", "ICE POSSIBLE", "AMBER ALERT"]
+PRECIPITATION = ["None", "Light Rain", "Rain", "Light Snow", "Snow", "Sleet"]
+SURFACE_STATUSES = ["Dry", "Wet", "Chemically Wet", "Ice Warning", "Snow/Ice Watch"]
+
+# Approximate statewide result counts for a page-all request to each endpoint
+STATEWIDE_COUNTS = {
+    "cameras": 1400,
+    "digital-signs": 550,
+    "construction": 1800,
+    "weather-sensor-sites": 190,
+    "incidents": 350,
+    "dangerous-slowdowns": 60,
+    "travel-delays": 900,
+}
+
+
+def _stamp(rng, base, days=0, hours=0):
+    when = base + timedelta(days=rng.randint(-days, days) if days else 0,
+                            minutes=rng.randint(-hours * 60, 0) if hours else 0)
+    return when.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _base(rng, endpoint, index, urls):
+    item_id = "{:014d}".format(1000 + index)
+    route = rng.choice(ROUTES)
+    location = "{} at {}".format(route, rng.choice(ROUTES))
+    return {
+        "links": [{"href": "{}{}/{}".format(urls[0], endpoint, item_id), "rel": "self"}],
+        "id": item_id,
+        "latitude": round(rng.uniform(38.4, 41.9), 6),
+        "longitude": round(rng.uniform(-84.8, -80.5), 6),
+        "location": location,
+        "description": "{} near mile {}".format(location, rng.randint(1, 240)),
+    }, route
+
+
+def _camera(rng, index, now, urls):
+    item, route = _base(rng, "cameras", index, urls)
+    views = []
+    for view in range(rng.choice([1, 1, 2, 2, 3, 4])):
+        path = "{}{}/{}-{}".format(urls[1], rng.choice(["CLE", "COL", "CIN"]), item["id"], view)
+        views.append({"direction": rng.choice(SHORT_DIRECTIONS), "smallUrl": path + "-small.jpg",
+                      "largeUrl": path + ".jpg", "mainRoute": route})
+    item["cameraViews"] = views
+    return item
+
+
+def _digital_sign(rng, index, now, urls):
+    item, route = _base(rng, "digital-signs", index, urls)
+    item["signTypeName"] = rng.choice(SIGN_TYPES)
+    item["messages"] = rng.sample(SIGN_MESSAGES, rng.randint(1, 3))
+    item["imageUrls"] = ["{}signs/{}.png".format(urls[1], item["id"])] if rng.random() < 0.2 else []
+    return item
+
+
+def _construction(rng, index, now, urls):
+    item, route = _base(rng, "construction", index, urls)
+    item.update({
+        "category": rng.choice(CONSTRUCTION_CATEGORIES),
+        "direction": rng.choice(DIRECTIONS),
+        "district": rng.choice(DISTRICTS),
+        "routeName": route,
+        "status": rng.choice(CONSTRUCTION_STATUSES),
+        "startDate": _stamp(rng, now - timedelta(days=60), days=60),
+        "endDate": _stamp(rng, now + timedelta(days=90), days=90),
+    })
+    return item
+
+
+def _weather_sensor_site(rng, index, now, urls):
+    item, route = _base(rng, "weather-sensor-sites", index, urls)
+    air = round(rng.uniform(-5.0, 95.0), 1)
+    item.update({
+        "severe": rng.random() < 0.1,
+        "condition": rng.choice(["", "Freezing", "Snow", "Rain"]),
+        "averageAirTemperature": "{} F".format(air),
+        "atmosphericSensors": [{
+            "airTemperature": air,
+            "dewpointTemperature": round(air - rng.uniform(0.0, 15.0), 1),
+            "humidity": round(rng.uniform(20.0, 100.0), 1),
+            "averageWindSpeed": round(rng.uniform(0.0, 25.0), 1),
+            "maximumWindSpeed": round(rng.uniform(0.0, 45.0), 1),
+            "windDirection": rng.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"]),
+            "precipitation": rng.choice(PRECIPITATION),
+            "precipitationRate": round(rng.uniform(0.0, 1.0), 2),
+            "visibility": round(rng.uniform(0.1, 10.0), 1),
+            "lastUpdate": _stamp(rng, now, hours=2),
+        } for _ in range(rng.choice([1, 1, 2]))],
+        "surfaceSensors": [{
+            "name": "{} Lane {}".format(rng.choice(["Driving", "Passing", "Bridge"]), sensor + 1),
+            "status": rng.choice(SURFACE_STATUSES),
+            "surfaceTemperature": round(air + rng.uniform(-8.0, 8.0), 1),
+            "subSurfaceTemperature": round(air + rng.uniform(-4.0, 4.0), 1),
+            "lastUpdate": _stamp(rng, now, hours=2),
+        } for sensor in range(rng.randint(1, 4))],
+    })
+    return item
+
+
+def _incident(rng, index, now, urls):
+    item, route = _base(rng, "incidents", index, urls)
+    item.update({
+        "category": rng.choice(INCIDENT_CATEGORIES),
+        "direction": rng.choice(DIRECTIONS),
+        "routeName": route,
+        "roadStatus": rng.choice(ROAD_STATUSES),
+    })
+    return item
+
+
+def _dangerous_slowdown(rng, index, now, urls):
+    item, route = _base(rng, "dangerous-slowdowns", index, urls)
+    normal = float(rng.choice([55, 60, 65, 70]))
+    item.update({
+        "normalMPH": normal,
+        "currentMPH": round(rng.uniform(5.0, normal / 2), 1),
+        "routeName": route,
+        "direction": rng.choice(DIRECTIONS),
+    })
+    return item
+
+
+def _travel_delay(rng, index, now, urls):
+    item, route = _base(rng, "travel-delays", index, urls)
+    start = round(rng.uniform(0.0, 230.0), 2)
+    normal = float(rng.choice([55, 60, 65, 70]))
+    current = round(rng.uniform(10.0, normal + 5), 1)
+    item.update({
+        "direction": rng.choice(DIRECTIONS),
+        "routeName": route,
+        "travelTime": round(rng.uniform(1.0, 20.0), 1),
+        "delayTime": round(max(0.0, rng.gauss(0.5, 2.0)), 1),
+        "startMileMarker": start,
+        "endMileMarker": round(start + rng.uniform(0.5, 8.0), 2),
+        "currentAvgSpeed": current,
+        "normalAvgSpeed": normal,
+    })
+    return item
+
+
+FACTORIES = {
+    "cameras": _camera,
+    "digital-signs": _digital_sign,
+    "construction": _construction,
+    "weather-sensor-sites": _weather_sensor_site,
+    "incidents": _incident,
+    "dangerous-slowdowns": _dangerous_slowdown,
+    "travel-delays": _travel_delay,
+}
+
+ENDPOINTS = list(FACTORIES)
+
+
+def envelope(endpoint, results, total=None, links=None, last_updated=None, base_url=BASE_URL):
+    """
+    Wraps a list of results in the OHGO v1 response envelope
+    :param endpoint: The endpoint the results came from
+    :param results: A list of result dictionaries
+    :param total: The totalResultCount to report, defaults to len(results)
+    :param links: The response links, defaults to a single self link
+    :param last_updated: The lastUpdated timestamp, defaults to now
+    :param base_url: The API base URL used for the default self link
+    :return: A dictionary shaped like an OHGO API response
+    """
+    total = len(results) if total is None else total
+    last_updated = last_updated or datetime.now(timezone.utc)
+    return {
+        "links": links if links is not None else [{"href": base_url + endpoint, "rel": "self"}],
+        "lastUpdated": last_updated.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "totalPageCount": 1,
+        "totalResultCount": total,
+        "currentResultCount": len(results),
+        "results": results,
+        "rejectedFilters": [],
+    }
+
+
+def synthetic_results(endpoint, size=None, seed=0, base_url=BASE_URL, image_url=IMAGE_URL):
+    """
+    Generates a deterministic list of synthetic results for an endpoint
+    :param endpoint: One of ENDPOINTS
+    :param size: The number of results to generate, defaults to the statewide count for the endpoint
+    :param seed: Random seed, the same seed always produces the same results
+    :param base_url: The API base URL used in each result's self link
+    :param image_url: The base URL of camera and sign images
+    :return: A list of result dictionaries
+    """
+    rng = random.Random("{}:{}".format(endpoint, seed))
+    now = datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc)
+    factory = FACTORIES[endpoint]
+    size = STATEWIDE_COUNTS[endpoint] if size is None else size
+    return [factory(rng, index, now, (base_url, image_url)) for index in range(size)]
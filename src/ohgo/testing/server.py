@@ -0,0 +1,491 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from ohgo.testing.payloads import ENDPOINTS, envelope, synthetic_results
+from ohgo.types import Region, SignType
+
+# Approximate (south, west, north, east) bounds used to answer region filters against synthetic data
+REGION_BOUNDS = {
+    Region.AKRON.value: (40.90, -81.70, 41.25, -81.30),
+    Region.CINCINNATI.value: (39.00, -84.75, 39.35, -84.20),
+    Region.CLEVELAND.value: (41.30, -82.00, 41.65, -81.40),
+    Region.COLUMBUS.value: (39.80, -83.25, 40.20, -82.75),
+    Region.DAYTON.value: (39.60, -84.40, 39.95, -83.95),
+    Region.TOLEDO.value: (41.50, -83.80, 41.80, -83.40),
+    Region.CENTRAL_OHIO.value: (39.50, -83.60, 40.60, -82.30),
+    # The four quadrants tile the whole state, so every result is in at least one region
+    Region.NE_OHIO.value: (40.60, -82.60, 42.00, -80.50),
+    Region.NW_OHIO.value: (40.60, -84.82, 42.00, -82.60),
+    Region.SE_OHIO.value: (38.40, -82.60, 40.60, -80.50),
+    Region.SW_OHIO.value: (38.40, -84.82, 40.60, -82.60),
+}
+
+COMMON_FILTERS = {"region", "map-bounds-sw", "map-bounds-ne", "radius", "page-size", "page", "page-all"}
+ENDPOINT_FILTERS = {
+    "digital-signs": {"sign-type"},
+    "construction": {"include-future", "future-only"},
+    "weather-sensor-sites": {"hazards-only"},
+}
+DEFAULT_PAGE_SIZE = 500
+EARTH_RADIUS_MILES = 3958.8
+
+
+class _Rejected(Exception):
+    pass
+
+
+def _floats(value: str, count: int) -> Tuple[float, ...]:
+    try:
+        parts = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        raise _Rejected("Invalid coordinate format")
+    if len(parts) != count:
+        raise _Rejected("Expected {} comma separated values".format(count))
+    return parts
+
+
+def _distance_miles(lat1, lon1, lat2, lon2) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def _in_bounds(item, bounds) -> bool:
+    south, west, north, east = bounds
+    return south <= item["latitude"] <= north and west <= item["longitude"] <= east
+
+
+def _is_true(value: str) -> bool:
+    if value.lower() not in ("true", "false"):
+        raise _Rejected("Expected true or false")
+    return value.lower() == "true"
+
+
+def _date(value: str) -> str:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise _Rejected("Expected a date in the format yyyy-mm-dd")
+
+
+def _sign_type_name(value: str) -> str:
+    return value.lower().replace(" ", "-")
+
+
+class _Dataset:
+    """
+    The results served for one endpoint, indexed by id. lastUpdated is taken from the time the results were set.
+    """
+
+    def __init__(self, results: List[Dict]):
+        self.results = results
+        self.by_id = {item["id"]: item for item in results}
+        self.last_updated = datetime.now(timezone.utc)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, stub: "OHGOStubServer"):
+        self.stub = stub
+        super().__init__(address, _StubHandler)
+
+    def process_request(self, request, client_address):
+        self.stub._count("connections")
+        super().process_request(request, client_address)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _StubHTTPServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub._count("requests")
+        if stub.latency or stub.jitter:
+            time.sleep(stub.latency + random.uniform(0, stub.jitter))
+        if stub._roll(stub.rate_limit_rate):
+            self._send(429, {"message": "Too many requests"}, {"Retry-After": str(stub.retry_after)})
+            return
+        if stub._roll(stub.error_rate):
+            self._send(500, {"message": "Injected error"})
+            return
+
+        url = urlsplit(self.path)
+        if url.path.startswith("/images/"):
+            self._send_image(url.path[len("/images/"):])
+            return
+
+        prefix = "/api/{}/".format(stub.ver)
+        if not url.path.startswith(prefix):
+            self._send(404, {"message": "Not found"})
+            return
+        if stub.api_key is not None and self.headers.get("Authorization") != "APIKEY {}".format(stub.api_key):
+            self._send(401, {"message": "Invalid API key"})
+            return
+
+        parts = url.path[len(prefix):].strip("/").split("/")
+        endpoint = parts[0]
+        dataset = stub._datasets.get(endpoint)
+        if dataset is None or len(parts) > 2:
+            self._send(404, {"message": "Not found"})
+            return
+
+        if len(parts) == 2:
+            item = dataset.by_id.get(parts[1])
+            results = [item] if item else []
+            body = envelope(endpoint, results, last_updated=dataset.last_updated, base_url=stub.base_url,
+                            links=[{"href": stub.base_url + url.path[len(prefix):], "rel": "self"}])
+        else:
+            body = stub._list_body(endpoint, dataset, parse_qsl(url.query))
+        self._send_json(body)
+
+    def _send_json(self, body: Dict):
+        # The ETag covers the content but not lastUpdated, so a query whose results did not change still revalidates
+        # after other results of the endpoint were updated
+        content = json.dumps({key: value for key, value in body.items() if key != "lastUpdated"}).encode("utf-8")
+        self._send_cacheable(json.dumps(body).encode("utf-8"), "application/json; charset=utf-8",
+                             hashlib.sha1(content).hexdigest())
+
+    def _send_image(self, name: str):
+        content_type = "image/png" if name.endswith(".png") else "image/jpeg"
+        self._send_cacheable(self.server.stub._image(name), content_type)
+
+    def _send_cacheable(self, payload: bytes, content_type: str, etag: str = None):
+        etag = etag or hashlib.sha1(payload).hexdigest()
+        if self.headers.get("If-None-Match", "").strip('"') == etag:
+            self.server.stub._count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", '"{}"'.format(etag))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._write(200, payload, content_type, {"ETag": '"{}"'.format(etag)})
+
+    def _send(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        self._write(status, json.dumps(body).encode("utf-8"), "application/json; charset=utf-8", headers or {})
+
+    def _write(self, status: int, payload: bytes, content_type: str, headers: Dict):
+        self.server.stub._count(str(status))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.stub._count("bytes_sent", len(payload))
+
+
+class OHGOStubServer:
+    """
+    OHGOStubServer is a local stand-in for the OHGO v1 API. It serves the routes used by OHGOClient from synthetic
+    (or caller supplied) results on a background thread, so polling, caching and load tests can run offline.
+
+    Supports pagination links and totalResultCount, rejectedFilters for invalid or unsupported filters, ETag and
+    If-None-Match 304 responses, generated camera and sign images, and injected latency, errors and 429s.
+
+    Attributes:
+    hostname: The http://host:port to pass as the hostname of OHGOClient
+    base_url: The API base URL served, used in result and pagination links
+    latency: Seconds added to every response
+    jitter: Up to this many extra seconds are added at random to every response
+    error_rate: Fraction of requests answered with a 500
+    rate_limit_rate: Fraction of requests answered with a 429
+    stats: Counters for connections, requests, bytes sent and each status code
+
+    Methods:
+    start: Starts serving on a background thread
+    stop: Stops the server
+    populate: Fills every endpoint with synthetic results
+    set_results: Replaces the results served for an endpoint
+    results: Returns the results served for an endpoint
+    update: Applies a function to every result of an endpoint, changing the ETags of the queries whose results change
+    """
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            ver: str = "v1",
+            api_key: str = None,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            rate_limit_rate: float = 0.0,
+            retry_after: int = 1,
+            page_size: int = DEFAULT_PAGE_SIZE,
+            image_size: Tuple[int, int] = (352, 240),
+            frame_interval: float = None,
+            seed: int = None,
+    ):
+        """
+        Constructor for OHGOStubServer. The server is bound immediately but only serves once started.
+        :param host: Interface to bind, defaults to localhost
+        :param port: Port to bind, defaults to 0 (any free port)
+        :param ver: API version served, defaults to "v1"
+        :param api_key: (optional) If set, requests without a matching APIKEY Authorization header get a 401
+        :param latency: Seconds added to every response
+        :param jitter: Up to this many extra seconds are added at random to every response
+        :param error_rate: Fraction of requests answered with a 500, between 0 and 1
+        :param rate_limit_rate: Fraction of requests answered with a 429, between 0 and 1
+        :param retry_after: Retry-After seconds sent with 429 responses
+        :param page_size: Page size used when a request does not set page-size
+        :param image_size: Width and height of generated camera images
+        :param frame_interval: (optional) Seconds between new camera frames. Frames never change if None.
+        :param seed: (optional) Seed for latency, error and 429 injection
+        """
+        self.ver = ver
+        self.api_key = api_key
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.image_size = image_size
+        self.frame_interval = frame_interval
+        self.stats: Dict[str, int] = {}
+        self._datasets: Dict[str, _Dataset] = {}
+        self._images: Dict[Tuple[str, int], bytes] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._thread = None
+        self._httpd = _StubHTTPServer((host, port), self)
+        self.hostname = "http://{}:{}".format(*self._httpd.server_address[:2])
+        self.base_url = "{}/api/{}/".format(self.hostname, ver)
+        self.image_url = "{}/images/".format(self.hostname)
+
+    def start(self) -> "OHGOStubServer":
+        """
+        Starts serving on a daemon thread. Endpoints are populated with synthetic results if none have been set.
+        :return: The server itself
+        """
+        if not self._datasets:
+            self.populate()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="ohgo-stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and closes its socket.
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "OHGOStubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def populate(self, size: int = None, seed: int = 0):
+        """
+        Fills every endpoint with synthetic results whose links and image URLs point at this server
+        :param size: Results per endpoint, defaults to the statewide count of each endpoint
+        :param seed: Random seed for the synthetic results
+        """
+        for endpoint in ENDPOINTS:
+            self.set_results(endpoint, synthetic_results(endpoint, size, seed, self.base_url, self.image_url))
+
+    def set_results(self, endpoint: str, results: List[Dict]):
+        """
+        Replaces the results served for an endpoint. ETags change for every query whose results change.
+        :param endpoint: The endpoint, e.g. "cameras"
+        :param results: A list of result dictionaries, each with at least id, latitude and longitude
+        """
+        with self._lock:
+            self._datasets[endpoint] = _Dataset(results)
+
+    def results(self, endpoint: str) -> List[Dict]:
+        """
+        Returns the results currently served for an endpoint
+        :param endpoint: The endpoint, e.g. "cameras"
+        :return: A list of result dictionaries
+        """
+        return self._datasets[endpoint].results
+
+    def update(self, endpoint: str, fn):
+        """
+        Applies fn to a copy of each result of an endpoint and serves the returned results
+        :param endpoint: The endpoint, e.g. "dangerous-slowdowns"
+        :param fn: A function taking a result dictionary and returning the new result dictionary
+        """
+        self.set_results(endpoint, [fn(dict(item)) for item in self.results(endpoint)])
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def _roll(self, rate: float) -> bool:
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    @staticmethod
+    def _predicate(key: str, value: str):
+        """
+        Validates a filter and returns a function that tests a result against it. Raises _Rejected if invalid.
+        """
+        if key == "region":
+            if value not in REGION_BOUNDS:
+                raise _Rejected("Unknown region")
+            return lambda item: _in_bounds(item, REGION_BOUNDS[value])
+        if key == "radius":
+            lat, lon, miles = _floats(value, 3)
+            return lambda item: _distance_miles(lat, lon, item["latitude"], item["longitude"]) <= miles
+        if key == "sign-type":
+            if value not in {sign_type.value for sign_type in SignType}:
+                raise _Rejected("Unknown sign type")
+            return lambda item: _sign_type_name(item.get("signTypeName", "")) == value
+        if key == "hazards-only":
+            hazards_only = _is_true(value)
+            return lambda item: not hazards_only or item.get("severe", False)
+        if key == "include-future":
+            # Active construction is always included, future construction only if it starts by the given date
+            date = _date(value)
+            return lambda item: item.get("startDate", "")[:10] <= date
+        if key == "future-only":
+            date = _date(value)
+            return lambda item: item.get("startDate", "")[:10] > date
+        return lambda item: True
+
+    def _list_body(self, endpoint: str, dataset: _Dataset, query: List[Tuple[str, str]]) -> Dict:
+        """
+        Builds the response body for a list request: applies filters, collects rejected filters and paginates.
+        """
+        params = dict(query)
+        allowed = COMMON_FILTERS | ENDPOINT_FILTERS.get(endpoint, set())
+        rejected = []
+        filters = []
+        for key, value in query:
+            if key not in allowed:
+                rejected.append({"key": key, "value": value, "error": "Unsupported filter"})
+            elif key not in ("page-size", "page", "page-all", "map-bounds-sw", "map-bounds-ne"):
+                filters.append((key, value))
+
+        if "map-bounds-sw" in params or "map-bounds-ne" in params:
+            try:
+                south, west = _floats(params.get("map-bounds-sw", ""), 2)
+                north, east = _floats(params.get("map-bounds-ne", ""), 2)
+                filters.append(("bounds", (south, west, north, east)))
+            except _Rejected as e:
+                rejected.append({"key": "map-bounds", "value": "{} {}".format(params.get("map-bounds-sw"),
+                                                                             params.get("map-bounds-ne")),
+                                 "error": str(e)})
+
+        results = dataset.results
+        for key, value in filters:
+            if key == "bounds":
+                results = [item for item in results if _in_bounds(item, value)]
+                continue
+            try:
+                predicate = self._predicate(key, value)
+            except _Rejected as e:
+                rejected.append({"key": key, "value": value, "error": str(e)})
+                continue
+            results = [item for item in results if predicate(item)]
+
+        total = len(results)
+        try:
+            page_all = _is_true(params.get("page-all", "false"))
+            page_size = max(1, int(params.get("page-size", self.page_size)))
+            page = max(1, int(params.get("page", 1)))
+        except (_Rejected, ValueError):
+            page_all, page_size, page = False, self.page_size, 1
+            rejected.append({"key": "page", "value": "", "error": "Invalid paging parameters"})
+
+        base_query = [(key, value) for key, value in query if key != "page"]
+        links = [{"href": self._page_url(endpoint, base_query, page), "rel": "self"}]
+        if not page_all:
+            page_count = max(1, math.ceil(total / page_size))
+            start = (page - 1) * page_size
+            results = results[start:start + page_size]
+            if page < page_count:
+                links.append({"href": self._page_url(endpoint, base_query, page + 1), "rel": "next-page"})
+            if page > 1:
+                links.append({"href": self._page_url(endpoint, base_query, page - 1), "rel": "previous-page"})
+        else:
+            page_count = 1
+
+        body = envelope(endpoint, results, total, links, dataset.last_updated, self.base_url)
+        body["totalPageCount"] = page_count
+        body["rejectedFilters"] = rejected
+        return body
+
+    def _page_url(self, endpoint: str, query: List[Tuple[str, str]], page: int) -> str:
+        return "{}{}?{}".format(self.base_url, endpoint, urlencode(query + [("page", page)]))
+
+    def _image(self, name: str) -> bytes:
+        frame = int(time.time() // self.frame_interval) if self.frame_interval else 0
+        key = (name, frame)
+        with self._lock:
+            image = self._images.get(key)
+        if image is None:
+            image = self._render_image(name, frame)
+            with self._lock:
+                self._images[key] = image
+        return image
+
+    def _render_image(self, name: str, frame: int) -> bytes:
+        from PIL import Image, ImageDraw
+
+        seed = int(hashlib.sha1(name.encode("utf-8")).hexdigest(), 16)
+        rng = random.Random(seed + frame)
+        width, height = self.image_size
+        image = Image.new("RGB", (width, height), (seed % 96, (seed >> 8) % 96 + 64, (seed >> 16) % 96 + 96))
+        draw = ImageDraw.Draw(image)
+        # Road and a few vehicles that move between frames
+        draw.polygon([(width * 0.4, 0), (width * 0.6, 0), (width, height), (0, height)], fill=(70, 70, 70))
+        for _ in range(8):
+            x, y = rng.uniform(0.1, 0.9) * width, rng.uniform(0.2, 0.95) * height
+            draw.rectangle([x, y, x + width * 0.05, y + height * 0.04],
+                           fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+        out = io.BytesIO()
+        image.save(out, format="PNG" if name.endswith(".png") else "JPEG", quality=80)
+        return out.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the OHGO v1 API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--api-key", help="Require this API key")
+    parser.add_argument("--size", type=int, help="Results per endpoint, defaults to statewide counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--frame-interval", type=float, help="Seconds between new camera frames")
+    args = parser.parse_args(argv)
+
+    server = OHGOStubServer(args.host, args.port, api_key=args.api_key, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                            frame_interval=args.frame_interval)
+    server.populate(args.size)
+    print("Serving OHGO stub on {}".format(server.base_url))
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
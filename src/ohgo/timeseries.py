@@ -0,0 +1,363 @@
+import math
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ohgo.exceptions import OHGOException
+
+Timestamp = Union[float, datetime]
+
+# Fields tracked by default for each model type
+DEFAULT_FIELDS = {
+    "TravelDelay": ("delay_time", "current_avg_speed"),
+    "DangerousSlowdown": ("current_mph",),
+}
+
+
+def to_epoch(timestamp: Optional[Timestamp]) -> float:
+    """
+    Converts a datetime or epoch seconds to epoch seconds. None is the current time, naive datetimes are UTC.
+    """
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class ChunkedColumn:
+    """
+    ChunkedColumn is an append-only column of numbers stored in fixed-size typed arrays. Appending never copies
+    existing data, and values are stored unboxed (8 bytes each for "d" and "q").
+
+    Methods:
+    append: Appends a value
+    slice: Returns the values in [start, stop) as a single array
+    bisect_left / bisect_right: Binary search, for columns appended in sorted order
+    """
+
+    def __init__(self, typecode: str = "d", chunk_size: int = 4096):
+        """
+        Constructor for ChunkedColumn.
+        :param typecode: The array typecode of the values, defaults to "d" (float64)
+        :param chunk_size: The number of values per chunk
+        """
+        self.typecode = typecode
+        self.chunk_size = chunk_size
+        self.chunks: List[array] = []
+        self._length = 0
+
+    def append(self, value):
+        if not self.chunks or len(self.chunks[-1]) == self.chunk_size:
+            self.chunks.append(array(self.typecode))
+        self.chunks[-1].append(value)
+        self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ChunkedColumn index out of range")
+        return self.chunks[index // self.chunk_size][index % self.chunk_size]
+
+    def __iter__(self) -> Iterator:
+        for chunk in self.chunks:
+            yield from chunk
+
+    def slice(self, start: int, stop: int) -> array:
+        """
+        Returns the values with indexes in [start, stop)
+        :return: An array of the values
+        """
+        out = array(self.typecode)
+        start, stop = max(0, start), min(stop, self._length)
+        while start < stop:
+            chunk = self.chunks[start // self.chunk_size]
+            offset = start % self.chunk_size
+            take = min(stop - start, self.chunk_size - offset)
+            out.extend(chunk[offset:offset + take])
+            start += take
+        return out
+
+    def _bisect(self, value, side) -> int:
+        if not self.chunks:
+            return 0
+        # Chunks are full except the last, so find the chunk by its first value and search within it
+        firsts = [chunk[0] for chunk in self.chunks]
+        chunk_index = max(0, side(firsts, value) - 1)
+        index = side(self.chunks[chunk_index], value)
+        if index == len(self.chunks[chunk_index]) and chunk_index + 1 < len(self.chunks):
+            return (chunk_index + 1) * self.chunk_size
+        return chunk_index * self.chunk_size + index
+
+    def bisect_left(self, value) -> int:
+        return self._bisect(value, bisect_left)
+
+    def bisect_right(self, value) -> int:
+        return self._bisect(value, bisect_right)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(chunk.itemsize * len(chunk) for chunk in self.chunks)
+
+
+class Series:
+    """
+    Series is the history of one value as a step function: each sample holds until the next one. NaN samples mark
+    times when the id was absent from a poll.
+    """
+
+    def __init__(self, chunk_size: int = 4096):
+        self.times = ChunkedColumn("d", chunk_size)
+        self.values = ChunkedColumn("d", chunk_size)
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """
+        Appends a sample if the value changed
+        :return: True if the sample was written
+        """
+        if len(self.times):
+            if timestamp < self.times[-1]:
+                raise OHGOException("Samples must be appended in time order")
+            last = self.values[-1]
+            if last == value or (math.isnan(last) and math.isnan(value)):
+                return False
+        self.times.append(timestamp)
+        self.values.append(value)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def value_at(self, timestamp: float) -> float:
+        """
+        Returns the value in effect at a time, NaN before the first sample
+        """
+        index = self.times.bisect_right(timestamp) - 1
+        return self.values[index] if index >= 0 else math.nan
+
+    def range(self, start: float, end: float) -> Tuple[array, array]:
+        """
+        Returns the samples in [start, end], preceded by the sample in effect at start
+        """
+        first = max(0, self.times.bisect_right(start) - 1)
+        last = self.times.bisect_right(end)
+        times, values = self.times.slice(first, last), self.values.slice(first, last)
+        if len(times) and times[0] < start:
+            times[0] = start
+        return times, values
+
+    def segments(self, start: float, end: float) -> Iterator[Tuple[float, float, float]]:
+        """
+        Yields (segment start, segment end, value) for each constant piece of the step function within [start, end)
+        """
+        times, values = self.range(start, end)
+        for index in range(len(times)):
+            segment_end = times[index + 1] if index + 1 < len(times) else end
+            if segment_end > times[index]:
+                yield times[index], segment_end, values[index]
+
+
+@dataclass
+class Bucket:
+    """
+    Aggregate of a series over one time bucket. The mean is weighted by how long each value was in effect.
+    min, mean and max are NaN if the id had no value during the bucket.
+    """
+    start: float
+    end: float
+    min: float
+    mean: float
+    max: float
+
+
+def _aggregate(segments: Iterable[Tuple[float, float, float]], start: float, end: float) -> Bucket:
+    low, high, weighted, duration = math.inf, -math.inf, 0.0, 0.0
+    for segment_start, segment_end, value in segments:
+        if math.isnan(value):
+            continue
+        width = min(segment_end, end) - max(segment_start, start)
+        if width <= 0:
+            continue
+        low, high = min(low, value), max(high, value)
+        weighted += value * width
+        duration += width
+    if not duration:
+        return Bucket(start, end, math.nan, math.nan, math.nan)
+    return Bucket(start, end, low, weighted / duration, high)
+
+
+class TimeSeriesStore:
+    """
+    TimeSeriesStore keeps the history of numeric model fields (e.g. TravelDelay.delay_time or
+    DangerousSlowdown.current_mph) per id in chunked, array-backed columns. Each poll only writes the values that
+    changed since the previous poll, and ids missing from a poll are recorded as gaps.
+
+    Methods:
+    append: Records a poll
+    ids: Returns the ids with history for a field
+    range: Returns the samples of an id and field within a time range
+    value_at: Returns the value of an id and field at a time
+    downsample: Aggregates min/mean/max per time bucket
+    rolling: Aggregates over a sliding window
+    """
+
+    def __init__(self, fields: Dict[str, Iterable[str]] = None, chunk_size: int = 4096):
+        """
+        Constructor for TimeSeriesStore.
+        :param fields: Model class name -> numeric fields to track. Defaults to TravelDelay delay_time and
+        current_avg_speed, and DangerousSlowdown current_mph.
+        :param chunk_size: Samples per array chunk
+        """
+        self.fields = {name: tuple(values) for name, values in (fields or DEFAULT_FIELDS).items()}
+        self._chunk_size = chunk_size
+        self._series: Dict[Tuple[str, str], Series] = {}
+        self._present: Dict[str, set] = {}
+
+    def append(self, items: Iterable, timestamp: Timestamp = None, kind: str = None) -> int:
+        """
+        Records one poll, e.g. the result of client.get_travel_delays(). Cached (304) results are ignored.
+        :param items: A list result or iterable of models
+        :param timestamp: The poll time as a datetime or epoch seconds, defaults to now
+        :param kind: (optional) The model class name the poll is complete for, e.g. "DangerousSlowdown". Taken from
+        the class of a list result; pass it for other iterables so that an empty poll records gaps for every id.
+        :return: The number of samples written
+        """
+        if getattr(items, "cached", False):
+            return 0
+        if kind is None:
+            model_class = getattr(type(items), "model_class", None)
+            kind = model_class().__name__ if model_class and model_class() else None
+        when = to_epoch(timestamp)
+        written = 0
+        # An empty poll of a kind still means every id of it disappeared
+        seen: Dict[str, set] = {kind: set()} if kind in self.fields else {}
+        for item in items:
+            model = type(item).__name__
+            fields = self.fields.get(model)
+            if not fields:
+                continue
+            seen.setdefault(model, set()).add(item.id)
+            for field in fields:
+                value = getattr(item, field)
+                written += self._get(item.id, field, create=True).append(when, math.nan if value is None else value)
+        for model, ids in seen.items():
+            # Ids that disappeared since the last poll of this model get a gap
+            for missing in self._present.get(model, set()) - ids:
+                for field in self.fields[model]:
+                    written += self._get(missing, field, create=True).append(when, math.nan)
+            self._present[model] = ids
+        return written
+
+    def _get(self, id: str, field: str, create: bool = False) -> Optional[Series]:
+        series = self._series.get((id, field))
+        if series is None:
+            if not create:
+                raise KeyError(f"No history for {id} {field}")
+            series = self._series[(id, field)] = Series(self._chunk_size)
+        return series
+
+    def ids(self, field: str) -> List[str]:
+        """
+        Returns the ids with history for a field
+        """
+        return [id for id, series_field in self._series if series_field == field]
+
+    def __len__(self) -> int:
+        """
+        The total number of samples stored
+        """
+        return sum(len(series) for series in self._series.values())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes used by the sample arrays
+        """
+        return sum(series.times.nbytes + series.values.nbytes for series in self._series.values())
+
+    def range(self, id: str, field: str, start: Timestamp, end: Timestamp) -> Tuple[array, array]:
+        """
+        Returns the samples of an id and field in [start, end]. The value in effect at start is included as the
+        first sample, timestamped start.
+        :return: (epoch seconds array, values array)
+        """
+        return self._get(id, field).range(to_epoch(start), to_epoch(end))
+
+    def value_at(self, id: str, field: str, timestamp: Timestamp) -> float:
+        """
+        Returns the value of an id and field at a time, NaN if unknown
+        """
+        return self._get(id, field).value_at(to_epoch(timestamp))
+
+    def downsample(self, id: str, field: str, start: Timestamp, end: Timestamp, bucket: float) -> List[Bucket]:
+        """
+        Aggregates min, time-weighted mean and max of an id and field per bucket
+        :param id: The id of the segment
+        :param field: The field, e.g. "delay_time"
+        :param start: Start of the first bucket
+        :param end: End of the last bucket
+        :param bucket: Bucket width in seconds
+        :return: A list of Buckets
+        """
+        if bucket <= 0:
+            raise OHGOException("bucket must be positive")
+        start, end = to_epoch(start), to_epoch(end)
+        segments = list(self._get(id, field).segments(start, end))
+        buckets = []
+        index = 0
+        bucket_start = start
+        while bucket_start < end:
+            bucket_end = min(bucket_start + bucket, end)
+            # Skip segments that ended before this bucket, segments are in time order
+            while index < len(segments) and segments[index][1] <= bucket_start:
+                index += 1
+            overlapping = []
+            for segment in segments[index:]:
+                if segment[0] >= bucket_end:
+                    break
+                overlapping.append(segment)
+            buckets.append(_aggregate(overlapping, bucket_start, bucket_end))
+            bucket_start = bucket_end
+        return buckets
+
+    def rolling(self, id: str, field: str, start: Timestamp, end: Timestamp, window: float,
+                step: float) -> List[Bucket]:
+        """
+        Aggregates min, time-weighted mean and max of an id and field over a sliding window
+        :param id: The id of the segment
+        :param field: The field, e.g. "current_mph"
+        :param start: Time of the first window end
+        :param end: Time of the last window end
+        :param window: Window length in seconds
+        :param step: Seconds between window ends
+        :return: A list of Buckets, one per window ending at start, start + step, ... end
+        """
+        if window <= 0 or step <= 0:
+            raise OHGOException("window and step must be positive")
+        start, end = to_epoch(start), to_epoch(end)
+        series = self._get(id, field)
+        segments = list(series.segments(start - window, end))
+        windows = []
+        window_end = start
+        first = 0
+        while window_end <= end:
+            window_start = window_end - window
+            while first < len(segments) and segments[first][1] <= window_start:
+                first += 1
+            overlapping = []
+            for segment in segments[first:]:
+                if segment[0] >= window_end:
+                    break
+                overlapping.append(segment)
+            windows.append(_aggregate(overlapping, window_start, window_end))
+            window_end += step
+        return windows
@@ -0,0 +1,215 @@
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+from ohgo.exceptions import OHGOException
+from ohgo.models.weather_sensor_site import WeatherSensorSite
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, pip install ohgo[analytics]
+    np = None
+
+# OHGO reports temperatures in Fahrenheit
+FREEZING = 32.0
+# Dewpoint spread (air minus dewpoint temperature) at or below which frost or ice can form
+ICING_SPREAD = 3.0
+
+Bounds = Tuple[float, float, float, float]
+
+
+def _require_numpy():
+    if np is None:
+        raise OHGOException("Weather analytics requires numpy, install it with pip install ohgo[analytics]")
+
+
+def _floats(values: Iterable) -> "np.ndarray":
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class WeatherFrame:
+    """
+    WeatherFrame flattens a weather sensor site snapshot into NumPy arrays, one row per site and one row per sensor,
+    so statewide statistics are computed with vectorized operations instead of Python loops. Missing values are NaN.
+
+    Attributes:
+    site_ids: The site ids, in row order
+    latitude / longitude / severe: Site arrays
+    air_site / surface_site: The site row of each atmospheric / surface sensor
+    air_temperature / dewpoint_temperature / humidity / precipitation_rate / visibility: Atmospheric sensor arrays
+    surface_temperature / sub_surface_temperature: Surface sensor arrays
+
+    Methods:
+    from_sites: Builds a WeatherFrame from WeatherSensorSite objects
+    temperature_stats: min/max/mean of air and surface temperature, statewide or per region
+    dewpoint_spread: Air minus dewpoint temperature per atmospheric sensor
+    icing_risk: Flags sites at risk of icing
+    top_severe: Returns the k most severe sites
+    """
+
+    def __init__(self, site_ids: List[str], latitude, longitude, severe, air_site, air_temperature,
+                 dewpoint_temperature, humidity, precipitation_rate, visibility, surface_site, surface_temperature,
+                 sub_surface_temperature):
+        _require_numpy()
+        self.site_ids = site_ids
+        self.latitude = latitude
+        self.longitude = longitude
+        self.severe = severe
+        self.air_site = air_site
+        self.air_temperature = air_temperature
+        self.dewpoint_temperature = dewpoint_temperature
+        self.humidity = humidity
+        self.precipitation_rate = precipitation_rate
+        self.visibility = visibility
+        self.surface_site = surface_site
+        self.surface_temperature = surface_temperature
+        self.sub_surface_temperature = sub_surface_temperature
+
+    @staticmethod
+    def from_sites(sites: Iterable[WeatherSensorSite]) -> 'WeatherFrame':
+        """
+        Flattens weather sensor sites, e.g. client.get_weather_sensor_sites(params=QueryParams(page_all=True))
+        :param sites: A list result or iterable of WeatherSensorSite
+        :return: A WeatherFrame
+        """
+        _require_numpy()
+        sites = list(sites)
+        air = [(row, sensor) for row, site in enumerate(sites) for sensor in site.atmospheric_sensors or []]
+        surface = [(row, sensor) for row, site in enumerate(sites) for sensor in site.surface_sensors or []]
+        return WeatherFrame(
+            site_ids=[site.id for site in sites],
+            latitude=_floats(site.latitude for site in sites),
+            longitude=_floats(site.longitude for site in sites),
+            severe=np.array([bool(site.severe) for site in sites], dtype=bool),
+            air_site=np.array([row for row, _ in air], dtype=np.intp),
+            air_temperature=_floats(sensor.air_temperature for _, sensor in air),
+            dewpoint_temperature=_floats(sensor.dewpoint_temperature for _, sensor in air),
+            humidity=_floats(sensor.humidity for _, sensor in air),
+            precipitation_rate=_floats(sensor.precipitation_rate for _, sensor in air),
+            visibility=_floats(sensor.visibility for _, sensor in air),
+            surface_site=np.array([row for row, _ in surface], dtype=np.intp),
+            surface_temperature=_floats(sensor.surface_temperature for _, sensor in surface),
+            sub_surface_temperature=_floats(sensor.sub_surface_temperature for _, sensor in surface),
+        )
+
+    def __len__(self) -> int:
+        return len(self.site_ids)
+
+    def region_labels(self, regions: Union[Sequence, Dict[str, Bounds]]) -> "np.ndarray":
+        """
+        Resolves a region argument into one label per site. OHGO results carry no region, so regions are either given
+        per site (e.g. collected by querying each Region) or as bounding boxes. Sites in several boxes get the first,
+        sites outside every box get None.
+        :param regions: A label per site, or a dictionary of label -> (min lat, min lon, max lat, max lon)
+        :return: An object array with one label per site
+        """
+        if isinstance(regions, dict):
+            labels = np.full(len(self), None, dtype=object)
+            assigned = np.zeros(len(self), dtype=bool)
+            for label, (min_lat, min_lon, max_lat, max_lon) in regions.items():
+                inside = ((self.latitude >= min_lat) & (self.latitude <= max_lat) &
+                          (self.longitude >= min_lon) & (self.longitude <= max_lon))
+                labels[inside & ~assigned] = label
+                assigned |= inside
+            return labels
+        labels = np.asarray(regions, dtype=object)
+        if len(labels) != len(self):
+            raise OHGOException("Expected one region label per site")
+        return labels
+
+    def temperature_stats(self, regions: Union[Sequence, Dict[str, Bounds]] = None) -> Dict:
+        """
+        Computes min, max and mean of air and surface temperature, ignoring missing readings
+        :param regions: (optional) Group by region, see region_labels
+        :return: {"air_temperature": stats, "surface_temperature": stats} statewide, where stats is a dictionary of
+        min, max, mean and count, or {region: {...}} per region
+        """
+        columns = {"air_temperature": (self.air_temperature, self.air_site),
+                   "surface_temperature": (self.surface_temperature, self.surface_site)}
+        if regions is None:
+            return {name: _stats(values) for name, (values, _) in columns.items()}
+
+        labels = self.region_labels(regions)
+        names = sorted({label for label in labels if label is not None})
+        codes = np.full(len(self), -1, dtype=np.intp)
+        for code, name in enumerate(names):
+            codes[labels == name] = code
+        result = {name: {} for name in names}
+        for column, (values, sites) in columns.items():
+            for name, stats in zip(names, _group_stats(values, codes[sites], len(names))):
+                result[name][column] = stats
+        return result
+
+    def dewpoint_spread(self) -> "np.ndarray":
+        """
+        Air minus dewpoint temperature per atmospheric sensor, see air_site for the site of each
+        """
+        return self.air_temperature - self.dewpoint_temperature
+
+    def _site_min(self, values, sites) -> "np.ndarray":
+        # fmin ignores NaN readings, sites without readings stay NaN
+        result = np.full(len(self), np.nan)
+        np.fmin.at(result, sites, values)
+        return result
+
+    def _site_max(self, values, sites) -> "np.ndarray":
+        result = np.full(len(self), np.nan)
+        np.fmax.at(result, sites, values)
+        return result
+
+    def icing_risk(self, freezing: float = FREEZING, spread: float = ICING_SPREAD) -> "np.ndarray":
+        """
+        Flags sites where the coldest road surface is at or below freezing and moisture is present: the smallest
+        dewpoint spread is at or below spread, or precipitation is falling
+        :param freezing: The freezing temperature, 32 F
+        :param spread: The dewpoint spread below which frost can form
+        :return: A bool array with one flag per site
+        """
+        coldest_surface = self._site_min(self.surface_temperature, self.surface_site)
+        smallest_spread = self._site_min(self.dewpoint_spread(), self.air_site)
+        precipitation = self._site_max(self.precipitation_rate, self.air_site)
+        with np.errstate(invalid="ignore"):
+            moisture = (smallest_spread <= spread) | (precipitation > 0)
+            return (coldest_surface <= freezing) & moisture
+
+    def top_severe(self, k: int = 10, freezing: float = FREEZING,
+                   spread: float = ICING_SPREAD) -> List[Tuple[str, bool, bool, float]]:
+        """
+        Returns the k most severe sites, ranked by the severe flag, then icing risk, then coldest surface temperature
+        :param k: The number of sites
+        :return: A list of (site id, severe, icing risk, coldest surface temperature)
+        """
+        icing = self.icing_risk(freezing, spread)
+        coldest = self._site_min(self.surface_temperature, self.surface_site)
+        # lexsort sorts by the last key first, NaN temperatures sort last
+        order = np.lexsort((np.where(np.isnan(coldest), np.inf, coldest), ~icing, ~self.severe))[:k]
+        return [(self.site_ids[row], bool(self.severe[row]), bool(icing[row]), float(coldest[row])) for row in order]
+
+
+def _stats(values) -> Dict[str, float]:
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"min": np.nan, "max": np.nan, "mean": np.nan, "count": 0}
+    return {"min": float(values.min()), "max": float(values.max()), "mean": float(values.mean()),
+            "count": int(len(values))}
+
+
+def _group_stats(values, groups, count) -> List[Dict[str, float]]:
+    """
+    Vectorized min/max/mean of values per group code in [0, count), readings with NaN values or a negative group are
+    ignored
+    """
+    keep = ~np.isnan(values) & (groups >= 0)
+    values, groups = values[keep], groups[keep]
+    counts = np.bincount(groups, minlength=count)
+    sums = np.bincount(groups, weights=values, minlength=count)
+    mins = np.full(count, np.inf)
+    maxs = np.full(count, -np.inf)
+    np.minimum.at(mins, groups, values)
+    np.maximum.at(maxs, groups, values)
+    stats = []
+    for group in range(count):
+        if counts[group]:
+            stats.append({"min": float(mins[group]), "max": float(maxs[group]),
+                          "mean": float(sums[group] / counts[group]), "count": int(counts[group])})
+        else:
+            stats.append({"min": np.nan, "max": np.nan, "mean": np.nan, "count": 0})
+    return stats
@@ -0,0 +1,254 @@
+import math
+import typing
+from array import array
+from bisect import bisect_right
+from dataclasses import fields
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ohgo.models.weather_sensor_site import WeatherSensorSite
+from ohgo.timeseries import ChunkedColumn, Timestamp, to_epoch
+
+# The largest offset from a chunk's base time that fits the uint32 offsets
+_MAX_OFFSET = 0xFFFFFFFF
+
+
+class DeltaTimeColumn:
+    """
+    DeltaTimeColumn stores increasing epoch seconds compactly: each chunk keeps one int64 base time and a uint32
+    offset per value, 4 bytes per timestamp instead of 8. Offsets stay sorted, so the column can be searched without
+    decoding it.
+
+    Methods:
+    append: Appends a timestamp, which must not be smaller than the last one
+    bisect_right: Index of the first timestamp greater than a value
+    """
+
+    def __init__(self, chunk_size: int = 1024):
+        """
+        Constructor for DeltaTimeColumn.
+        :param chunk_size: The number of timestamps per chunk
+        """
+        self.chunk_size = chunk_size
+        self.bases = array("q")
+        self.chunks: List[array] = []
+        # Index of the first value of each chunk, chunks can be short when an offset overflows
+        self._starts: List[int] = []
+        self._length = 0
+
+    def append(self, value: int):
+        if not self.chunks or len(self.chunks[-1]) == self.chunk_size or value - self.bases[-1] > _MAX_OFFSET:
+            self.bases.append(value)
+            self.chunks.append(array("I"))
+            self._starts.append(self._length)
+        self.chunks[-1].append(value - self.bases[-1])
+        self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("DeltaTimeColumn index out of range")
+        chunk_index = bisect_right(self._starts, index) - 1
+        return self.bases[chunk_index] + self.chunks[chunk_index][index - self._starts[chunk_index]]
+
+    def bisect_right(self, value: int) -> int:
+        chunk_index = bisect_right(self.bases, value) - 1
+        if chunk_index < 0:
+            return 0
+        return self._starts[chunk_index] + bisect_right(self.chunks[chunk_index], value - self.bases[chunk_index])
+
+    def slice(self, start: int, stop: int) -> array:
+        """
+        Returns the decoded timestamps with indexes in [start, stop)
+        :return: An int64 array of epoch seconds
+        """
+        out = array("q")
+        start, stop = max(0, start), min(stop, self._length)
+        while start < stop:
+            chunk_index = bisect_right(self._starts, start) - 1
+            base, chunk = self.bases[chunk_index], self.chunks[chunk_index]
+            offset = start - self._starts[chunk_index]
+            take = min(stop - start, len(chunk) - offset)
+            out.extend(base + delta for delta in chunk[offset:offset + take])
+            start += take
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return self.bases.itemsize * len(self.bases) + sum(chunk.itemsize * len(chunk) for chunk in self.chunks)
+
+
+def _column_kind(annotation) -> str:
+    annotation = typing.get_args(annotation)[0] if typing.get_origin(annotation) is Union else annotation
+    if annotation is datetime:
+        return "time"
+    if annotation is float:
+        return "float"
+    return "str"
+
+
+class SensorHistory:
+    """
+    SensorHistory holds the readings of one sensor. Floats are stored as float32 and strings as uint32 codes into the
+    archive's string table.
+    """
+
+    def __init__(self, sensor_class: type, chunk_size: int):
+        self.sensor_class = sensor_class
+        self.times = DeltaTimeColumn(chunk_size)
+        self.columns: Dict[str, ChunkedColumn] = {}
+        for field in fields(sensor_class):
+            kind = _column_kind(field.type)
+            if kind == "float":
+                self.columns[field.name] = ChunkedColumn("f", chunk_size)
+            elif kind == "str":
+                self.columns[field.name] = ChunkedColumn("I", chunk_size)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + sum(column.nbytes for column in self.columns.values())
+
+
+class WeatherArchive:
+    """
+    WeatherArchive stores weather sensor readings keyed by site id, sensor and last_update. A poll only adds readings
+    whose last_update advanced since the reading already stored, so unchanged sensors cost nothing. Timestamps are
+    delta encoded, floats are stored as float32 and strings as codes into a shared string table.
+
+    Sensors are identified as "atmospheric/<index>" (position in atmospheric_sensors) or "surface/<name>".
+
+    Methods:
+    append: Adds the new readings from a poll
+    sensors: Returns the (site id, sensor) pairs in the archive
+    history: Returns the readings of one sensor in a time range as columns
+    time_slice: Returns the latest reading of every sensor as of a time
+    """
+
+    def __init__(self, chunk_size: int = 1024):
+        """
+        Constructor for WeatherArchive.
+        :param chunk_size: Readings per array chunk
+        """
+        self._chunk_size = chunk_size
+        self._sensors: Dict[Tuple[str, str], SensorHistory] = {}
+        # Code 0 is None
+        self._strings: List[Optional[str]] = [None]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def _encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    @staticmethod
+    def _readings(site: WeatherSensorSite) -> Iterable[Tuple[str, object]]:
+        for index, sensor in enumerate(site.atmospheric_sensors or []):
+            yield f"atmospheric/{index}", sensor
+        for sensor in site.surface_sensors or []:
+            yield f"surface/{sensor.name}", sensor
+
+    def append(self, sites: Iterable[WeatherSensorSite]) -> int:
+        """
+        Adds the readings from a poll, e.g. the result of client.get_weather_sensor_sites(). Readings without a
+        last_update or not newer than the stored reading are skipped.
+        :param sites: A list result or iterable of WeatherSensorSite
+        :return: The number of readings added
+        """
+        if getattr(sites, "cached", False):
+            return 0
+        added = 0
+        for site in sites:
+            for sensor, reading in self._readings(site):
+                if reading.last_update is None:
+                    continue
+                updated = int(to_epoch(reading.last_update))
+                history = self._sensors.get((site.id, sensor))
+                if history is None:
+                    history = self._sensors[(site.id, sensor)] = SensorHistory(type(reading), self._chunk_size)
+                elif len(history) and updated <= history.times[-1]:
+                    continue
+                history.times.append(updated)
+                for name, column in history.columns.items():
+                    value = getattr(reading, name)
+                    if column.typecode == "f":
+                        column.append(math.nan if value is None else value)
+                    else:
+                        column.append(self._encode(value))
+                added += 1
+        return added
+
+    def sensors(self, site_id: str = None) -> List[Tuple[str, str]]:
+        """
+        Returns the (site id, sensor) pairs in the archive
+        :param site_id: (optional) Only return the sensors of this site
+        """
+        return [key for key in self._sensors if site_id is None or key[0] == site_id]
+
+    def __len__(self) -> int:
+        """
+        The total number of readings stored
+        """
+        return sum(len(history) for history in self._sensors.values())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes used by the reading arrays, not counting the string table
+        """
+        return sum(history.nbytes for history in self._sensors.values())
+
+    def history(self, site_id: str, sensor: str, start: Timestamp = None,
+                end: Timestamp = None) -> Dict[str, Union[array, list]]:
+        """
+        Returns the readings of one sensor with last_update in [start, end] as columns
+        :param site_id: The id of the weather sensor site
+        :param sensor: The sensor, e.g. "atmospheric/0" or "surface/<name>"
+        :param start: (optional) The earliest last_update, as a datetime or epoch seconds
+        :param end: (optional) The latest last_update, as a datetime or epoch seconds
+        :return: A dictionary with "last_update" (int64 epoch seconds) and one entry per sensor field, float32 arrays
+        for numbers and lists for strings
+        """
+        history = self._sensors[(site_id, sensor)]
+        first = 0 if start is None else history.times.bisect_right(math.ceil(to_epoch(start)) - 1)
+        last = len(history) if end is None else history.times.bisect_right(int(to_epoch(end)))
+        result: Dict[str, Union[array, list]] = {"last_update": history.times.slice(first, last)}
+        for name, column in history.columns.items():
+            values = column.slice(first, last)
+            result[name] = values if column.typecode == "f" else [self._strings[code] for code in values]
+        return result
+
+    def _reading(self, history: SensorHistory, index: int):
+        values = {"last_update": datetime.fromtimestamp(history.times[index], timezone.utc)}
+        for name, column in history.columns.items():
+            value = column[index]
+            if column.typecode == "f":
+                # float32 keeps about 7 significant digits, round so 44.6 does not come back as 44.59999
+                values[name] = None if math.isnan(value) else float(f"{value:.7g}")
+            else:
+                values[name] = self._strings[value]
+        return history.sensor_class(**values)
+
+    def time_slice(self, at: Timestamp = None, max_age: float = None) -> List[Tuple[str, str, object]]:
+        """
+        Returns the latest reading of every sensor as of a time, statewide
+        :param at: (optional) The time of the slice, as a datetime or epoch seconds, defaults to now
+        :param max_age: (optional) Leave out sensors whose latest reading is older than this many seconds
+        :return: A list of (site id, sensor, AtmosphericSensor or SurfaceSensor) tuples
+        """
+        at = int(to_epoch(at))
+        readings = []
+        for (site_id, sensor), history in self._sensors.items():
+            index = history.times.bisect_right(at) - 1
+            if index < 0 or (max_age is not None and at - history.times[index] > max_age):
+                continue
+            readings.append((site_id, sensor, self._reading(history, index)))
+        return readings
@@ -0,0 +1,19 @@
+import pytest
+
+from ohgo.ohgo_client import OHGOClient
+from ohgo.testing import OHGOStubServer
+
+
+@pytest.fixture
+def stub():
+    server = OHGOStubServer(api_key="test-key", seed=0)
+    server.populate(size=40)
+    with server:
+        yield server
+
+
+@pytest.fixture
+def client(stub):
+    client = OHGOClient(api_key="test-key", hostname=stub.hostname)
+    yield client
+    client.close()
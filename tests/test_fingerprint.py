@@ -0,0 +1,73 @@
+import random
+from io import BytesIO
+
+import pytest
+
+from ohgo.exceptions import OHGOException
+from ohgo.fingerprint import FrameMonitor, FrameStatus
+from ohgo.ohgo_client import OHGOClient
+from ohgo.testing import OHGOStubServer
+
+CHANGED, FROZEN, DUPLICATE = FrameStatus.CHANGED, FrameStatus.FROZEN, FrameStatus.DUPLICATE
+
+
+def frame(seed: int) -> bytes:
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.new("L", (64, 48))
+    image.putdata([rng.randrange(256) for _ in range(64 * 48)])
+    out = BytesIO()
+    image.convert("RGB").save(out, "PNG")
+    return out.getvalue()
+
+
+A, B = frame(1), frame(2)
+
+
+def test_repeated_frames_are_frozen():
+    monitor = FrameMonitor()
+    statuses = [monitor.observe("cam-1", data) for data in (A, A, B, B, A)]
+    assert statuses == [CHANGED, FROZEN, CHANGED, FROZEN, CHANGED]
+
+
+def test_view_repeating_its_frame_keeps_ownership():
+    monitor = FrameMonitor()
+    assert monitor.observe("cam-1", A) == CHANGED
+    assert monitor.observe("cam-1", A) == FROZEN
+    # A second camera serving the same picture stays a duplicate, however often the first repeats it
+    for _ in range(3):
+        assert monitor.observe("cam-2", A) == DUPLICATE
+        assert monitor.observe("cam-1", A) == FROZEN
+    assert monitor.stats["cam-2"].changed == 0
+
+
+def test_duplicate_takes_over_frame_when_owner_moves_on():
+    monitor = FrameMonitor()
+    monitor.observe("cam-1", A)
+    assert monitor.observe("cam-2", A) == DUPLICATE
+    assert monitor.observe("cam-1", B) == CHANGED
+    # cam-1 no longer serves A, so cam-2 repeating it is frozen rather than a duplicate
+    assert monitor.observe("cam-2", A) == FROZEN
+    assert monitor.observe("cam-1", B) == FROZEN
+
+
+def test_client_image_fetches_are_observed():
+    with OHGOStubServer() as stub:
+        client = OHGOClient(api_key="", hostname=stub.hostname)
+        monitor = FrameMonitor(client, min_interval=5)
+        view = client.get_cameras()[0].camera_views[0]
+        assert client.get_image(view) is not None
+        assert client.get_image(view) is not None
+        stats = monitor.stats[view.small_url]
+        assert (stats.frames, stats.changed, stats.frozen) == (2, 1, 1)
+        # poll goes through the same path and skips the view until it is due again
+        assert monitor.poll([view]) == []
+        client.close()
+
+
+def test_client_accepts_one_monitor():
+    client = OHGOClient(api_key="", hostname="http://127.0.0.1:1")
+    monitor = FrameMonitor(client)
+    assert client.image_handler.frame_monitor is monitor
+    with pytest.raises(OHGOException):
+        FrameMonitor(client)
@@ -0,0 +1,24 @@
+from ohgo.fingerprint import FrameMonitor
+from ohgo.image_pipeline import ImagePipeline
+
+
+def test_pipeline_frames_are_observed(client):
+    monitor = FrameMonitor(client)
+    views = [view for camera in client.get_cameras()[:3] for view in camera.camera_views]
+    with ImagePipeline(client, size=(32, 24), view_size="small", processes=1) as pipeline:
+        results = list(pipeline.process(views))
+    assert len(results) == len(views) and all(result.data for result in results)
+    assert sorted(monitor.stats) == sorted(view.small_url for view in views)
+
+
+def test_unexpected_fetch_error_is_a_result(client, monkeypatch):
+    urls = [view.small_url for view in client.get_cameras()[0].camera_views]
+
+    def fetch_bytes(url):
+        raise KeyError(url)
+
+    with ImagePipeline(client, size=(32, 24), processes=1) as pipeline:
+        monkeypatch.setattr(pipeline._image_handler, "fetch_bytes", fetch_bytes)
+        results = list(pipeline.process(urls))
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.data is None and result.error for result in results)
@@ -0,0 +1,21 @@
+from ohgo.planner import RegionShardedFetcher
+from ohgo.testing import STATEWIDE_COUNTS
+from ohgo.types import Region
+
+
+def test_regions_cover_the_state(client):
+    with RegionShardedFetcher(client) as fetcher:
+        for endpoint in STATEWIDE_COUNTS:
+            assert len(fetcher.fetch(endpoint)) == 40
+            assert not fetcher.fell_back
+
+
+def test_missing_results_fall_back_to_statewide(client, stub):
+    with RegionShardedFetcher(client, regions=[Region.AKRON]) as fetcher:
+        delays = fetcher.fetch("travel-delays")
+        assert fetcher.fell_back
+        assert sorted(delay.id for delay in delays) == sorted(item["id"] for item in stub.results("travel-delays"))
+        requests = stub.stats["requests"]
+        # The statewide query keeps its ETag, so an unchanged poll is a 304 for it too
+        assert len(fetcher.fetch("travel-delays")) == 40
+        assert fetcher.changed == [] and stub.stats["requests"] - requests == 3
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from ohgo.proxy import OHGOProxy
+
+
+def upstream(stub) -> int:
+    return stub.stats.get("requests", 0)
+
+
+@pytest.fixture
+def proxy(client):
+    with OHGOProxy(client, port=0, ttl=30) as proxy:
+        yield proxy
+
+
+def test_concurrent_requests_are_coalesced(proxy, stub):
+    before = upstream(stub)
+    barrier = threading.Barrier(16)
+    statuses = []
+
+    def get():
+        barrier.wait()
+        statuses.append(requests.get(f"{proxy.hostname}/api/v1/travel-delays").status_code)
+
+    threads = [threading.Thread(target=get) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 16
+    assert upstream(stub) - before == 1
+
+
+def test_if_none_match_is_answered_with_304(proxy, stub):
+    first = requests.get(f"{proxy.hostname}/api/v1/incidents")
+    etag = first.headers["ETag"]
+    before = upstream(stub)
+    second = requests.get(f"{proxy.hostname}/api/v1/incidents", headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.content == b"" and second.headers["ETag"] == etag
+    assert upstream(stub) == before and proxy.stats["not_modified"] == 1
+
+
+def test_next_page_links_point_at_the_proxy(proxy):
+    body = requests.get(f"{proxy.hostname}/api/v1/cameras", params={"page-size": 15}).json()
+    next_page = next(link["href"] for link in body["links"] if link["rel"] == "next-page")
+    assert next_page.startswith(f"{proxy.hostname}/api/v1/cameras")
+    page = requests.get(next_page).json()
+    assert len(page["results"]) == 15
+    assert {item["id"] for item in page["results"]}.isdisjoint(item["id"] for item in body["results"])
+
+
+def test_unsupported_params_are_dropped(proxy, stub):
+    assert proxy._normalize("digital-signs", [("Sign-Type", " DMS "), ("bogus", "1"), ("page-all", "TRUE")]) == \
+        {"sign-type": "DMS", "page-all": "true"}
+    before = upstream(stub)
+    for query in ({"page-size": 5}, {"page-size": 5, "bogus": 1}, {"page-size": 5, "cache-buster": time.time()}):
+        assert requests.get(f"{proxy.hostname}/api/v1/cameras", params=query).status_code == 200
+    # One cache entry and one upstream request for the three queries
+    assert upstream(stub) - before == 1
+
+
+def test_stale_response_served_when_upstream_fails(client, stub):
+    with OHGOProxy(client, port=0, ttl=0.05) as proxy:
+        fresh = requests.get(f"{proxy.hostname}/api/v1/construction")
+        assert fresh.status_code == 200 and "Warning" not in fresh.headers
+        time.sleep(0.1)
+        stub.error_rate = 1.0
+        stale = requests.get(f"{proxy.hostname}/api/v1/construction")
+        assert stale.status_code == 200 and stale.content == fresh.content
+        assert stale.headers["Warning"] == '110 - "Response is Stale"'
+        assert proxy.stats["stale"] == 1
+        # Without a cached response the upstream error is reported
+        assert requests.get(f"{proxy.hostname}/api/v1/incidents").status_code in (500, 502)
+
+
+def test_unknown_routes_are_not_forwarded(proxy, stub):
+    before = upstream(stub)
+    assert requests.get(f"{proxy.hostname}/api/v1/unknown").status_code == 404
+    assert requests.get(f"{proxy.hostname}/api/v1/cameras/a/b").status_code == 404
+    assert upstream(stub) == before
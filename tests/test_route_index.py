@@ -0,0 +1,55 @@
+import random
+
+from ohgo.index.route import RouteIndex, normalize_route
+from ohgo.models import Incident, TravelDelay
+from ohgo.models.results.ohgo_results import IncidentListResult, TravelDelayListResult
+from ohgo.planner import distance_miles
+from ohgo.testing import synthetic_results
+
+DELAYS = [TravelDelay.from_dict(result) for result in synthetic_results("travel-delays", 300, 0)]
+INCIDENTS = [Incident.from_dict(result) for result in synthetic_results("incidents", 50, 0)]
+
+
+def scan(route: str, latitude: float, longitude: float):
+    # locate as a linear scan over every delay of the route
+    nearest = sorted((distance_miles(latitude, longitude, delay.latitude, delay.longitude),
+                      (delay.start_mile_marker + delay.end_mile_marker) / 2)
+                     for delay in DELAYS if normalize_route(delay.route_name) == route)
+    if not nearest:
+        return None
+    if len(nearest) == 1 or nearest[0][0] == 0:
+        return nearest[0][1]
+    (d1, m1), (d2, m2) = nearest[:2]
+    return (m1 * d2 + m2 * d1) / (d1 + d2)
+
+
+def test_locate_matches_linear_scan():
+    index = RouteIndex()
+    index.update(TravelDelayListResult(DELAYS))
+    rng = random.Random(0)
+    routes = sorted({normalize_route(delay.route_name) for delay in DELAYS}) + ["SR-999"]
+    for _ in range(500):
+        route, latitude, longitude = rng.choice(routes), rng.uniform(38.4, 41.9), rng.uniform(-84.8, -80.5)
+        assert index.locate(route, latitude, longitude) == scan(route, latitude, longitude)
+    delay = DELAYS[0]
+    assert index.locate(delay.route_name, delay.latitude, delay.longitude) == \
+        (delay.start_mile_marker + delay.end_mile_marker) / 2
+
+
+def test_locate_sees_delay_changes():
+    index = RouteIndex()
+    index.update(TravelDelayListResult(DELAYS))
+    route = normalize_route(DELAYS[0].route_name)
+    assert index.locate(route, 40.0, -83.0) is not None
+    index.update(TravelDelayListResult([delay for delay in DELAYS if normalize_route(delay.route_name) != route]))
+    assert index.locate(route, 40.0, -83.0) is None
+
+
+def test_empty_poll_removes_kind():
+    index = RouteIndex()
+    index.update(TravelDelayListResult(DELAYS))
+    index.update(IncidentListResult(INCIDENTS))
+    assert len(index) == len(DELAYS) + len(INCIDENTS)
+    assert index.update(IncidentListResult([])) == len(INCIDENTS)
+    assert len(index) == len(DELAYS)
+    assert index.update([], kind="travel-delays") == len(DELAYS) and len(index) == 0
@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ohgo.shared_cache import SharedCache
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "cache.db")
+
+
+def test_concurrent_fetches_make_one_refresh(path):
+    caches = [SharedCache(path, ttl=30, poll_interval=0.01) for _ in range(2)]
+    calls = []
+    barrier = threading.Barrier(8)
+    entries = []
+
+    def refresh(etag):
+        calls.append(etag)
+        time.sleep(0.2)
+        return b"body", "etag-1"
+
+    def worker(cache):
+        barrier.wait()
+        entries.append(cache.fetch("cameras", refresh))
+
+    threads = [threading.Thread(target=worker, args=(caches[index % 2],)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [None]
+    assert [entry.body for entry in entries] == [b"body"] * 8
+
+
+def test_stale_entry_served_while_another_owner_refreshes(path):
+    cache = SharedCache(path, ttl=0.05)
+    cache.fetch("incidents", lambda etag: (b"old", "etag-1"))
+    time.sleep(0.1)
+    # Another process holds the lease on the key
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO leases (key, owner, expires) VALUES (?, ?, ?)", ("incidents", "1:1", time.time() + 30))
+
+    def refresh(etag):
+        raise AssertionError("refreshed while another owner holds the lease")
+
+    entry = cache.fetch("incidents", refresh)
+    assert entry.body == b"old" and cache.stats["stale"] == 1
+
+
+def test_max_entries_caps_every_write(path):
+    cache = SharedCache(path, max_entries=5)
+    for index in range(20):
+        cache.fetch(f"key-{index}", lambda etag, index=index: (str(index).encode(), None))
+    with sqlite3.connect(path) as db:
+        keys = {row[0] for row in db.execute("SELECT key FROM entries")}
+    assert keys == {f"key-{index}" for index in range(15, 20)}
+
+
+def test_not_modified_updates_fetched(path):
+    cache = SharedCache(path, ttl=0.05)
+    first = cache.fetch("travel-delays", lambda etag: (b"body", "etag-1"))
+    time.sleep(0.1)
+    etags = []
+
+    def refresh(etag):
+        etags.append(etag)
+        return None
+
+    second = cache.fetch("travel-delays", refresh)
+    assert etags == ["etag-1"]
+    assert (second.body, second.etag) == (b"body", "etag-1") and second.fetched > first.fetched
+    assert cache.get("travel-delays").fetched == second.fetched
+    assert cache.stats["revalidated"] == 1
+    # Fresh again, so no further refresh
+    assert cache.fetch("travel-delays", refresh) == cache.get("travel-delays") and len(etags) == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from ohgo.exceptions import OHGOException
+from ohgo.planner import ENDPOINTS
+from ohgo.snapshot import Snapshot, write_snapshot
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_round_trip(client, tmp_path, endpoint):
+    method = ENDPOINTS[endpoint][0]
+    items = getattr(client, method)()
+    assert len(items) > 0
+    path = str(tmp_path / f"{endpoint}.snap")
+    write_snapshot(path, items, metadata={"endpoint": endpoint})
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == len(items)
+        assert snapshot.metadata["endpoint"] == endpoint
+        assert snapshot.etag == items.etag
+        assert [item.to_dict() for item in snapshot] == [item.to_dict() for item in items]
+
+
+def test_empty_round_trip(client, tmp_path):
+    path = str(tmp_path / "empty.snap")
+    with pytest.raises(OHGOException):
+        write_snapshot(path, [])
+    model_class = type(client.get_incidents()[0])
+    write_snapshot(path, [], model_class)
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 0 and snapshot.model_class is model_class
+
+
+@pytest.fixture
+def snapshot_bytes(client, tmp_path) -> bytes:
+    path = tmp_path / "cameras.snap"
+    write_snapshot(str(path), client.get_cameras())
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("cut", [0, 4, 12, 40, 0.5, -1])
+def test_truncated_file_raises(snapshot_bytes, tmp_path, cut):
+    path = tmp_path / "truncated.snap"
+    path.write_bytes(snapshot_bytes[:int(len(snapshot_bytes) * cut) if isinstance(cut, float) else cut])
+    with pytest.raises(OHGOException):
+        Snapshot(str(path))
+
+
+@pytest.mark.parametrize("offset", [0, 10, 20])
+def test_corrupt_header_raises(snapshot_bytes, tmp_path, offset):
+    data = bytearray(snapshot_bytes)
+    data[offset:offset + 4] = b"\xff\xfe{]"
+    path = tmp_path / "corrupt.snap"
+    path.write_bytes(bytes(data))
+    with pytest.raises(OHGOException):
+        Snapshot(str(path))
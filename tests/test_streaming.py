@@ -0,0 +1,86 @@
+import json
+import random
+
+import pytest
+import requests
+
+from ohgo.decoders import get_decoder
+from ohgo.exceptions import OHGOException
+from ohgo.streaming import IncrementalResultParser
+from ohgo.testing import ENDPOINTS
+
+# Strings with escapes and structural characters, so chunk splits land inside strings and escape sequences
+TRICKY = ['quote " inside', 'back\\slash', 'brace } and ] bracket', 'unicode café ☃ \U0001f697',
+          'newline\nand\ttab', '\\"escaped quote\\"', '']
+
+
+def body(stub, endpoint: str, query: str = "page-all=true") -> bytes:
+    response = requests.get(f"{stub.base_url}{endpoint}?{query}", headers={"Authorization": "APIKEY test-key"})
+    response.raise_for_status()
+    return response.content
+
+
+def parse(data: bytes, sizes) -> IncrementalResultParser:
+    parser = IncrementalResultParser(get_decoder("json"))
+    items, pos = [], 0
+    for size in sizes:
+        items.extend(parser.feed(data[pos:pos + size]))
+        pos += size
+    items.extend(parser.feed(data[pos:]))
+    parser.close()
+    parser.items = items
+    return parser
+
+
+def random_sizes(rng: random.Random, length: int):
+    sizes, total = [], 0
+    while total < length:
+        sizes.append(rng.choice((1, 2, 3, rng.randint(1, 64), rng.randint(1, 4096))))
+        total += sizes[-1]
+    return sizes
+
+
+def check(data: bytes, sizes):
+    expected = json.loads(data)
+    parser = parse(data, sizes)
+    assert parser.items == expected.pop("results")
+    assert parser.envelope == expected
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_random_chunk_splits_match_json_loads(stub, endpoint):
+    data = body(stub, endpoint)
+    rng = random.Random(endpoint)
+    for _ in range(5):
+        check(data, random_sizes(rng, len(data)))
+
+
+def test_splits_inside_strings_and_escapes(stub):
+    stub.update("incidents", lambda item: dict(item, description=TRICKY[hash(item["id"]) % len(TRICKY)],
+                                                 roadStatus="\\\\" + item.get("roadStatus", "")))
+    data = body(stub, "incidents")
+    assert b'\\"' in data and b"\\\\" in data
+    # Every single split position, and byte by byte
+    for split in range(1, len(data), max(len(data) // 400, 1)):
+        check(data, [split])
+    check(data, [1] * len(data))
+
+
+def test_paged_envelope_keeps_links(stub):
+    data = body(stub, "cameras", "page-size=7&page=2")
+    parser = parse(data, random_sizes(random.Random(1), len(data)))
+    assert len(parser.items) == 7
+    assert any(link["rel"] == "next-page" for link in parser.envelope["links"])
+
+
+def test_truncated_response_raises(stub):
+    data = body(stub, "incidents")
+    parser = IncrementalResultParser(get_decoder("json"))
+    parser.feed(data[:len(data) // 2])
+    with pytest.raises(OHGOException):
+        parser.close()
+
+
+def test_client_stream_matches_get(client):
+    expected = [item.to_dict() for item in client.get_travel_delays()]
+    assert [item.to_dict() for item in client.stream("travel-delays")] == expected